@@ -0,0 +1,173 @@
+import argparse
+import os
+import platform
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from gerador_dados import gerar_dados
+
+# --- Configurações do Benchmark ---
+PASTA_PROJETO = os.path.dirname(os.path.abspath(__file__))
+CAMINHO_RELATORIO = os.path.join(PASTA_PROJETO, "Relatorio_Speedup.txt")
+TAMANHOS_PADRAO = [200, 1000, 5000]   # linhas por tribunal
+PROCESSOS_PADRAO = [1, 2, 4]
+
+# Executa o script (com os argumentos) em um subprocesso e informa o pico de memória (RSS) do maior processo descendente
+WRAPPER_PICO_RSS = (
+    "import resource, subprocess, sys; "
+    "r = subprocess.run([sys.executable] + sys.argv[1:]); "
+    "print('__PICO_RSS__', resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss); "
+    "sys.exit(r.returncode)"
+)
+PADRAO_TEMPO_ETAPA = re.compile(r"Tempo de execução \((.+?)\): ([\d.]+) segundos")
+PADRAO_PICO_RSS = re.compile(r"__PICO_RSS__ (\d+)")
+
+# --- 1. Execução de uma Versão ---
+def substituir_constantes(codigo, substituicoes):
+    """Substitui as constantes de configuração (linhas 'NOME = valor') no código do script."""
+    for nome, valor in substituicoes.items():
+        codigo, n = re.subn(rf"^{nome} = .*$", f"{nome} = {valor!r}", codigo, flags=re.MULTILINE)
+        if n == 0:
+            raise ValueError(f"Constante '{nome}' não encontrada no script.")
+    return codigo
+
+def executar_versao(nome_script, pasta_trabalho, substituicoes=None, argumentos=()):
+    """
+    Executa 'nome_script' (Versao_NP.py, Versao_P.py ou outro script do projeto) com
+    'pasta_trabalho' como diretório atual, as constantes substituídas e os 'argumentos'
+    de linha de comando. Retorna os tempos por etapa, o tempo total (medido por fora)
+    e o pico de RSS em MB.
+    """
+    with open(os.path.join(PASTA_PROJETO, nome_script), encoding='utf-8') as f:
+        codigo = substituir_constantes(f.read(), substituicoes or {})
+    caminho_script = os.path.join(pasta_trabalho, f"_benchmark_{nome_script}")
+    with open(caminho_script, 'w', encoding='utf-8') as f:
+        f.write(codigo)
+
+    ambiente = dict(os.environ, MPLBACKEND="Agg",
+                    PYTHONPATH=os.pathsep.join(filter(None, [PASTA_PROJETO, os.environ.get("PYTHONPATH")])))
+    t1 = time.perf_counter()
+    processo = subprocess.run([sys.executable, "-c", WRAPPER_PICO_RSS, caminho_script, *argumentos], cwd=pasta_trabalho,
+                              env=ambiente, capture_output=True, text=True, encoding='utf-8')
+    t2 = time.perf_counter()
+    os.remove(caminho_script)
+    if processo.returncode != 0:
+        raise RuntimeError(f"{nome_script} falhou:\n{processo.stdout[-2000:]}\n{processo.stderr[-2000:]}")
+
+    saida = processo.stdout
+    etapas = {etapa: float(valor) for etapa, valor in PADRAO_TEMPO_ETAPA.findall(saida)}
+    pico = PADRAO_PICO_RSS.search(saida)
+    pico_mb = None
+    if pico:
+        # ru_maxrss é dado em KB no Linux e em bytes no macOS
+        pico_mb = int(pico.group(1)) / (1024**2 if sys.platform == 'darwin' else 1024)
+    return {'etapas': etapas, 'total': t2 - t1, 'pico_rss_mb': pico_mb}
+
+def medir(nome_script, pasta_trabalho, substituicoes, repeticoes):
+    """Executa a versão 'repeticoes' vezes e devolve as medianas."""
+    execucoes = [executar_versao(nome_script, pasta_trabalho, substituicoes) for _ in range(repeticoes)]
+    etapas = {}
+    for etapa in execucoes[0]['etapas']:
+        etapas[etapa] = statistics.median(e['etapas'].get(etapa, 0.0) for e in execucoes)
+    picos = [e['pico_rss_mb'] for e in execucoes if e['pico_rss_mb'] is not None]
+    return {
+        'etapas': etapas,
+        'total': statistics.median(e['total'] for e in execucoes),
+        'pico_rss_mb': max(picos) if picos else None,
+    }
+
+# --- 2. Cenários ---
+def executar_benchmark(tamanhos, lista_processos, num_tribunais=90, num_arquivos=10, assimetria=0.0,
+                       repeticoes=1, com_graficos=False, semente=42):
+    """
+    Gera um conjunto de dados sintético para cada tamanho e mede a Versao_NP e a
+    Versao_P (para cada número de processos). Retorna a lista de resultados por tamanho.
+    """
+    resultados = []
+    for linhas_por_tribunal in tamanhos:
+        pasta_trabalho = tempfile.mkdtemp(prefix="benchmark_metas_")
+        try:
+            pasta_dados = os.path.join(pasta_trabalho, "Dados")
+            total_linhas = gerar_dados(pasta_dados, num_tribunais, None, linhas_por_tribunal,
+                                       num_arquivos, assimetria, semente)
+            tamanho_mb = sum(os.path.getsize(os.path.join(pasta_dados, a)) for a in os.listdir(pasta_dados)) / 1024**2
+            print(f"Benchmark: {total_linhas} linhas ({tamanho_mb:.1f} MB) em {num_arquivos} arquivo(s)...")
+
+            substituicoes = {'GERAR_GRAFICOS': com_graficos}
+            medicoes = [('Versao_NP', 1, medir("Versao_NP.py", pasta_trabalho, substituicoes, repeticoes))]
+            for num_processos in lista_processos:
+                medicoes.append(('Versao_P', num_processos, medir(
+                    "Versao_P.py", pasta_trabalho, dict(substituicoes, NUM_PROCESSOS=num_processos), repeticoes)))
+            resultados.append({
+                'linhas_por_tribunal': linhas_por_tribunal,
+                'total_linhas': total_linhas,
+                'tamanho_mb': tamanho_mb,
+                'medicoes': medicoes,
+            })
+        finally:
+            shutil.rmtree(pasta_trabalho, ignore_errors=True)
+    return resultados
+
+# --- 3. Relatório ---
+def escrever_relatorio(resultados, parametros, caminho_relatorio=CAMINHO_RELATORIO):
+    """Escreve o relatório de speedup, eficiência paralela, tempos por etapa e pico de memória."""
+    linhas = [
+        "RELATÓRIO DE SPEEDUP - Versao_NP (sequencial) x Versao_P (paralela)",
+        "=" * 70,
+        f"Gerado em: {time.strftime('%Y-%m-%d %H:%M:%S')}",
+        f"Máquina: {platform.platform()} | {os.cpu_count()} CPU(s) | Python {platform.python_version()} | pandas {pd.__version__}",
+        f"Dados sintéticos: {parametros['num_tribunais']} tribunais, {parametros['num_arquivos']} arquivo(s), "
+        f"assimetria {parametros['assimetria']}, semente {parametros['semente']}, "
+        f"{parametros['repeticoes']} repetição(ões) (mediana), gráficos {'ativados' if parametros['com_graficos'] else 'desativados'}",
+        "",
+        "Speedup = tempo total da Versao_NP / tempo total da Versao_P",
+        "Eficiência = speedup / número de processos",
+        "",
+    ]
+    for resultado in resultados:
+        linhas.append(f"Tamanho: {resultado['linhas_por_tribunal']} linhas por tribunal = "
+                      f"{resultado['total_linhas']} linhas ({resultado['tamanho_mb']:.1f} MB)")
+        linhas.append(f"{'Versão':<12}{'Processos':>10}{'Total (s)':>12}{'Speedup':>10}{'Eficiência':>12}{'Pico RSS (MB)':>15}")
+        tempo_sequencial = resultado['medicoes'][0][2]['total']
+        for versao, num_processos, medicao in resultado['medicoes']:
+            speedup = tempo_sequencial / medicao['total']
+            pico = f"{medicao['pico_rss_mb']:.1f}" if medicao['pico_rss_mb'] is not None else "n/d"
+            linhas.append(f"{versao:<12}{num_processos:>10}{medicao['total']:>12.2f}{speedup:>10.2f}"
+                          f"{speedup / num_processos:>12.2f}{pico:>15}")
+        linhas.append("Tempos por etapa (s):")
+        for versao, num_processos, medicao in resultado['medicoes']:
+            etapas = ", ".join(f"{etapa}={tempo:.2f}" for etapa, tempo in medicao['etapas'].items())
+            linhas.append(f"  {versao} ({num_processos} proc.): {etapas}")
+        linhas.append("")
+
+    with open(caminho_relatorio, 'w', encoding='utf-8') as f:
+        f.write("\n".join(linhas))
+    print(f"Relatório '{caminho_relatorio}' gerado.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mede Versao_NP e Versao_P em dados sintéticos e preenche o Relatorio_Speedup.txt.")
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=TAMANHOS_PADRAO, help="Linhas por tribunal de cada cenário")
+    parser.add_argument("--processos", type=int, nargs="+", default=PROCESSOS_PADRAO, help="Números de processos da Versao_P")
+    parser.add_argument("--tribunais", type=int, default=90, help="Número de tribunais")
+    parser.add_argument("--arquivos", type=int, default=10, help="Número de arquivos teste_*.csv")
+    parser.add_argument("--assimetria", type=float, default=0.0, help="Expoente de Zipf do tamanho dos tribunais")
+    parser.add_argument("--repeticoes", type=int, default=1, help="Execuções por medição (usa a mediana)")
+    parser.add_argument("--com-graficos", action="store_true", help="Inclui a geração de gráficos nas medições")
+    parser.add_argument("--semente", type=int, default=42, help="Semente do gerador de dados")
+    parser.add_argument("--relatorio", default=CAMINHO_RELATORIO, help="Arquivo de relatório")
+    args = parser.parse_args()
+
+    parametros = {
+        'num_tribunais': args.tribunais, 'num_arquivos': args.arquivos, 'assimetria': args.assimetria,
+        'repeticoes': args.repeticoes, 'com_graficos': args.com_graficos, 'semente': args.semente,
+    }
+    resultados = executar_benchmark(args.tamanhos, args.processos, args.tribunais, args.arquivos,
+                                    args.assimetria, args.repeticoes, args.com_graficos, args.semente)
+    escrever_relatorio(resultados, parametros, args.relatorio)
@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from motor_metas import COLUNAS_CONTADORES
+from esquema import ler_colunas_metas, reduzir_contador
+
+# --- Configurações do Cache ---
+PASTA_CACHE = "./.cache_csvs"
+LIMITE_CACHE_BYTES = 2 * 1024**3  # 2 GB
+TAMANHO_BLOCO_HASH = 1024 * 1024
+
+# --- 1. Impressão Digital dos Arquivos ---
+def hash_conteudo(caminho_arquivo):
+    """Calcula o hash (BLAKE2b) do conteúdo do arquivo, lendo-o em blocos."""
+    h = hashlib.blake2b(digest_size=20)
+    with open(caminho_arquivo, 'rb') as f:
+        for bloco in iter(lambda: f.read(TAMANHO_BLOCO_HASH), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+def impressao_digital(caminho_arquivo):
+    """Retorna caminho absoluto, tamanho e mtime (ns) do arquivo."""
+    stat = os.stat(caminho_arquivo)
+    return {
+        'caminho': os.path.abspath(caminho_arquivo),
+        'tamanho': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+    }
+
+def _caminhos_entrada(pasta_cache, caminho_arquivo):
+    chave = hashlib.sha1(os.path.abspath(caminho_arquivo).encode('utf-8')).hexdigest()[:20]
+    base = os.path.join(pasta_cache, chave)
+    return base + ".npz", base + ".json"
+
+# --- 2. Conversão para o Formato Colunar ---
+def salvar_colunar(df, caminho_npz):
+    """
+    Grava as colunas das metas em .npz (chaves como códigos + categorias, contadores
+    estreitos), via arquivo temporário e renomeação: leitores concorrentes nunca veem
+    arquivos parciais.
+    """
+    arrays = {}
+    for coluna in ['sigla_tribunal', 'ramo_justica']:
+        categorico = pd.Categorical(df[coluna])
+        arrays[f"{coluna}__codigos"] = categorico.codes
+        arrays[f"{coluna}__categorias"] = np.asarray(categorico.categories.astype(str), dtype=str)
+    for coluna in COLUNAS_CONTADORES:
+        arrays[coluna] = reduzir_contador(df[coluna]).to_numpy()
+
+    tmp_npz = f"{caminho_npz}.{os.getpid()}.tmp.npz"
+    with open(tmp_npz, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_npz, caminho_npz)
+
+def carregar_colunar(caminho_npz):
+    """Lê um .npz gravado por salvar_colunar de volta para um DataFrame compacto."""
+    with np.load(caminho_npz, allow_pickle=False) as dados:
+        colunas = {}
+        for coluna in ['sigla_tribunal', 'ramo_justica']:
+            colunas[coluna] = pd.Categorical.from_codes(
+                dados[f"{coluna}__codigos"], categories=dados[f"{coluna}__categorias"])
+        for coluna in COLUNAS_CONTADORES:
+            colunas[coluna] = dados[coluna]
+    return pd.DataFrame(colunas)
+
+def _salvar_entrada(df, caminho_npz, caminho_json, digital):
+    salvar_colunar(df, caminho_npz)
+    # O .json é gravado por último: uma entrada só é válida com os dois arquivos completos
+    tmp_json = f"{caminho_json}.{os.getpid()}.tmp"
+    with open(tmp_json, 'w', encoding='utf-8') as f:
+        json.dump(digital, f)
+    os.replace(tmp_json, caminho_json)
+
+# --- 3. Acesso ao Cache ---
+def carregar_colunas_metas(caminho_arquivo, pasta_cache=PASTA_CACHE):
+    """
+    Retorna as colunas usadas nas metas de um CSV, a partir do cache quando a
+    impressão digital (caminho, tamanho, mtime e hash do conteúdo) confere.
+    Em caso de ausência ou divergência, lê o CSV e atualiza o cache.
+    Retorna a tupla (DataFrame ou None, acerto_no_cache).
+    """
+    os.makedirs(pasta_cache, exist_ok=True)
+    caminho_npz, caminho_json = _caminhos_entrada(pasta_cache, caminho_arquivo)
+    digital = impressao_digital(caminho_arquivo)
+
+    registro = None
+    if os.path.exists(caminho_npz) and os.path.exists(caminho_json):
+        try:
+            with open(caminho_json, encoding='utf-8') as f:
+                registro = json.load(f)
+        except (OSError, ValueError):
+            registro = None
+
+    if registro is not None and registro.get('caminho') == digital['caminho'] and registro.get('tamanho') == digital['tamanho']:
+        acerto = registro.get('mtime_ns') == digital['mtime_ns']
+        if not acerto:
+            # Arquivo "tocado" mas possivelmente com o mesmo conteúdo: confere o hash
+            digital['hash'] = hash_conteudo(caminho_arquivo)
+            acerto = registro.get('hash') == digital['hash']
+            if acerto:
+                registro['mtime_ns'] = digital['mtime_ns']
+                with open(caminho_json, 'w', encoding='utf-8') as f:
+                    json.dump(registro, f)
+        if acerto:
+            try:
+                df = carregar_colunar(caminho_npz)
+                os.utime(caminho_npz)  # marca o uso recente (política LRU)
+                return df, True
+            except Exception as e:
+                print(f"Alerta: entrada de cache corrompida para {caminho_arquivo}: {e}. Relendo o CSV.")
+
+    df = ler_colunas_metas(caminho_arquivo)
+    if df is not None:
+        digital.setdefault('hash', hash_conteudo(caminho_arquivo))
+        try:
+            _salvar_entrada(df, caminho_npz, caminho_json, digital)
+        except Exception as e:
+            print(f"Alerta: não foi possível gravar o cache de {caminho_arquivo}: {e}")
+    return df, False
+
+def limpar_cache(pasta_cache=PASTA_CACHE, limite_bytes=LIMITE_CACHE_BYTES):
+    """
+    Remove as entradas menos usadas recentemente até o cache caber em 'limite_bytes'.
+    Retorna a quantidade de entradas removidas.
+    """
+    if not os.path.isdir(pasta_cache):
+        return 0
+    entradas = []
+    for nome in os.listdir(pasta_cache):
+        if nome.endswith(".npz") and ".tmp" not in nome:
+            caminho_npz = os.path.join(pasta_cache, nome)
+            stat = os.stat(caminho_npz)
+            entradas.append((stat.st_mtime, stat.st_size, caminho_npz))
+
+    total = sum(tamanho for _, tamanho, _ in entradas)
+    removidas = 0
+    for _, tamanho, caminho_npz in sorted(entradas):
+        if total <= limite_bytes:
+            break
+        for caminho in (caminho_npz, caminho_npz[:-len(".npz")] + ".json"):
+            try:
+                os.remove(caminho)
+            except FileNotFoundError:
+                pass
+        total -= tamanho
+        removidas += 1
+    if removidas:
+        print(f"Cache: {removidas} entrada(s) antiga(s) removida(s) para respeitar o limite de {limite_bytes} bytes.")
+    return removidas
@@ -0,0 +1,235 @@
+import json
+import os
+import shutil
+import threading
+
+import pandas as pd
+
+from motor_metas import agregar_parciais, combinar_parciais
+from cache_colunar import impressao_digital
+from incremental import parciais_de_json, parciais_para_json
+from consolidacao_rapida import ler_cabecalho
+from esquema import ler_arquivos_em_ordem
+from compressao import abrir_saida
+from instrumentacao import etapa_instrumentada, registrar_arquivo
+
+# --- Configurações do Checkpoint ---
+PASTA_CHECKPOINT = "./.checkpoint"
+NOME_ARQUIVO_DIARIO = "diario.jsonl"
+NOME_CONSOLIDADO_PARCIAL = "consolidado.csv"
+
+def _valor_json(valor):
+    # Escalares NumPy (ex.: int64 das somas) viram tipos nativos do Python
+    if hasattr(valor, 'item'):
+        return valor.item()
+    raise TypeError(f"Objeto do tipo {type(valor).__name__} não é serializável em JSON")
+
+# --- 1. Diário de Progresso ---
+class DiarioProgresso:
+    """
+    Diário durável (JSON Lines, com fsync a cada registro) do progresso de uma execução:
+    arquivos já lidos (só os agregados por tribunal e onde eles terminam no consolidado
+    parcial da pasta do checkpoint) e arquivos em quarentena. Uma execução reiniciada
+    retoma do último registro; uma linha incompleta (interrupção durante a escrita) é
+    descartada. O registro de um arquivo só vale enquanto ele (pela impressão digital) e
+    a validação não mudarem.
+    """
+
+    def __init__(self, pasta_checkpoint, nome_execucao, validacao=False):
+        self.pasta = os.path.join(pasta_checkpoint, nome_execucao)
+        self.validacao = bool(validacao)
+        os.makedirs(self.pasta, exist_ok=True)
+        self.caminho_diario = os.path.join(self.pasta, NOME_ARQUIVO_DIARIO)
+        self.caminho_consolidado = os.path.join(self.pasta, NOME_CONSOLIDADO_PARCIAL)
+        self.arquivos = {}
+        self._carregar()
+        self._trava = threading.Lock()
+        self._diario = open(self.caminho_diario, 'a', encoding='utf-8')
+        if self.arquivos:
+            print(f"Checkpoint encontrado em '{self.pasta}': {len(self.arquivos)} arquivo(s) já registrados. Retomando.")
+
+    def _carregar(self):
+        try:
+            with open(self.caminho_diario, encoding='utf-8') as f:
+                linhas = f.read().split('\n')
+        except OSError:
+            return
+        validas = []
+        for linha in linhas:
+            if not linha:
+                continue
+            try:
+                registro = json.loads(linha)
+            except ValueError:
+                break  # escrita interrompida: o que vem depois não é confiável
+            validas.append(linha)
+            if registro.get('tipo') == 'arquivo':
+                self.arquivos[registro['caminho']] = registro
+        if len(validas) != len([l for l in linhas if l]) or (linhas and linhas[-1]):
+            # Remove a linha incompleta antes de voltar a anotar no fim do diário
+            tmp = f"{self.caminho_diario}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(''.join(l + '\n' for l in validas))
+            os.replace(tmp, self.caminho_diario)
+
+    def _anotar(self, registro):
+        with self._trava:
+            self._diario.write(json.dumps(registro, ensure_ascii=False, default=_valor_json) + '\n')
+            self._diario.flush()
+            os.fsync(self._diario.fileno())
+
+    # --- Arquivos de entrada ---
+    def arquivos_retomaveis(self, arquivos_csv, colunas, inicio_dados):
+        """
+        Registros dos arquivos iniciais de 'arquivos_csv' que podem ser retomados: sem
+        alterações (impressão digital), com a mesma validação e as mesmas 'colunas' do
+        consolidado, e anotados em sequência (cada um começa onde o anterior termina, a
+        partir de 'inicio_dados' no consolidado parcial). Para no primeiro que não pode:
+        ele e os seguintes são lidos de novo (inclusive um arquivo em quarentena que
+        tenha sido alterado desde então).
+        """
+        retomaveis = []
+        fim = (inicio_dados, 0)
+        for arquivo in arquivos_csv:
+            registro = self.arquivos.get(os.path.abspath(arquivo))
+            if (registro is None or registro.get('validacao') != self.validacao or registro.get('colunas') != colunas
+                    or (registro['inicio_consolidado'], registro['inicio_quarentena']) != fim):
+                break
+            try:
+                if registro['digital'] != impressao_digital(arquivo):
+                    break
+            except OSError:
+                break
+            retomaveis.append(registro)
+            fim = (registro['fim_consolidado'], registro['fim_quarentena'])
+        try:
+            tamanho_consolidado = os.path.getsize(self.caminho_consolidado)
+        except OSError:
+            return []
+        # O consolidado parcial precisa conter tudo o que foi anotado
+        return retomaveis if fim[0] <= tamanho_consolidado else []
+
+    @staticmethod
+    def parciais(registro):
+        """Agregados por tribunal de um arquivo retomado."""
+        return parciais_de_json(registro['parciais'])
+
+    def concluir_arquivo(self, caminho_arquivo, df_parciais, linhas, colunas, posicoes, validacao=None):
+        """
+        Anota o arquivo como lido: os agregados por tribunal ('df_parciais'), as 'linhas' e
+        'posicoes' = (início e fim no consolidado parcial, início e fim na quarentena), já
+        gravados em disco. 'validacao' = (resumo, ramos de referência novos) do validador.
+        """
+        self._anotar_arquivo(caminho_arquivo, colunas, posicoes, estado='ok', linhas=linhas,
+                             parciais=parciais_para_json(df_parciais) if df_parciais is not None else {},
+                             resumo_validacao=validacao[0] if validacao else None,
+                             ramos_validacao=validacao[1] if validacao else None)
+
+    def quarentenar_arquivo(self, caminho_arquivo, erro, colunas, posicoes):
+        self._anotar_arquivo(caminho_arquivo, colunas, posicoes, estado='quarentena', erro=str(erro))
+
+    def _anotar_arquivo(self, caminho_arquivo, colunas, posicoes, **campos):
+        chave = os.path.abspath(caminho_arquivo)
+        inicio_consolidado, fim_consolidado, inicio_quarentena, fim_quarentena = posicoes
+        registro = {'tipo': 'arquivo', 'caminho': chave, 'digital': impressao_digital(caminho_arquivo),
+                    'validacao': self.validacao, 'colunas': colunas,
+                    'inicio_consolidado': inicio_consolidado, 'fim_consolidado': fim_consolidado,
+                    'inicio_quarentena': inicio_quarentena, 'fim_quarentena': fim_quarentena, **campos}
+        self._anotar(registro)
+        self.arquivos[chave] = registro
+
+    def finalizar(self):
+        """Execução concluída: o diário e os dados guardados não são mais necessários."""
+        self._diario.close()
+        shutil.rmtree(self.pasta, ignore_errors=True)
+
+# --- 2. Consolidação Retomável ---
+@etapa_instrumentada("consolidar csvs, checkpoint")
+def consolidar_com_checkpoint(arquivos_csv, caminho_arquivo_saida_consolidado, diario, validador=None,
+                              num_threads=None):
+    """
+    Consolidação retomável: cada arquivo lido é acrescentado a um consolidado parcial na
+    pasta do checkpoint, e o diário guarda só os agregados por tribunal dele e onde ele
+    termina no consolidado parcial (e na quarentena). Na retomada, os arquivos iniciais já
+    anotados (e inalterados) não são relidos: o consolidado parcial é truncado no fim do
+    último deles e a leitura continua a partir do seguinte. Um arquivo com erro de leitura
+    vai para a quarentena do diário e só é relido se for alterado. Os comprimidos são lidos
+    à frente em até 'num_threads' threads (ver ler_arquivos_em_ordem). Com
+    'caminho_arquivo_saida_consolidado' None, o consolidado parcial não é copiado para a saída.
+    Retorna os agregados por tribunal, combinados na ordem dos arquivos, ou None.
+    """
+    print("Iniciando consolidação dos arquivos CSV (com checkpoint)...")
+    # Colunas do consolidado: a união das colunas dos arquivos, na ordem em que aparecem (como no pd.concat)
+    colunas = []
+    for arquivo in arquivos_csv:
+        try:
+            colunas_arquivo = ler_cabecalho(arquivo)[1]
+        except Exception:
+            continue  # o erro aparece (e o arquivo vai para a quarentena) na leitura
+        colunas += [c for c in colunas_arquivo if c not in colunas]
+    cabecalho = pd.DataFrame(columns=colunas).to_csv(index=False, sep=',').encode('utf-8')
+
+    retomados = diario.arquivos_retomaveis(arquivos_csv, colunas, len(cabecalho))
+    if validador is not None and retomados and validador.tamanho_quarentena() < retomados[-1]['fim_quarentena']:
+        retomados = []  # a quarentena da execução anterior não está completa
+    if validador is not None:
+        validador.retomar(retomados[-1]['fim_quarentena'] if retomados else 0,
+                          [(arquivo, r['resumo_validacao'], r['ramos_validacao'])
+                           for arquivo, r in zip(arquivos_csv, retomados) if r['estado'] == 'ok'])
+
+    lista_parciais = []
+    linhas_total = 0
+    with open(diario.caminho_consolidado, 'r+b' if retomados else 'wb') as consolidado_parcial:
+        if retomados:
+            consolidado_parcial.truncate(retomados[-1]['fim_consolidado'])
+            consolidado_parcial.seek(0, os.SEEK_END)
+            for arquivo, registro in zip(arquivos_csv, retomados):
+                if registro['estado'] == 'quarentena':
+                    print(f"Arquivo {arquivo} em quarentena ({registro['erro']}). Ignorado.")
+                    continue
+                lista_parciais.append(diario.parciais(registro))
+                linhas_total += registro['linhas']
+            print(f"{len(retomados)} arquivo(s) retomado(s) do checkpoint.")
+        else:
+            consolidado_parcial.write(cabecalho)
+
+        for arquivo, df_arquivo, segundos in ler_arquivos_em_ordem(arquivos_csv[len(retomados):], num_threads):
+            inicio_consolidado = consolidado_parcial.tell()
+            inicio_quarentena = validador.tamanho_quarentena() if validador is not None else 0
+            if df_arquivo is None:
+                diario.quarentenar_arquivo(arquivo, segundos, colunas, (inicio_consolidado, inicio_consolidado,
+                                                                        inicio_quarentena, inicio_quarentena))
+                print(f"Erro ao ler o arquivo {arquivo}: {segundos}. Arquivo posto em quarentena.")
+                continue
+            registrar_arquivo(arquivo, segundos, len(df_arquivo))
+            validacao = None
+            if validador is not None:
+                ramos_anteriores = set(validador.ramo_por_tribunal)
+                df_arquivo = validador.validar(df_arquivo, arquivo)
+                validacao = (validador.resumo.get(arquivo), {str(sigla): ramo for sigla, ramo in validador.ramo_por_tribunal.items()
+                                                             if sigla not in ramos_anteriores})
+            df_arquivo.reindex(columns=colunas).to_csv(consolidado_parcial, mode='wb', header=False, index=False,
+                                                       sep=',', encoding='utf-8')
+            consolidado_parcial.flush()
+            os.fsync(consolidado_parcial.fileno())
+            df_parciais = agregar_parciais(df_arquivo) if not df_arquivo.empty else None
+            # Os dados são gravados antes do registro que aponta para eles
+            diario.concluir_arquivo(arquivo, df_parciais, len(df_arquivo), colunas,
+                                    (inicio_consolidado, consolidado_parcial.tell(), inicio_quarentena,
+                                     validador.tamanho_quarentena() if validador is not None else 0), validacao)
+            if df_parciais is not None:
+                lista_parciais.append(df_parciais)
+            linhas_total += len(df_arquivo)
+
+    if not lista_parciais:
+        print("Nenhum DataFrame para concatenar.")
+        return None
+
+    if caminho_arquivo_saida_consolidado is not None:
+        # O consolidado parcial só é removido com o diário; a saída recebe uma cópia (comprimida, se for o caso)
+        tmp = f"{caminho_arquivo_saida_consolidado}.tmp"
+        with open(diario.caminho_consolidado, 'rb') as origem, abrir_saida(tmp, caminho_arquivo_saida_consolidado) as destino:
+            shutil.copyfileobj(origem, destino, 1024 * 1024)
+        os.replace(tmp, caminho_arquivo_saida_consolidado)
+        print(f"Arquivo consolidado gerado com {linhas_total} linhas.")
+    return combinar_parciais(lista_parciais)
@@ -0,0 +1,59 @@
+import bz2
+import glob
+import gzip
+import lzma
+import os
+
+# --- Configurações da Compressão ---
+# Codecs da biblioteca padrão, pela extensão do arquivo (teste_1.csv.gz, Consolidado.csv.xz...)
+CODECS = {'.gz': gzip, '.bz2': bz2, '.xz': lzma}
+FORMATOS_COMPRESSAO = tuple(extensao[1:] for extensao in CODECS)
+PADRAO_ARQUIVOS_CSV = "teste_*.csv"
+
+# --- 1. Identificação dos Arquivos ---
+def codec_do_arquivo(caminho_arquivo):
+    """Módulo do codec (gzip, bz2 ou lzma) pela extensão do arquivo, ou None se não for comprimido."""
+    return CODECS.get(os.path.splitext(caminho_arquivo)[1].lower())
+
+def arquivo_comprimido(caminho_arquivo):
+    return codec_do_arquivo(caminho_arquivo) is not None
+
+def listar_arquivos_csv(caminho_pasta_dados, padrao=PADRAO_ARQUIVOS_CSV):
+    """
+    Arquivos 'teste_*.csv' da pasta seguidos dos comprimidos ('teste_*.csv.gz', '.bz2',
+    '.xz'). Um comprimido com a mesma base de um arquivo já listado (ex.: teste_1.csv e
+    teste_1.csv.gz) é ignorado com alerta, para não contar os mesmos dados duas vezes.
+    """
+    arquivos_csv = glob.glob(os.path.join(caminho_pasta_dados, padrao))
+    bases = set(arquivos_csv)
+    for extensao in CODECS:
+        for arquivo in glob.glob(os.path.join(caminho_pasta_dados, padrao + extensao)):
+            base = arquivo[:-len(extensao)]
+            if base in bases:
+                print(f"Alerta: Arquivo {arquivo} ignorado: os mesmos dados já estão em {base}.")
+                continue
+            bases.add(base)
+            arquivos_csv.append(arquivo)
+    return arquivos_csv
+
+# --- 2. Leitura e Escrita em Fluxo ---
+def abrir_entrada(caminho_arquivo):
+    """Abre o arquivo para leitura binária, descomprimindo em fluxo (sem arquivos temporários) se preciso."""
+    codec = codec_do_arquivo(caminho_arquivo)
+    return codec.open(caminho_arquivo, 'rb') if codec is not None else open(caminho_arquivo, 'rb')
+
+def abrir_saida(caminho_arquivo, caminho_formato=None):
+    """
+    Abre o arquivo para escrita binária, comprimindo em fluxo conforme a extensão de
+    'caminho_formato' (padrão: o próprio caminho; útil para um '<saida>.tmp').
+    """
+    codec = codec_do_arquivo(caminho_formato or caminho_arquivo)
+    return codec.open(caminho_arquivo, 'wb') if codec is not None else open(caminho_arquivo, 'wb')
+
+def nome_com_compressao(nome_arquivo, compressao=None):
+    """'Consolidado.csv' -> 'Consolidado.csv.gz' (ou o nome original, sem 'compressao')."""
+    if compressao is None:
+        return nome_arquivo
+    if compressao not in FORMATOS_COMPRESSAO:
+        raise ValueError(f"Compressão '{compressao}' inválida. Use uma de {FORMATOS_COMPRESSAO}.")
+    return f"{nome_arquivo}.{compressao}"
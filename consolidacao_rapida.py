@@ -0,0 +1,311 @@
+import csv
+import io
+import json
+import os
+import threading
+import time
+from collections import Counter
+
+import pandas as pd
+
+from cache_colunar import impressao_digital
+from instrumentacao import etapa_instrumentada, registrar_arquivo
+from compressao import abrir_entrada, abrir_saida, arquivo_comprimido, listar_arquivos_csv
+
+# --- Configurações da Consolidação Rápida ---
+TAMANHO_BUFFER_COPIA = 8 * 1024 * 1024
+# Manifesto (faixa de bytes de cada arquivo no consolidado) da atualização incremental
+NOME_MANIFESTO_CONSOLIDADO = ".manifesto_consolidado.json"
+BOM_UTF8 = b'\xef\xbb\xbf'
+
+# --- 1. Leitura dos Cabeçalhos ---
+def ler_cabecalho(caminho_arquivo):
+    """
+    Retorna (bytes da linha de cabeçalho, lista de colunas, posição do início dos dados).
+    Um eventual BOM UTF-8 é descartado do cabeçalho. Em arquivos comprimidos, a posição
+    é a do conteúdo descomprimido.
+    """
+    with abrir_entrada(caminho_arquivo) as f:
+        linha = f.readline()
+        inicio_dados = f.tell()
+    if linha.startswith(BOM_UTF8):
+        linha = linha[len(BOM_UTF8):]
+    texto = linha.decode('utf-8').rstrip('\r\n')
+    colunas = next(csv.reader([texto]), []) if texto else []
+    return linha, colunas, inicio_dados
+
+def planejar_consolidado(cabecalhos):
+    """
+    A partir de {arquivo: ler_cabecalho(arquivo)}, define as colunas do consolidado e
+    a linha de cabeçalho (em bytes, terminada em quebra de linha). O cabeçalho mais
+    frequente define a ordem das colunas (maximizando os arquivos copiados sem leitura);
+    colunas que só aparecem em outros arquivos são acrescentadas ao final.
+    """
+    frequencia = Counter(tuple(colunas) for _, colunas, _ in cabecalhos.values())
+    colunas_consolidado = list(max(frequencia, key=frequencia.get))
+    for _, colunas, _ in cabecalhos.values():
+        colunas_consolidado.extend(c for c in colunas if c not in colunas_consolidado)
+
+    # Reaproveita o cabeçalho original (byte a byte) de um arquivo compatível, se houver
+    linha_cabecalho = next((linha for linha, colunas, _ in cabecalhos.values() if colunas == colunas_consolidado), None)
+    if linha_cabecalho is None:
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator='\n').writerow(colunas_consolidado)
+        linha_cabecalho = buffer.getvalue().encode('utf-8')
+    if not linha_cabecalho.endswith(b'\n'):
+        linha_cabecalho += b'\n'
+    return colunas_consolidado, linha_cabecalho
+
+# --- 2. Cópia em Bloco ---
+def _copiar_bytes(arquivo_origem, arquivo_destino, inicio, tamanho):
+    """
+    Copia 'tamanho' bytes a partir de 'inicio' usando sendfile (quando disponível) ou cópia
+    com buffer grande. Levanta OSError se a origem acabar antes (arquivo encurtado ou
+    substituído durante a cópia).
+    """
+    arquivo_destino.flush()
+    if hasattr(os, 'sendfile'):
+        enviados = 0
+        try:
+            while enviados < tamanho:
+                n = os.sendfile(arquivo_destino.fileno(), arquivo_origem.fileno(), inicio + enviados, tamanho - enviados)
+                if n == 0:
+                    break
+                enviados += n
+        except OSError:
+            arquivo_destino.seek(0, os.SEEK_END)
+            if enviados:
+                raise
+        else:
+            # O sendfile escreve direto no descritor: reposiciona o objeto de arquivo no final
+            arquivo_destino.seek(0, os.SEEK_END)
+            if enviados < tamanho:
+                raise OSError(f"arquivo encurtado durante a cópia: {enviados} de {tamanho} bytes copiados")
+            return
+    arquivo_origem.seek(inicio)
+    copiados = 0
+    while copiados < tamanho:
+        bloco = arquivo_origem.read(min(TAMANHO_BUFFER_COPIA, tamanho - copiados))
+        if not bloco:
+            raise OSError(f"arquivo encurtado durante a cópia: {copiados} de {tamanho} bytes copiados")
+        arquivo_destino.write(bloco)
+        copiados += len(bloco)
+
+def _copiar_fluxo(caminho_arquivo, arquivo_destino, inicio):
+    """
+    Copia em blocos o conteúdo (descomprimido, se for o caso) a partir de 'inicio', para
+    entradas ou saídas comprimidas. Retorna o último byte copiado.
+    """
+    ultimo = b''
+    with abrir_entrada(caminho_arquivo) as arquivo_origem:
+        arquivo_origem.seek(inicio)
+        for bloco in iter(lambda: arquivo_origem.read(TAMANHO_BUFFER_COPIA), b''):
+            arquivo_destino.write(bloco)
+            ultimo = bloco[-1:]
+    return ultimo
+
+def _termina_com_quebra(caminho_arquivo, tamanho):
+    with open(caminho_arquivo, 'rb') as f:
+        f.seek(tamanho - 1)
+        return f.read(1) == b'\n'
+
+# --- 3. Consolidação por Concatenação de Bytes ---
+def _ler_cabecalhos(arquivos_csv):
+    cabecalhos = {}
+    for arquivo in arquivos_csv:
+        try:
+            cabecalhos[arquivo] = ler_cabecalho(arquivo)
+        except Exception as e:
+            print(f"Erro ao ler o cabeçalho do arquivo {arquivo}: {e}")
+    return cabecalhos
+
+def _concatenar_arquivos(arquivo_saida, cabecalhos, colunas_consolidado, saida_comprimida):
+    """
+    Acrescenta ao consolidado aberto os dados de cada arquivo de 'cabecalhos' (sem o
+    cabeçalho). Um arquivo que falha é retirado (a saída volta ao início dele), exceto em
+    saídas comprimidas, que não podem ser truncadas: aí a exceção é propagada.
+    Retorna ([(arquivo, início, fim) dos incluídos], arquivos copiados sem leitura).
+    """
+    incluidos = []
+    copiados_sem_leitura = 0
+    for arquivo, (_, colunas, inicio_dados) in cabecalhos.items():
+        t_arquivo = time.perf_counter()
+        inicio_arquivo = arquivo_saida.tell()
+        try:
+            if colunas == colunas_consolidado and (saida_comprimida or arquivo_comprimido(arquivo)):
+                if _copiar_fluxo(arquivo, arquivo_saida, inicio_dados) not in (b'', b'\n'):
+                    arquivo_saida.write(b'\n')
+                copiados_sem_leitura += 1
+            elif colunas == colunas_consolidado:
+                tamanho = os.path.getsize(arquivo)
+                if tamanho > inicio_dados:
+                    with open(arquivo, 'rb') as arquivo_origem:
+                        _copiar_bytes(arquivo_origem, arquivo_saida, inicio_dados, tamanho - inicio_dados)
+                    if not _termina_com_quebra(arquivo, tamanho):
+                        arquivo_saida.write(b'\n')
+                copiados_sem_leitura += 1
+            else:
+                print(f"Arquivo {arquivo} com colunas diferentes do consolidado: usando leitura com pandas.")
+                df_arquivo = pd.read_csv(arquivo, sep=',', encoding='utf-8').reindex(columns=colunas_consolidado)
+                arquivo_saida.write(df_arquivo.to_csv(index=False, header=False, sep=',', lineterminator='\n').encode('utf-8'))
+            incluidos.append((arquivo, inicio_arquivo, arquivo_saida.tell()))
+            registrar_arquivo(arquivo, time.perf_counter() - t_arquivo)
+        except Exception as e:
+            if saida_comprimida:
+                raise
+            print(f"Erro ao consolidar o arquivo {arquivo}: {e}")
+            arquivo_saida.seek(inicio_arquivo)
+            arquivo_saida.truncate()
+    return incluidos, copiados_sem_leitura
+
+@etapa_instrumentada("consolidação rápida")
+def consolidar_csvs_rapido(caminho_pasta_dados, caminho_arquivo_saida_consolidado, caminho_manifesto=None):
+    """
+    Gera o arquivo consolidado concatenando diretamente os bytes dos arquivos
+    'teste_*.csv', sem interpretá-los com o pandas. Os cabeçalhos repetidos são
+    descartados; arquivos cujas colunas não coincidem com as do consolidado
+    (ordem diferente ou colunas faltando) são lidos e reordenados pelo pandas.
+    A ordem das colunas é a do cabeçalho mais frequente entre os arquivos.
+    Entradas comprimidas são descomprimidas em fluxo, e o consolidado é comprimido se o
+    seu nome terminar em .gz, .bz2 ou .xz. Com 'caminho_manifesto', grava o manifesto
+    usado por atualizar_consolidado_rapido.
+    Retorna o número de arquivos incluídos.
+    """
+    arquivos_csv = listar_arquivos_csv(caminho_pasta_dados)
+    if not arquivos_csv:
+        print(f"Nenhum arquivo CSV encontrado no padrão 'teste_*.csv' na pasta: {caminho_pasta_dados}")
+        return 0
+
+    cabecalhos = _ler_cabecalhos(arquivos_csv)
+    if not cabecalhos:
+        print("Nenhum arquivo para consolidar.")
+        return 0
+
+    colunas_consolidado, linha_cabecalho = planejar_consolidado(cabecalhos)
+    saida_comprimida = arquivo_comprimido(caminho_arquivo_saida_consolidado)
+    # Escreve em '<saida>.tmp' e só substitui o consolidado no final: uma falha no meio da
+    # cópia não deixa um consolidado truncado que pareça válido nas próximas execuções
+    caminho_tmp = f"{caminho_arquivo_saida_consolidado}.tmp"
+    try:
+        with abrir_saida(caminho_tmp, caminho_arquivo_saida_consolidado) as arquivo_saida:
+            arquivo_saida.write(linha_cabecalho)
+            incluidos, copiados_sem_leitura = _concatenar_arquivos(arquivo_saida, cabecalhos, colunas_consolidado,
+                                                                   saida_comprimida)
+        os.replace(caminho_tmp, caminho_arquivo_saida_consolidado)
+    except Exception as e:
+        print(f"Erro ao gerar o arquivo consolidado '{caminho_arquivo_saida_consolidado}': {e}. "
+              f"O consolidado anterior (se houver) foi mantido.")
+        try:
+            os.remove(caminho_tmp)
+        except OSError:
+            pass
+        return 0
+
+    if caminho_manifesto is not None and not saida_comprimida:
+        _salvar_manifesto_consolidado(caminho_manifesto, caminho_arquivo_saida_consolidado, colunas_consolidado, incluidos)
+    print(f"Arquivo consolidado '{caminho_arquivo_saida_consolidado}' gerado por concatenação "
+          f"({copiados_sem_leitura} de {len(incluidos)} arquivo(s) copiados sem leitura).")
+    return len(incluidos)
+
+# --- 4. Atualização Incremental do Consolidado ---
+def _salvar_manifesto_consolidado(caminho_manifesto, caminho_arquivo_saida_consolidado, colunas_consolidado, incluidos):
+    """
+    Registra as colunas do consolidado, o seu tamanho e, na ordem, a impressão digital e a
+    faixa de bytes [início, fim) de cada arquivo incluído. Gravação atômica.
+    """
+    manifesto = {
+        'colunas': colunas_consolidado,
+        'tamanho': os.path.getsize(caminho_arquivo_saida_consolidado),
+        'arquivos': [dict(impressao_digital(arquivo), inicio=inicio, fim=fim) for arquivo, inicio, fim in incluidos],
+    }
+    os.makedirs(os.path.dirname(caminho_manifesto) or ".", exist_ok=True)
+    caminho_tmp = f"{caminho_manifesto}.tmp"
+    with open(caminho_tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifesto, f, ensure_ascii=False)
+    os.replace(caminho_tmp, caminho_manifesto)
+
+def _carregar_manifesto_consolidado(caminho_manifesto):
+    try:
+        with open(caminho_manifesto, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+@etapa_instrumentada("atualização do consolidado")
+def atualizar_consolidado_rapido(caminho_pasta_dados, caminho_arquivo_saida_consolidado, caminho_manifesto):
+    """
+    Mantém o consolidado em dia sem refazê-lo por inteiro: o manifesto guarda a faixa de
+    bytes de cada arquivo no consolidado; os arquivos iniciais inalterados (mesmo caminho,
+    tamanho e mtime, na mesma ordem) são mantidos, o consolidado é truncado no início do
+    primeiro arquivo novo, alterado ou removido e só os arquivos dali em diante são
+    copiados (arquivos novos no fim da lista são apenas acrescentados). O resultado é
+    idêntico ao de consolidar_csvs_rapido. Sem manifesto válido, com colunas diferentes ou
+    com saída comprimida, refaz o consolidado inteiro.
+    Retorna o número de arquivos incluídos no consolidado.
+    """
+    arquivos_csv = listar_arquivos_csv(caminho_pasta_dados)
+    if not arquivos_csv:
+        print(f"Nenhum arquivo CSV encontrado no padrão 'teste_*.csv' na pasta: {caminho_pasta_dados}")
+        return 0
+    cabecalhos = _ler_cabecalhos(arquivos_csv)
+    if not cabecalhos:
+        print("Nenhum arquivo para consolidar.")
+        return 0
+    colunas_consolidado, _ = planejar_consolidado(cabecalhos)
+
+    manifesto = _carregar_manifesto_consolidado(caminho_manifesto)
+    manifesto_valido = (
+        manifesto is not None
+        and not arquivo_comprimido(caminho_arquivo_saida_consolidado)
+        and manifesto.get('colunas') == colunas_consolidado
+        and os.path.exists(caminho_arquivo_saida_consolidado)
+        and os.path.getsize(caminho_arquivo_saida_consolidado) == manifesto.get('tamanho')
+    )
+    if not manifesto_valido:
+        return consolidar_csvs_rapido(caminho_pasta_dados, caminho_arquivo_saida_consolidado, caminho_manifesto)
+
+    # Quantos arquivos do início continuam iguais (e na mesma posição) no consolidado
+    anteriores = manifesto['arquivos']
+    atuais = list(cabecalhos)
+    mantidos = 0
+    while (mantidos < len(anteriores) and mantidos < len(atuais)
+           and {k: anteriores[mantidos][k] for k in ('caminho', 'tamanho', 'mtime_ns')} == impressao_digital(atuais[mantidos])):
+        mantidos += 1
+    if mantidos == len(anteriores) == len(atuais):
+        print(f"Arquivo consolidado '{caminho_arquivo_saida_consolidado}' já está atualizado.")
+        return len(atuais)
+    if mantidos == 0:
+        return consolidar_csvs_rapido(caminho_pasta_dados, caminho_arquivo_saida_consolidado, caminho_manifesto)
+
+    # Invalida o manifesto antes de mexer no consolidado: uma interrupção agora força a reconstrução
+    os.remove(caminho_manifesto)
+    inicio = anteriores[mantidos]['inicio'] if mantidos < len(anteriores) else manifesto['tamanho']
+    a_copiar = {arquivo: cabecalhos[arquivo] for arquivo in atuais[mantidos:]}
+    with open(caminho_arquivo_saida_consolidado, 'r+b') as arquivo_saida:
+        arquivo_saida.seek(inicio)
+        arquivo_saida.truncate()
+        novos, _ = _concatenar_arquivos(arquivo_saida, a_copiar, colunas_consolidado, saida_comprimida=False)
+    incluidos = [(anterior['caminho'], anterior['inicio'], anterior['fim']) for anterior in anteriores[:mantidos]] + novos
+    _salvar_manifesto_consolidado(caminho_manifesto, caminho_arquivo_saida_consolidado, colunas_consolidado, incluidos)
+    print(f"Arquivo consolidado '{caminho_arquivo_saida_consolidado}' atualizado: {mantidos} arquivo(s) mantido(s), "
+          f"{len(novos)} copiado(s).")
+    return len(incluidos)
+
+def iniciar_consolidacao_rapida(caminho_pasta_dados, caminho_arquivo_saida_consolidado, caminho_manifesto=None):
+    """
+    Executa a consolidação rápida em uma thread, para que ela ocorra enquanto as
+    metas são calculadas. Com 'caminho_manifesto', o consolidado é apenas atualizado
+    (ver atualizar_consolidado_rapido). Retorna a thread já iniciada (use join() para aguardar).
+    """
+    def _executar():
+        try:
+            if caminho_manifesto is not None:
+                atualizar_consolidado_rapido(caminho_pasta_dados, caminho_arquivo_saida_consolidado, caminho_manifesto)
+            else:
+                consolidar_csvs_rapido(caminho_pasta_dados, caminho_arquivo_saida_consolidado)
+        except Exception as e:
+            print(f"Erro na consolidação rápida: {e}")
+
+    thread = threading.Thread(target=_executar, name="consolidacao_rapida")
+    thread.start()
+    return thread
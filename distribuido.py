@@ -0,0 +1,299 @@
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import socketserver
+import struct
+import threading
+import time
+from collections import deque
+
+from motor_metas import combinar_parciais, gerar_resumo_metas
+from incremental import parciais_de_json, parciais_para_json
+from leitor_mmap import agregar_arquivo_mmap
+from instrumentacao import etapa_instrumentada, iniciar_metricas, registrar_item, salvar_metricas
+from compressao import listar_arquivos_csv
+
+# --- Configurações da Execução Distribuída ---
+PASTA_DOS_CSVS = "./Dados"
+PASTA_SAIDA = "./Saida"
+NOME_ARQUIVO_RESUMO_METAS = "ResumoMetas.csv"
+HOST = "127.0.0.1"      # use 0.0.0.0 para aceitar workers de outras máquinas
+PORTA = 8766
+MAX_TENTATIVAS = 3      # tentativas por shard (arquivo) antes de desistir dele
+TEMPO_LIMITE_TAREFA_S = 600
+TEMPO_CONEXAO_WORKER_S = 30
+TEMPO_ESPERA_WORKERS_S = 60  # sem nenhum worker ativo por esse tempo, com shards pendentes, a execução é abortada
+_CABECALHO = struct.Struct('!I')
+
+# --- 1. Protocolo (JSON com prefixo de tamanho sobre TCP) ---
+def _enviar(conexao, mensagem):
+    dados = json.dumps(mensagem, ensure_ascii=False).encode('utf-8')
+    conexao.sendall(_CABECALHO.pack(len(dados)) + dados)
+
+def _receber_exato(conexao, tamanho):
+    partes = []
+    while tamanho:
+        parte = conexao.recv(min(tamanho, 1024 * 1024))
+        if not parte:
+            raise ConnectionError("conexão encerrada")
+        partes.append(parte)
+        tamanho -= len(parte)
+    return b''.join(partes)
+
+def _receber(conexao):
+    (tamanho,) = _CABECALHO.unpack(_receber_exato(conexao, _CABECALHO.size))
+    return json.loads(_receber_exato(conexao, tamanho).decode('utf-8'))
+
+# --- 2. Worker ---
+def _caminho_no_worker(pasta_dados, arquivo_relativo):
+    """Caminho local do shard; recusa caminhos que saiam da pasta de dados do worker."""
+    pasta = os.path.abspath(pasta_dados)
+    caminho = os.path.abspath(os.path.join(pasta, arquivo_relativo))
+    if os.path.commonpath([pasta, caminho]) != pasta:
+        raise ValueError(f"caminho fora da pasta de dados: {arquivo_relativo}")
+    return caminho
+
+def executar_worker(host, porta, pasta_dados=PASTA_DOS_CSVS, nome=None):
+    """
+    Conecta ao coordenador e processa shards até receber 'fim': para cada arquivo
+    (caminho relativo à 'pasta_dados' deste worker) devolve só os agregados por tribunal.
+    """
+    nome = nome or f"{socket.gethostname()}:{os.getpid()}"
+    limite = time.monotonic() + TEMPO_CONEXAO_WORKER_S
+    while True:
+        try:
+            conexao = socket.create_connection((host, porta))
+            break
+        except OSError as e:
+            if time.monotonic() > limite:
+                print(f"Worker '{nome}': não foi possível conectar ao coordenador {host}:{porta}: {e}")
+                return
+            time.sleep(0.5)
+
+    shards = 0
+    with conexao:
+        try:
+            _enviar(conexao, {'tipo': 'ola', 'nome': nome})
+            while True:
+                mensagem = _receber(conexao)
+                if mensagem.get('tipo') != 'tarefa':
+                    break
+                t = time.perf_counter()
+                try:
+                    df_parciais, linhas = agregar_arquivo_mmap(_caminho_no_worker(pasta_dados, mensagem['arquivo']))
+                    resposta = {'tipo': 'resultado', 'id': mensagem['id'], 'linhas': linhas,
+                                'parciais': parciais_para_json(df_parciais) if df_parciais is not None else {}}
+                except Exception as e:
+                    resposta = {'tipo': 'erro', 'id': mensagem['id'], 'mensagem': str(e)}
+                resposta['segundos'] = time.perf_counter() - t
+                _enviar(conexao, resposta)
+                shards += 1
+        except (OSError, ConnectionError, ValueError) as e:
+            print(f"Worker '{nome}': conexão com o coordenador perdida: {e}")
+    print(f"Worker '{nome}' encerrado após {shards} shard(s).")
+
+# --- 3. Coordenador ---
+class _EstadoShards:
+    """Fila de shards com reatribuição: um shard volta à fila se o worker falhar ou morrer."""
+
+    def __init__(self, arquivos_csv, max_tentativas=MAX_TENTATIVAS):
+        self.arquivos_csv = arquivos_csv
+        self.max_tentativas = max_tentativas
+        self.pendentes = deque(range(len(arquivos_csv)))
+        self.em_andamento = {}
+        self.resultados = {}
+        self.tentativas = {}
+        self.desistidos = set()
+        self.conectados = 0
+        self.condicao = threading.Condition()
+
+    def terminado(self):
+        return not self.pendentes and not self.em_andamento
+
+    def proximo(self, worker):
+        """Próximo shard para o 'worker' ou None quando não há mais nada a fazer."""
+        with self.condicao:
+            # Sem pendentes, espera os em andamento: se algum falhar, volta para a fila
+            while not self.pendentes and self.em_andamento:
+                self.condicao.wait()
+            if not self.pendentes:
+                return None
+            indice = self.pendentes.popleft()
+            self.em_andamento[indice] = worker
+            return indice
+
+    def conectar(self):
+        with self.condicao:
+            self.conectados += 1
+            self.condicao.notify_all()
+
+    def desconectar(self):
+        with self.condicao:
+            self.conectados -= 1
+            self.condicao.notify_all()
+
+    def concluir(self, indice, resultado):
+        with self.condicao:
+            self.em_andamento.pop(indice, None)
+            self.resultados[indice] = resultado
+            self.condicao.notify_all()
+
+    def devolver(self, indice, motivo):
+        with self.condicao:
+            self.em_andamento.pop(indice, None)
+            self.tentativas[indice] = self.tentativas.get(indice, 0) + 1
+            arquivo = self.arquivos_csv[indice]
+            if self.tentativas[indice] >= self.max_tentativas:
+                self.desistidos.add(indice)
+                print(f"Erro: shard {arquivo} falhou {self.tentativas[indice]} vez(es) ({motivo}). Shard ignorado.")
+            else:
+                # Vai para o fim da fila, para ter a chance de cair em outro worker
+                self.pendentes.append(indice)
+                print(f"Alerta: shard {arquivo} será reatribuído ({motivo}).")
+            self.condicao.notify_all()
+
+def _criar_manipulador(estado, pasta_dados, tempo_limite_tarefa):
+    class ManipuladorWorker(socketserver.BaseRequestHandler):
+        def handle(self):
+            conexao = self.request
+            conexao.settimeout(tempo_limite_tarefa)
+            try:
+                nome = _receber(conexao).get('nome') or f"{self.client_address[0]}:{self.client_address[1]}"
+            except (OSError, ConnectionError, ValueError):
+                return
+            print(f"Worker '{nome}' conectado.")
+            estado.conectar()
+            try:
+                self._atender(conexao, nome)
+            finally:
+                estado.desconectar()
+
+        def _atender(self, conexao, nome):
+            while True:
+                indice = estado.proximo(nome)
+                if indice is None:
+                    try:
+                        _enviar(conexao, {'tipo': 'fim'})
+                    except OSError:
+                        pass
+                    return
+                arquivo = estado.arquivos_csv[indice]
+                try:
+                    _enviar(conexao, {'tipo': 'tarefa', 'id': indice, 'arquivo': os.path.relpath(arquivo, pasta_dados)})
+                    resposta = _receber(conexao)
+                except (OSError, ConnectionError, ValueError) as e:
+                    estado.devolver(indice, f"worker '{nome}' perdido: {str(e) or type(e).__name__}")
+                    return
+                if resposta.get('tipo') == 'resultado' and resposta.get('id') == indice:
+                    resposta['worker'] = nome
+                    estado.concluir(indice, resposta)
+                else:
+                    estado.devolver(indice, f"erro no worker '{nome}': {resposta.get('mensagem')}")
+
+    return ManipuladorWorker
+
+class _ServidorCoordenador(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+@etapa_instrumentada("coordenador distribuído")
+def coordenar(caminho_pasta_dados, caminho_arquivo_saida_resumo, host=HOST, porta=PORTA, workers_locais=0,
+              max_tentativas=MAX_TENTATIVAS, tempo_limite_tarefa=TEMPO_LIMITE_TAREFA_S,
+              tempo_espera_workers=TEMPO_ESPERA_WORKERS_S):
+    """
+    Distribui os 'teste_*.csv' (um shard por arquivo) entre os workers que se conectarem
+    por TCP, reatribuindo os shards de workers que falharem ou morrerem, combina os
+    agregados na ordem dos arquivos e gera o ResumoMetas.csv. Com 'workers_locais',
+    sobe esse número de workers neste computador (útil para testes em localhost).
+    Se nenhum worker ficar ativo (conectado ou local ainda vivo) por 'tempo_espera_workers'
+    segundos com shards pendentes, a execução é abortada sem gerar o resumo.
+    Retorna o DataFrame do resumo das metas (ou None).
+    """
+    arquivos_csv = listar_arquivos_csv(caminho_pasta_dados)
+    if not arquivos_csv:
+        print(f"Nenhum arquivo CSV encontrado no padrão 'teste_*.csv' na pasta: {caminho_pasta_dados}")
+        return None
+
+    estado = _EstadoShards(arquivos_csv, max_tentativas)
+    servidor = _ServidorCoordenador((host, porta), _criar_manipulador(estado, caminho_pasta_dados, tempo_limite_tarefa))
+    host_real, porta_real = servidor.server_address[:2]
+    print(f"Coordenador em {host_real}:{porta_real} com {len(arquivos_csv)} shard(s). "
+          f"Workers: python distribuido.py worker --coordenador {host_real}:{porta_real} --dados <pasta>")
+
+    # Os workers locais são criados antes da thread do servidor (fork com threads ativas pode travar);
+    # o socket já está escutando, então as conexões aguardam na fila até o serve_forever
+    processos = [multiprocessing.Process(target=executar_worker, name=f"worker_local_{n}",
+                                         args=(host_real, porta_real, caminho_pasta_dados, f"local_{n}"))
+                 for n in range(workers_locais)]
+    for processo in processos:
+        processo.start()
+    threading.Thread(target=servidor.serve_forever, name="coordenador", daemon=True).start()
+    sem_workers_desde = None
+    try:
+        with estado.condicao:
+            while not estado.terminado():
+                estado.condicao.wait(timeout=1.0)
+                if estado.conectados or any(processo.is_alive() for processo in processos):
+                    sem_workers_desde = None
+                elif sem_workers_desde is None:
+                    sem_workers_desde = time.monotonic()
+                elif time.monotonic() - sem_workers_desde > tempo_espera_workers:
+                    break
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+        for processo in processos:
+            processo.join(timeout=TEMPO_CONEXAO_WORKER_S)
+
+    if not estado.terminado():
+        faltantes = len(arquivos_csv) - len(estado.resultados) - len(estado.desistidos)
+        print(f"Erro: nenhum worker ativo há mais de {tempo_espera_workers:g}s e {faltantes} shard(s) ainda sem "
+              f"resultado. Execução distribuída abortada; o ResumoMetas não foi gerado.")
+        return None
+
+    lista_parciais = []
+    for indice, arquivo in enumerate(arquivos_csv):
+        resultado = estado.resultados.get(indice)
+        if resultado is None:
+            continue
+        registrar_item('shard', arquivo, resultado['segundos'], resultado['linhas'], os.path.getsize(arquivo))
+        lista_parciais.append(parciais_de_json(resultado['parciais']))
+    workers = sorted({r['worker'] for r in estado.resultados.values()})
+    print(f"{len(estado.resultados)} de {len(arquivos_csv)} shard(s) processado(s) por {len(workers)} worker(s); "
+          f"{sum(estado.tentativas.values())} reatribuição(ões)/falha(s).")
+    return gerar_resumo_metas(combinar_parciais(lista_parciais), caminho_arquivo_saida_resumo)
+
+# --- Função Principal (Main) ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cálculo das metas distribuído entre workers via TCP.")
+    subparsers = parser.add_subparsers(dest="papel", required=True)
+    parser_coordenador = subparsers.add_parser("coordenador", help="Distribui os shards e gera o ResumoMetas.csv")
+    parser_coordenador.add_argument("--dados", default=PASTA_DOS_CSVS, help="Pasta dos arquivos teste_*.csv")
+    parser_coordenador.add_argument("--saida", default=PASTA_SAIDA, help="Pasta de saída")
+    parser_coordenador.add_argument("--host", default=HOST, help="Endereço de escuta (0.0.0.0 para outras máquinas)")
+    parser_coordenador.add_argument("--porta", type=int, default=PORTA, help="Porta TCP (0 = qualquer livre)")
+    parser_coordenador.add_argument("--workers-locais", type=int, default=0, help="Workers a iniciar nesta máquina")
+    parser_coordenador.add_argument("--tentativas", type=int, default=MAX_TENTATIVAS, help="Tentativas por shard")
+    parser_coordenador.add_argument("--tempo-limite", type=float, default=TEMPO_LIMITE_TAREFA_S,
+                                    help="Segundos sem resposta até considerar o worker perdido")
+    parser_coordenador.add_argument("--espera-workers", type=float, default=TEMPO_ESPERA_WORKERS_S,
+                                    help="Segundos sem nenhum worker ativo até abortar a execução")
+    parser_worker = subparsers.add_parser("worker", help="Processa shards enviados pelo coordenador")
+    parser_worker.add_argument("--coordenador", default=f"{HOST}:{PORTA}", help="host:porta do coordenador")
+    parser_worker.add_argument("--dados", default=PASTA_DOS_CSVS, help="Pasta local com os mesmos teste_*.csv")
+    parser_worker.add_argument("--nome", default=None, help="Nome do worker nas mensagens")
+    args = parser.parse_args()
+
+    if args.papel == "worker":
+        host, _, porta = args.coordenador.rpartition(':')
+        executar_worker(host, int(porta), args.dados, args.nome)
+    else:
+        os.makedirs(args.saida, exist_ok=True)
+        iniciar_metricas("distribuido.py", args.saida)
+        print("Iniciando processamento distribuído (distribuido.py)...")
+        coordenar(args.dados, os.path.join(args.saida, NOME_ARQUIVO_RESUMO_METAS), args.host, args.porta,
+                  args.workers_locais, args.tentativas, args.tempo_limite, args.espera_workers)
+        print("Processamento concluído.")
+        salvar_metricas()
@@ -0,0 +1,113 @@
+import csv
+import math
+import mmap
+import os
+
+import numpy as np
+
+from motor_metas import COLUNAS_NECESSARIAS
+from leitor_mmap import agregar_arquivo_mmap, agregar_bytes
+from compressao import arquivo_comprimido
+
+# --- Configurações da Divisão de Arquivos ---
+TAMANHO_MINIMO_FAIXA = 8 * 1024**2
+FAIXAS_POR_PROCESSO = 4   # faixas por processo: sobra trabalho para quem terminar antes
+TAMANHO_BLOCO_ASPAS = 16 * 1024**2
+ASPAS = ord('"')
+
+# --- 1. Pontos de Corte ---
+def _aspas_impares(dados, inicio, fim):
+    """Se o trecho [inicio, fim) tem um número ímpar de aspas (contadas em blocos)."""
+    total = 0
+    for posicao in range(inicio, fim, TAMANHO_BLOCO_ASPAS):
+        total += np.count_nonzero(dados[posicao:min(posicao + TAMANHO_BLOCO_ASPAS, fim)] == ASPAS)
+    return total & 1
+
+def _pontos_de_corte(mapa, inicio_dados, alvos):
+    """
+    Desloca cada alvo para logo após a próxima quebra de linha FORA de aspas (uma quebra
+    dentro de um campo entre aspas não encerra a linha), contando a paridade das
+    aspas desde o início dos dados em uma única passada.
+    """
+    dados = np.frombuffer(mapa, dtype=np.uint8)
+    cortes = []
+    posicao, dentro_de_aspas = inicio_dados, 0
+    try:
+        for alvo in alvos:
+            if alvo <= posicao:
+                continue
+            dentro_de_aspas ^= _aspas_impares(dados, posicao, alvo)
+            posicao = alvo
+            while True:
+                quebra = mapa.find(b'\n', posicao)
+                if quebra == -1:
+                    return cortes
+                dentro_de_aspas ^= _aspas_impares(dados, posicao, quebra)
+                posicao = quebra + 1
+                if not dentro_de_aspas:
+                    cortes.append(posicao)
+                    break
+    finally:
+        del dados
+    return cortes
+
+def dividir_arquivo(caminho_arquivo, tamanho_faixa):
+    """
+    Divide o arquivo em faixas de bytes de ~'tamanho_faixa' alinhadas ao fim de linhas.
+    Retorna (linha de cabeçalho em bytes, [(inicio, fim), ...]); arquivos pequenos ou
+    sem as colunas das metas ficam em uma única faixa, assim como os comprimidos (que não
+    permitem acesso direto a uma posição; o cabeçalho volta vazio).
+    """
+    tamanho = os.path.getsize(caminho_arquivo)
+    if arquivo_comprimido(caminho_arquivo):
+        return b'', [(0, tamanho)]
+    with open(caminho_arquivo, 'rb') as f:
+        cabecalho = f.readline()
+    inicio_dados = len(cabecalho)
+    if tamanho - inicio_dados <= tamanho_faixa:
+        return cabecalho, [(inicio_dados, tamanho)]
+    try:
+        colunas = next(csv.reader([cabecalho.decode('utf-8-sig').rstrip('\r\n')]), [])
+    except UnicodeDecodeError:
+        colunas = []
+    if any(c not in colunas for c in COLUNAS_NECESSARIAS):
+        return cabecalho, [(inicio_dados, tamanho)]
+
+    with open(caminho_arquivo, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+        cortes = _pontos_de_corte(mapa, inicio_dados, range(inicio_dados + tamanho_faixa, tamanho, tamanho_faixa))
+    limites = [inicio_dados] + [c for c in cortes if c < tamanho] + [tamanho]
+    return cabecalho, list(zip(limites[:-1], limites[1:]))
+
+# --- 2. Planejamento e Execução das Faixas ---
+def planejar_faixas(arquivos_csv, num_processos):
+    """
+    Divide todos os arquivos em faixas de tamanho parecido, calculado a partir do total
+    de bytes e do número de processos (e não do número de arquivos), para balancear a
+    carga mesmo quando um arquivo domina. Retorna tarefas (indice_arquivo, indice_faixa,
+    arquivo, inicio, fim, cabecalho), as maiores primeiro.
+    """
+    total_bytes = sum(os.path.getsize(arquivo) for arquivo in arquivos_csv)
+    tamanho_faixa = max(TAMANHO_MINIMO_FAIXA, math.ceil(total_bytes / (num_processos * FAIXAS_POR_PROCESSO)))
+    tarefas = []
+    for i, arquivo in enumerate(arquivos_csv):
+        try:
+            cabecalho, faixas = dividir_arquivo(arquivo, tamanho_faixa)
+        except OSError as e:
+            print(f"Erro ao ler o arquivo {arquivo}: {e}")
+            continue
+        tarefas += [(i, j, arquivo, inicio, fim, cabecalho) for j, (inicio, fim) in enumerate(faixas)]
+    return sorted(tarefas, key=lambda tarefa: tarefa[4] - tarefa[3], reverse=True)
+
+def agregar_faixa(caminho_arquivo, inicio, fim, cabecalho):
+    """
+    Função "trabalhadora": lê a faixa [inicio, fim) do arquivo, com o cabeçalho na frente,
+    e devolve (agregados por tribunal, número de linhas) da faixa. Um arquivo comprimido
+    fica sempre em uma única faixa (os codecs não permitem começar a leitura no meio) e
+    é descomprimido em fluxo, em blocos de tamanho fixo.
+    """
+    if arquivo_comprimido(caminho_arquivo):
+        return agregar_arquivo_mmap(caminho_arquivo)
+    with open(caminho_arquivo, 'rb') as f:
+        f.seek(inicio)
+        dados = cabecalho + f.read(fim - inicio)
+    return agregar_bytes(dados, caminho_arquivo)
@@ -0,0 +1,86 @@
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from instrumentacao import registrar_item
+
+# --- Configurações do Escalonador ---
+TAREFAS_EM_VOO_POR_PROCESSO = 2   # uma em execução e uma já na fila de cada processo
+
+def executar_no_worker(funcao, *args):
+    """Como executar_medindo, devolvendo também o PID do processo: (resultado, segundos, pid)."""
+    t = time.perf_counter()
+    resultado = funcao(*args)
+    return resultado, time.perf_counter() - t, os.getpid()
+
+# --- 1. Escalonamento das Tarefas ---
+class Escalonador:
+    """
+    Submete tarefas a um pool da maior para a menor (em linhas ou bytes), para que as grandes não
+    fiquem para o fim, com no máximo 'max_em_voo' tarefas submetidas e não concluídas e,
+    com 'limite_bytes', sem passar desse total de bytes estimados em voo. Os argumentos de
+    cada tarefa só são montados na submissão, então só as cópias em voo ocupam memória.
+    Acumula o tempo ocupado de cada processo do pool para o relatório de utilização.
+    """
+
+    def __init__(self, executor, max_em_voo=None, limite_bytes=None):
+        self.executor = executor
+        self.max_em_voo = max_em_voo or executor._max_workers * TAREFAS_EM_VOO_POR_PROCESSO
+        self.limite_bytes = limite_bytes
+        self.ocupacao = {}
+        self.pico_em_voo = 0
+        self.pico_bytes_em_voo = 0
+        self.esperas_por_memoria = 0
+        self._inicio = self._fim = None
+
+    def executar(self, tarefas, funcao):
+        """
+        'tarefas': (chave, tamanho, bytes estimados, montar_argumentos), submetidas em ordem
+        decrescente de tamanho. Gera (chave, future) à medida que as tarefas concluem; o
+        future devolve (resultado, segundos, pid).
+        Uma tarefa maior que 'limite_bytes' é submetida sozinha.
+        """
+        fila = sorted(tarefas, key=lambda tarefa: tarefa[1], reverse=True)
+        proxima = 0
+        em_voo = {}
+        bytes_em_voo = 0
+        self._inicio = time.perf_counter()
+        while proxima < len(fila) or em_voo:
+            while proxima < len(fila) and len(em_voo) < self.max_em_voo:
+                chave, _, num_bytes, montar_argumentos = fila[proxima]
+                if em_voo and self.limite_bytes is not None and bytes_em_voo + num_bytes > self.limite_bytes:
+                    self.esperas_por_memoria += 1
+                    break
+                future = self.executor.submit(executar_no_worker, funcao, *montar_argumentos())
+                em_voo[future] = (chave, num_bytes)
+                bytes_em_voo += num_bytes
+                proxima += 1
+                self.pico_em_voo = max(self.pico_em_voo, len(em_voo))
+                self.pico_bytes_em_voo = max(self.pico_bytes_em_voo, bytes_em_voo)
+
+            concluidas, _ = wait(em_voo, return_when=FIRST_COMPLETED)
+            for future in concluidas:
+                chave, num_bytes = em_voo.pop(future)
+                bytes_em_voo -= num_bytes
+                if future.exception() is None:
+                    _, segundos, pid = future.result()
+                    self.ocupacao[pid] = self.ocupacao.get(pid, 0.0) + segundos
+                yield chave, future
+        self._fim = time.perf_counter()
+
+    # --- 2. Relatório de Utilização ---
+    def relatar(self):
+        """
+        Imprime o pico em voo e a utilização (tempo ocupado / duração) de cada processo,
+        que também vai para as métricas da etapa (itens do tipo 'processo'). Retorna {pid: fração}.
+        """
+        duracao = (self._fim or time.perf_counter()) - (self._inicio or time.perf_counter())
+        utilizacao = {pid: (ocupado / duracao if duracao > 0 else 0.0) for pid, ocupado in sorted(self.ocupacao.items())}
+        limite = f"{self.limite_bytes / 1024**2:.1f} MB" if self.limite_bytes is not None else "sem limite"
+        print(f"Escalonamento: pico de {self.pico_em_voo} tarefa(s) em voo (máximo {self.max_em_voo}), "
+              f"{self.pico_bytes_em_voo / 1024**2:.1f} MB estimados em voo ({limite}, "
+              f"{self.esperas_por_memoria} espera(s) por memória), duração {duracao:.2f}s.")
+        for pid, fracao in utilizacao.items():
+            print(f"  Processo {pid}: ocupado {self.ocupacao[pid]:.2f}s ({fracao:.0%}).")
+            registrar_item('processo', pid, self.ocupacao[pid])
+        return utilizacao
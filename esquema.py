@@ -0,0 +1,163 @@
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from motor_metas import COLUNAS_CONTADORES, COLUNAS_NECESSARIAS
+from compressao import arquivo_comprimido
+from instrumentacao import executar_medindo
+
+# --- Esquema dos Arquivos de Entrada ---
+# Colunas-chave lidas como categóricas; contadores reduzidos para int32 quando cabem.
+COLUNAS_CATEGORICAS = ['sigla_tribunal', 'ramo_justica']
+DTYPES_LEITURA = {coluna: 'category' for coluna in COLUNAS_CATEGORICAS}
+
+# Linhas por bloco na leitura em blocos (ler_colunas_metas_em_blocos)
+LINHAS_POR_BLOCO = 100_000
+
+# Imprime o uso de memória (antes/depois do esquema compacto) em cada etapa
+RELATORIO_MEMORIA = False
+
+# --- 1. Tipos Compactos ---
+def reduzir_contador(serie):
+    """
+    Converte um contador para o menor tipo seguro: int32 quando todos os valores cabem,
+    int64 caso contrário e float64 quando há valores ausentes ou fracionários.
+    (O read_csv com dtype int32 não detecta estouro, por isso a verificação é feita aqui.)
+    Valores não numéricos viram NaN; a quantidade convertida é avisada com um alerta.
+    """
+    valores = serie.to_numpy()
+    if valores.dtype.kind not in 'iuf':
+        valores = pd.to_numeric(serie, errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+        convertidos = int((np.isnan(valores) & serie.notna().to_numpy()).sum())
+        if convertidos:
+            print(f"Alerta: {convertidos} valor(es) não numérico(s) na coluna '{serie.name}' foram convertidos para NaN.")
+    if valores.dtype.kind == 'f':
+        if np.isnan(valores).any() or not np.array_equal(valores, np.round(valores)):
+            return pd.Series(valores.astype('float64'), index=serie.index, name=serie.name)
+        valores = valores.astype('int64')
+    info = np.iinfo('int32')
+    if valores.size == 0 or (valores.min() >= info.min and valores.max() <= info.max):
+        return pd.Series(valores.astype('int32'), index=serie.index, name=serie.name)
+    return pd.Series(valores.astype('int64'), index=serie.index, name=serie.name)
+
+def aplicar_esquema(df):
+    """Aplica o esquema compacto (chaves categóricas, contadores estreitos) às colunas presentes."""
+    for coluna in COLUNAS_CATEGORICAS:
+        if coluna in df.columns and not isinstance(df[coluna].dtype, pd.CategoricalDtype):
+            df[coluna] = df[coluna].astype('category')
+    for coluna in COLUNAS_CONTADORES:
+        if coluna in df.columns:
+            df[coluna] = reduzir_contador(df[coluna])
+    return df
+
+# --- 2. Leitura com Esquema ---
+def ler_csv_compacto(caminho_arquivo, colunas=None):
+    """
+    Lê um CSV aplicando o esquema compacto. Com 'colunas', lê apenas essas colunas
+    (as ausentes no arquivo são ignoradas).
+    """
+    usecols = (lambda c: c in colunas) if colunas is not None else None
+    df = pd.read_csv(caminho_arquivo, sep=',', encoding='utf-8', usecols=usecols, dtype=DTYPES_LEITURA)
+    return aplicar_esquema(df)
+
+def ler_colunas_metas(caminho_arquivo, nome_arquivo=None):
+    """
+    Lê do CSV apenas as colunas usadas no cálculo das metas, já no esquema compacto.
+    'caminho_arquivo' também pode ser um buffer já lido (ex.: io.BytesIO), com o nome
+    do arquivo em 'nome_arquivo' para as mensagens.
+    Retorna None (com alerta) se alguma delas estiver ausente.
+    """
+    df = ler_csv_compacto(caminho_arquivo, COLUNAS_NECESSARIAS)
+    colunas_faltantes = [c for c in COLUNAS_NECESSARIAS if c not in df.columns]
+    if colunas_faltantes:
+        print(f"Alerta: Arquivo {nome_arquivo or caminho_arquivo} não contém as colunas {colunas_faltantes}. Arquivo ignorado.")
+        return None
+    return df[COLUNAS_NECESSARIAS]
+
+def ler_colunas_metas_em_blocos(caminho_arquivo, linhas_por_bloco=LINHAS_POR_BLOCO):
+    """
+    Como ler_colunas_metas, em blocos de 'linhas_por_bloco' linhas (o pandas lê o arquivo,
+    inclusive comprimido, em fluxo): gera um DataFrame por bloco. Não gera nenhum (com
+    alerta) se alguma das colunas estiver ausente.
+    """
+    usecols = lambda c: c in COLUNAS_NECESSARIAS
+    with pd.read_csv(caminho_arquivo, sep=',', encoding='utf-8', usecols=usecols, dtype=DTYPES_LEITURA,
+                     chunksize=linhas_por_bloco) as leitor:
+        for df_bloco in leitor:
+            colunas_faltantes = [c for c in COLUNAS_NECESSARIAS if c not in df_bloco.columns]
+            if colunas_faltantes:
+                print(f"Alerta: Arquivo {caminho_arquivo} não contém as colunas {colunas_faltantes}. Arquivo ignorado.")
+                return
+            yield aplicar_esquema(df_bloco)[COLUNAS_NECESSARIAS]
+
+def ler_arquivos_em_ordem(arquivos_csv, num_threads=None):
+    """
+    Gera (arquivo, DataFrame compacto, segundos) para cada arquivo, na ordem, ou (arquivo,
+    None, exceção) se a leitura falhar. Arquivos comprimidos (.gz, .bz2, .xz) são
+    descomprimidos em fluxo pelo pandas; como a descompressão domina a leitura, os próximos
+    deles (um por thread) são lidos à frente em threads, enquanto os demais são lidos aqui,
+    na ordem.
+    """
+    # Threads em vez de processos: zlib, lzma e bz2 liberam o GIL durante a descompressão,
+    # e assim os DataFrames lidos não precisam ser serializados (pickle) de volta do pool
+    a_descomprimir = deque(arquivo for arquivo in arquivos_csv if arquivo_comprimido(arquivo))
+    num_threads = num_threads or os.cpu_count() or 1
+    with (ThreadPoolExecutor(max_workers=num_threads) if a_descomprimir else nullcontext()) as executor:
+        if a_descomprimir:
+            print(f"Descomprimindo {len(a_descomprimir)} arquivo(s) com {num_threads} thread(s) à frente...")
+        futures = {}
+        for arquivo in arquivos_csv:
+            # Só 'num_threads' comprimidos lidos à frente: limita os DataFrames em memória
+            while a_descomprimir and len(futures) < num_threads:
+                proximo = a_descomprimir.popleft()
+                futures[proximo] = executor.submit(executar_medindo, ler_csv_compacto, proximo)
+            t_arquivo = time.perf_counter()
+            try:
+                if arquivo in futures:
+                    df_arquivo, segundos = futures.pop(arquivo).result()
+                else:
+                    df_arquivo = ler_csv_compacto(arquivo)
+                    segundos = time.perf_counter() - t_arquivo
+            except Exception as e:
+                yield arquivo, None, e
+                continue
+            yield arquivo, df_arquivo, segundos
+
+def concatenar_compacto(lista_de_dfs):
+    """
+    Concatena DataFrames mantendo as chaves categóricas (com a união ordenada das
+    categorias); sem isso o pd.concat converteria as colunas de volta para texto.
+    """
+    for coluna in COLUNAS_CATEGORICAS:
+        series = [df[coluna] for df in lista_de_dfs if coluna in df.columns]
+        if not series or not all(isinstance(s.dtype, pd.CategoricalDtype) for s in series):
+            continue
+        categorias = union_categoricals(series, sort_categories=True).categories
+        for df in lista_de_dfs:
+            if coluna in df.columns:
+                df[coluna] = df[coluna].cat.set_categories(categorias)
+    return pd.concat(lista_de_dfs, ignore_index=True)
+
+# --- 3. Relatório de Memória ---
+def memoria_mb(df):
+    """Memória ocupada pelo DataFrame (incluindo o conteúdo das strings), em MB."""
+    return df.memory_usage(deep=True).sum() / 1024**2
+
+def relatar_memoria(df, etapa):
+    """
+    Imprime a memória do DataFrame compacto e a que ele ocuparia com os tipos
+    inferidos pelo pandas (texto e int64), quando RELATORIO_MEMORIA está ativo.
+    """
+    if not RELATORIO_MEMORIA or df is None:
+        return
+    tipos_inferidos = {c: object for c in COLUNAS_CATEGORICAS if c in df.columns}
+    tipos_inferidos.update({c: 'int64' for c in COLUNAS_CONTADORES if c in df.columns and df[c].dtype == 'int32'})
+    antes = memoria_mb(df.astype(tipos_inferidos))
+    depois = memoria_mb(df)
+    print(f"Memória ({etapa}): {antes:.1f} MB com tipos inferidos -> {depois:.1f} MB com esquema compacto.")
@@ -0,0 +1,109 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from motor_metas import TABELA_MULTIPLICADORES
+
+# --- Configurações Padrão do Gerador ---
+# Proporção de tribunais por ramo (aproximadamente a do Poder Judiciário)
+MIX_RAMOS_PADRAO = {
+    "Justiça Estadual": 27,
+    "Justiça do Trabalho": 24,
+    "Justiça Federal": 6,
+    "Justiça Militar da União": 1,
+    "Justiça Militar Estadual": 3,
+    "Tribunal Superior Eleitoral": 1,
+    "Tribunal Superior do Trabalho": 1,
+    "Superior Tribunal de Justiça": 1,
+}
+PREFIXO_SIGLA = {
+    "Justiça Estadual": "TJ", "Justiça do Trabalho": "TRT", "Justiça Federal": "TRF",
+    "Justiça Militar da União": "STM", "Justiça Militar Estadual": "TJM",
+    "Tribunal Superior Eleitoral": "TSE", "Tribunal Superior do Trabalho": "TST",
+    "Superior Tribunal de Justiça": "STJ",
+}
+
+# --- 1. Tribunais Sintéticos ---
+def gerar_tribunais(num_tribunais, mix_ramos=None):
+    """Distribui 'num_tribunais' entre os ramos segundo 'mix_ramos' e cria as siglas."""
+    mix_ramos = mix_ramos or MIX_RAMOS_PADRAO
+    ramos = list(mix_ramos)
+    pesos = np.array([mix_ramos[r] for r in ramos], dtype=float)
+    quantidades = np.floor(pesos / pesos.sum() * num_tribunais).astype(int)
+    # Distribui o resto pelos ramos de maior peso
+    for i in np.argsort(-pesos)[:num_tribunais - quantidades.sum()]:
+        quantidades[i] += 1
+
+    tribunais = []
+    for ramo, quantidade in zip(ramos, quantidades):
+        prefixo = PREFIXO_SIGLA.get(ramo, "TR")
+        for i in range(quantidade):
+            tribunais.append((f"{prefixo}{i + 1}", ramo))
+    return tribunais
+
+# --- 2. Geração dos Arquivos ---
+def gerar_dados(pasta_destino, num_tribunais=90, mix_ramos=None, linhas_por_tribunal=1000,
+                num_arquivos=10, assimetria=0.0, semente=42):
+    """
+    Gera 'num_arquivos' arquivos 'teste_*.csv' em 'pasta_destino' no formato da base de
+    dados, com linhas de cada tribunal espalhadas por todos os arquivos.
+    'assimetria' é o expoente de Zipf do tamanho dos tribunais (0 = todos iguais):
+    o total de linhas é num_tribunais * linhas_por_tribunal.
+    Retorna o total de linhas geradas.
+    """
+    rng = np.random.default_rng(semente)
+    os.makedirs(pasta_destino, exist_ok=True)
+    tribunais = gerar_tribunais(num_tribunais, mix_ramos)
+    siglas = np.array([s for s, _ in tribunais], dtype=object)
+    ramos = np.array([r for _, r in tribunais], dtype=object)
+
+    pesos = 1.0 / np.arange(1, len(tribunais) + 1) ** assimetria
+    pesos = rng.permutation(pesos)
+    total_linhas = len(tribunais) * linhas_por_tribunal
+    linhas_tribunal = rng.multinomial(total_linhas, pesos / pesos.sum())
+    indice_tribunal = rng.permutation(np.repeat(np.arange(len(tribunais)), linhas_tribunal))
+
+    for numero, indices in enumerate(np.array_split(indice_tribunal, num_arquivos)):
+        n = len(indices)
+        casos_novos = rng.poisson(40, n)
+        suspensos = rng.poisson(3, n)
+        df = pd.DataFrame({
+            'sigla_tribunal': siglas[indices],
+            'procedimento': rng.choice(['Conhecimento', 'Execução', 'Recursal'], n),
+            'ramo_justica': ramos[indices],
+            'sigla_grau': rng.choice(['G1', 'G2', 'JE', 'TR'], n),
+            'orgao_julgador': [f"Órgão Julgador {i}" for i in rng.integers(1, 500, n)],
+            'julgados_2025': rng.poisson(35, n),
+            'casos_novos_2025': casos_novos,
+            'dessobrestados_2025': rng.poisson(2, n),
+            'suspensos_2025': np.minimum(suspensos, casos_novos),
+        })
+        df.to_csv(os.path.join(pasta_destino, f"teste_{numero + 1:03d}.csv"), index=False, sep=',', encoding='utf-8')
+    return total_linhas
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera arquivos teste_*.csv sintéticos para testes e benchmarks.")
+    parser.add_argument("--pasta", default="./Dados", help="Pasta de destino (padrão: ./Dados)")
+    parser.add_argument("--tribunais", type=int, default=90, help="Número de tribunais")
+    parser.add_argument("--linhas-por-tribunal", type=int, default=1000, help="Linhas médias por tribunal")
+    parser.add_argument("--arquivos", type=int, default=10, help="Número de arquivos teste_*.csv")
+    parser.add_argument("--assimetria", type=float, default=0.0, help="Expoente de Zipf do tamanho dos tribunais")
+    parser.add_argument("--ramos", nargs="*", default=None, metavar="RAMO=PESO",
+                        help="Mistura de ramos, ex.: 'Justiça Estadual=3' 'Justiça Federal=1'")
+    parser.add_argument("--semente", type=int, default=42, help="Semente do gerador aleatório")
+    args = parser.parse_args()
+
+    mix = None
+    if args.ramos:
+        mix = {}
+        for item in args.ramos:
+            ramo, _, peso = item.rpartition("=")
+            if ramo not in TABELA_MULTIPLICADORES:
+                print(f"Alerta: ramo '{ramo}' não possui metas definidas; seus tribunais terão apenas a Meta1.")
+            mix[ramo] = float(peso)
+
+    total = gerar_dados(args.pasta, args.tribunais, mix, args.linhas_por_tribunal,
+                        args.arquivos, args.assimetria, args.semente)
+    print(f"{args.arquivos} arquivo(s) com {total} linhas gerados em '{args.pasta}'.")
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from instrumentacao import etapa_instrumentada, executar_medindo, registrar_item
+
+# --- Configurações dos Gráficos ---
+NUM_TRIBUNAIS_TOP = 15
+NOME_ARQUIVO_ESTADO = ".graficos_estado.json"
+
+# --- 1. Preparação dos Dados ---
+def dados_do_grafico(df_resumo, meta_nome, num_tribunais_top=NUM_TRIBUNAIS_TOP):
+    """Retorna (tribunais, valores) dos 'num_tribunais_top' melhores tribunais na meta."""
+    df_para_plot = df_resumo[['tribunal', meta_nome]].copy()
+    df_para_plot[meta_nome] = pd.to_numeric(df_para_plot[meta_nome], errors='coerce')
+    df_para_plot = df_para_plot.dropna(subset=[meta_nome])
+    df_para_plot = df_para_plot.sort_values(by=meta_nome, ascending=False).head(num_tribunais_top)
+    return [str(t) for t in df_para_plot['tribunal']], [float(v) for v in df_para_plot[meta_nome]]
+
+def _assinatura(tribunais, valores):
+    return hashlib.sha1(json.dumps([tribunais, valores]).encode('utf-8')).hexdigest()
+
+# --- 2. Renderização (executada nos processos) ---
+def renderizar_grafico(args):
+    """
+    Desenha e salva UM gráfico de barras usando a API orientada a objetos do
+    Matplotlib no backend Agg (sem o estado global do pyplot).
+    """
+    meta_nome, tribunais, valores, caminho_arquivo_grafico, num_tribunais_top = args
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(14, 8))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    bars = ax.bar(tribunais, valores)
+    ax.set_title(f'Desempenho - {meta_nome} (Top {num_tribunais_top} Tribunais)', fontsize=16)
+    ax.set_ylabel(f'Valor da {meta_nome}', fontsize=12)
+    ax.set_xlabel('Tribunal', fontsize=12)
+    ax.tick_params(axis='x', labelsize=10)
+    ax.tick_params(axis='y', labelsize=10)
+    for rotulo in ax.get_xticklabels():
+        rotulo.set_rotation(45)
+        rotulo.set_ha("right")
+    ax.grid(axis='y', linestyle='--')
+
+    deslocamento = 0.01 * max(valores)
+    for bar in bars:
+        yval = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width()/2.0, yval + deslocamento, f'{yval:.2f}', ha='center', va='bottom', fontsize=9)
+
+    fig.tight_layout()
+    fig.savefig(caminho_arquivo_grafico)
+    return caminho_arquivo_grafico
+
+# --- 3. Geração em Paralelo ---
+@etapa_instrumentada("geração de gráficos")
+def gerar_graficos_paralelo(df_resumo, pasta_saida_graficos, metas_para_plotar,
+                            apenas_alterados=False, num_tribunais_top=NUM_TRIBUNAIS_TOP, max_workers=None):
+    """
+    Gera os gráficos das metas em um pool de processos. Com 'apenas_alterados',
+    só redesenha os gráficos cujos dados mudaram desde a última execução
+    (controle salvo em NOME_ARQUIVO_ESTADO na pasta de saída).
+    """
+    if df_resumo is None or df_resumo.empty:
+        print("DataFrame de resumo vazio ou nulo. Não é possível gerar gráficos.")
+        return
+
+    try:
+        os.makedirs(pasta_saida_graficos, exist_ok=True)
+    except OSError as e:
+        print(f"Erro ao criar diretório para gráficos '{pasta_saida_graficos}': {e}. Gráficos não serão salvos.")
+        return
+
+    caminho_estado = os.path.join(pasta_saida_graficos, NOME_ARQUIVO_ESTADO)
+    estado = {}
+    if apenas_alterados:
+        try:
+            with open(caminho_estado, encoding='utf-8') as f:
+                estado = json.load(f)
+        except (OSError, ValueError):
+            estado = {}
+
+    tarefas = []
+    assinaturas = {}
+    for meta_nome in metas_para_plotar:
+        if meta_nome not in df_resumo.columns:
+            print(f"Meta '{meta_nome}' não encontrada no DataFrame de resumo. Pulando gráfico.")
+            continue
+        tribunais, valores = dados_do_grafico(df_resumo, meta_nome, num_tribunais_top)
+        if not tribunais:
+            print(f"Não há dados válidos para '{meta_nome}' para gerar o gráfico.")
+            continue
+        caminho_arquivo_grafico = os.path.join(pasta_saida_graficos, f"grafico_{meta_nome}.png")
+        assinaturas[meta_nome] = _assinatura(tribunais, valores)
+        if apenas_alterados and estado.get(meta_nome) == assinaturas[meta_nome] and os.path.exists(caminho_arquivo_grafico):
+            print(f"Gráfico de {meta_nome} inalterado. Pulando.")
+            continue
+        tarefas.append((meta_nome, tribunais, valores, caminho_arquivo_grafico, num_tribunais_top))
+
+    if tarefas:
+        num_processos = max_workers or min(len(tarefas), os.cpu_count() or 1)
+        print(f"Gerando {len(tarefas)} gráfico(s) com {num_processos} processos...")
+        with ProcessPoolExecutor(max_workers=num_processos) as executor:
+            futures = {executor.submit(executar_medindo, renderizar_grafico, tarefa): tarefa for tarefa in tarefas}
+            for future in as_completed(futures):
+                meta_nome, _, _, caminho_arquivo_grafico, _ = futures[future]
+                try:
+                    _, segundos = future.result()
+                    registrar_item('grafico', meta_nome, segundos)
+                    estado[meta_nome] = assinaturas[meta_nome]
+                    print(f"Gráfico '{caminho_arquivo_grafico}' salvo com sucesso.")
+                except Exception as e:
+                    print(f"Erro ao salvar o gráfico '{caminho_arquivo_grafico}': {e}")
+
+    try:
+        with open(caminho_estado, 'w', encoding='utf-8') as f:
+            json.dump(estado, f)
+    except OSError as e:
+        print(f"Alerta: não foi possível salvar o estado dos gráficos: {e}")
+
+    print("Geração de gráficos concluída.")
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import time
+
+import pandas as pd
+
+from motor_metas import (COLUNAS_CONTADORES, TABELA_MULTIPLICADORES, agregar_parciais,
+                         calcular_metas_vetorizado, combinar_parciais)
+from cache_colunar import hash_conteudo, impressao_digital
+from esquema import ler_colunas_metas
+from instrumentacao import etapa_instrumentada, registrar_arquivo
+from compressao import listar_arquivos_csv
+
+# --- Configurações do Processamento Incremental ---
+NOME_ARQUIVO_MANIFESTO = ".manifesto_metas.json"
+
+# --- 1. Manifesto de Agregados por Arquivo ---
+def carregar_manifesto(caminho_manifesto):
+    """Lê o manifesto salvo na execução anterior (ou um manifesto vazio)."""
+    try:
+        with open(caminho_manifesto, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def salvar_manifesto(manifesto, caminho_manifesto):
+    """Grava o manifesto de forma atômica (arquivo temporário + renomeação)."""
+    caminho_tmp = f"{caminho_manifesto}.tmp"
+    with open(caminho_tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifesto, f, ensure_ascii=False)
+    os.replace(caminho_tmp, caminho_manifesto)
+
+def _assinatura_tabela():
+    return hashlib.sha1(repr(sorted((r, sorted(m.items())) for r, m in TABELA_MULTIPLICADORES.items())).encode('utf-8')).hexdigest()
+
+def parciais_para_json(df_parciais):
+    """Converte os agregados de um arquivo em {sigla: [ramo, julgados, casos_novos, dessobrestados, suspensos]}."""
+    registros = {}
+    for sigla, linha in df_parciais.iterrows():
+        ramo = linha['ramo_justica']
+        valores = [v.item() if hasattr(v, 'item') else v for v in linha[COLUNAS_CONTADORES]]
+        registros[str(sigla)] = [None if pd.isna(ramo) else ramo] + valores
+    return registros
+
+def parciais_de_json(registros, siglas=None):
+    """Reconstrói os agregados de um arquivo, opcionalmente só para as 'siglas' informadas."""
+    linhas = {s: v for s, v in registros.items() if siglas is None or s in siglas}
+    df = pd.DataFrame.from_dict(linhas, orient='index', columns=['ramo_justica'] + COLUNAS_CONTADORES)
+    df.index.name = 'sigla_tribunal'
+    return df
+
+def _arquivo_inalterado(entrada, digital, caminho_arquivo):
+    if entrada is None or entrada.get('tamanho') != digital['tamanho']:
+        return False
+    if entrada.get('mtime_ns') == digital['mtime_ns']:
+        return True
+    return entrada.get('hash') == hash_conteudo(caminho_arquivo)
+
+# --- 2. Recalculo Incremental do ResumoMetas ---
+@etapa_instrumentada("processamento incremental")
+def processar_incremental(caminho_pasta_dados, caminho_arquivo_saida_resumo, caminho_manifesto):
+    """
+    Relê apenas os arquivos 'teste_*.csv' adicionados ou alterados desde a última
+    execução (e descarta os removidos), recombina os agregados só dos tribunais
+    afetados e reescreve no ResumoMetas.csv apenas as linhas desses tribunais.
+    O resultado é idêntico ao de uma execução completa.
+    """
+    arquivos_csv = listar_arquivos_csv(caminho_pasta_dados)
+    if not arquivos_csv:
+        print(f"Nenhum arquivo CSV encontrado no padrão 'teste_*.csv' na pasta: {caminho_pasta_dados}")
+        return None
+
+    manifesto = carregar_manifesto(caminho_manifesto)
+    entradas_anteriores = manifesto.get('arquivos', {})
+    entradas = {}
+    tribunais_afetados = set()
+    arquivos_relidos = 0
+
+    for arquivo in arquivos_csv:
+        chave = os.path.abspath(arquivo)
+        digital = impressao_digital(arquivo)
+        entrada_anterior = entradas_anteriores.get(chave)
+        if _arquivo_inalterado(entrada_anterior, digital, arquivo):
+            entradas[chave] = dict(entrada_anterior, mtime_ns=digital['mtime_ns'])
+            continue
+
+        arquivos_relidos += 1
+        t_arquivo = time.perf_counter()
+        try:
+            df_arquivo = ler_colunas_metas(arquivo)
+        except Exception as e:
+            print(f"Erro ao ler o arquivo {arquivo}: {e}")
+            df_arquivo = None
+        parciais = parciais_para_json(agregar_parciais(df_arquivo)) if df_arquivo is not None else {}
+        entradas[chave] = dict(digital, hash=hash_conteudo(arquivo), parciais=parciais)
+        registrar_arquivo(arquivo, time.perf_counter() - t_arquivo, len(df_arquivo) if df_arquivo is not None else None)
+        print(f"Arquivo {arquivo} {'alterado' if entrada_anterior else 'novo'}: {len(parciais)} tribunal(is) afetado(s).")
+        tribunais_afetados.update(parciais)
+        if entrada_anterior is not None:
+            tribunais_afetados.update(entrada_anterior['parciais'])
+
+    for chave, entrada_anterior in entradas_anteriores.items():
+        if chave not in entradas:
+            print(f"Arquivo {chave} removido: seus agregados serão descartados.")
+            tribunais_afetados.update(entrada_anterior['parciais'])
+
+    # O resumo anterior só é reaproveitado se for exatamente o gerado pela execução anterior
+    recalcular_tudo = (
+        not os.path.exists(caminho_arquivo_saida_resumo)
+        or manifesto.get('assinatura_tabela') != _assinatura_tabela()
+        or manifesto.get('hash_resumo') != hash_conteudo(caminho_arquivo_saida_resumo)
+    )
+    if not recalcular_tudo and not tribunais_afetados:
+        print("Nenhuma alteração nos arquivos de entrada. ResumoMetas mantido.")
+        manifesto['arquivos'] = entradas
+        salvar_manifesto(manifesto, caminho_manifesto)
+        return pd.read_csv(caminho_arquivo_saida_resumo, sep=',', encoding='utf-8', dtype=str, keep_default_na=False)
+
+    # Recombina, na ordem atual dos arquivos, os agregados dos tribunais afetados
+    siglas = None if recalcular_tudo else tribunais_afetados
+    df_parciais = combinar_parciais([parciais_de_json(entradas[os.path.abspath(a)]['parciais'], siglas) for a in arquivos_csv])
+
+    if df_parciais is not None:
+        df_linhas_novas = calcular_metas_vetorizado(df_parciais)
+    else:
+        df_linhas_novas = None
+
+    if recalcular_tudo:
+        print("Resumo anterior ausente ou divergente: recalculando todos os tribunais.")
+        df_resumo_metas = df_linhas_novas
+    else:
+        df_resumo_anterior = pd.read_csv(caminho_arquivo_saida_resumo, sep=',', encoding='utf-8', dtype=str, keep_default_na=False)
+        df_resumo_anterior = df_resumo_anterior[~df_resumo_anterior['tribunal'].isin(tribunais_afetados)]
+        df_resumo_metas = pd.concat([df_resumo_anterior, df_linhas_novas], ignore_index=True)
+        df_resumo_metas = df_resumo_metas.sort_values('tribunal', kind='stable').reset_index(drop=True)
+        print(f"{len(tribunais_afetados)} tribunal(is) recalculado(s) a partir de {arquivos_relidos} arquivo(s) relido(s).")
+
+    if df_resumo_metas is None or df_resumo_metas.empty:
+        print("Nenhum tribunal para gerar o resumo de metas.")
+        return None
+
+    try:
+        df_resumo_metas.to_csv(caminho_arquivo_saida_resumo, index=False, sep=',', encoding='utf-8')
+        print(f"Arquivo de resumo de metas '{caminho_arquivo_saida_resumo}' gerado com sucesso.")
+        manifesto = {
+            'arquivos': entradas,
+            'assinatura_tabela': _assinatura_tabela(),
+            'hash_resumo': hash_conteudo(caminho_arquivo_saida_resumo),
+        }
+        salvar_manifesto(manifesto, caminho_manifesto)
+    except Exception as e:
+        print(f"Erro ao salvar o arquivo de resumo de metas '{caminho_arquivo_saida_resumo}': {e}")
+    return df_resumo_metas
@@ -0,0 +1,202 @@
+import contextlib
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows: sem getrusage, o pico de RSS fica como None
+    resource = None
+
+# --- Configurações da Instrumentação ---
+NOME_ARQUIVO_METRICAS = "metricas.json"
+# Perfis opcionais por etapa: None, "cprofile" (arquivo .prof + funções mais custosas)
+# ou "tracemalloc" (pico de memória alocada + linhas que mais alocaram)
+PERFIS_DISPONIVEIS = ("cprofile", "tracemalloc")
+NUM_LINHAS_PERFIL = 15
+
+_metricas = {'script': None, 'pasta_saida': None, 'perfil': None, 'inicio': time.time(),
+             'inicio_cpu': time.process_time(), 'etapas': []}
+_local = threading.local()
+
+# --- 1. Configuração ---
+def iniciar_metricas(script, pasta_saida, perfil=None):
+    """
+    Reinicia o registro de métricas da execução de 'script'. O arquivo de métricas
+    será gravado em 'pasta_saida'; 'perfil' ativa a captura opcional por etapa.
+    """
+    if perfil is not None and perfil not in PERFIS_DISPONIVEIS:
+        print(f"Alerta: perfil '{perfil}' desconhecido (use {PERFIS_DISPONIVEIS}). Perfil desativado.")
+        perfil = None
+    _metricas.update(script=script, pasta_saida=pasta_saida, perfil=perfil, inicio=time.time(),
+                     inicio_cpu=time.process_time(), etapas=[])
+
+def pico_rss_mb(filhos=False):
+    """Pico de memória residente (RSS) do processo (ou dos filhos já finalizados), em MB."""
+    if resource is None:
+        return None
+    uso = resource.getrusage(resource.RUSAGE_CHILDREN if filhos else resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss é dado em KB no Linux e em bytes no macOS
+    return uso / (1024**2 if sys.platform == 'darwin' else 1024)
+
+def _cpu_filhos():
+    tempos = os.times()
+    return tempos.children_user + tempos.children_system
+
+def _pilha():
+    if not hasattr(_local, 'pilha'):
+        _local.pilha = []
+    return _local.pilha
+
+# --- 2. Perfis Opcionais ---
+def _iniciar_perfil(tipo):
+    if tipo == "cprofile":
+        perfilador = cProfile.Profile()
+        perfilador.enable()
+        return perfilador
+    if tipo == "tracemalloc" and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        return True
+    return None
+
+def _finalizar_perfil(tipo, perfilador, nome_etapa):
+    """Encerra o perfil da etapa e devolve o resumo que vai para o arquivo de métricas."""
+    if tipo == "cprofile":
+        perfilador.disable()
+        resumo = {'tipo': tipo}
+        if _metricas['pasta_saida']:
+            nome_arquivo = re.sub(r'\W+', '_', nome_etapa).strip('_')
+            caminho = os.path.join(_metricas['pasta_saida'], f"perfil_{nome_arquivo}.prof")
+            perfilador.dump_stats(caminho)
+            resumo['arquivo'] = caminho
+        texto = io.StringIO()
+        pstats.Stats(perfilador, stream=texto).sort_stats('cumulative').print_stats(NUM_LINHAS_PERFIL)
+        resumo['funcoes'] = [linha for linha in texto.getvalue().splitlines() if linha.strip()]
+        return resumo
+    if tipo == "tracemalloc":
+        _, pico = tracemalloc.get_traced_memory()
+        estatisticas = tracemalloc.take_snapshot().statistics('lineno')[:NUM_LINHAS_PERFIL]
+        tracemalloc.stop()
+        return {'tipo': tipo, 'pico_alocado_mb': pico / 1024**2,
+                'linhas': [str(estatistica) for estatistica in estatisticas]}
+    return None
+
+# --- 3. Etapas ---
+@contextlib.contextmanager
+def medir_etapa(nome):
+    """
+    Mede uma etapa: tempo de parede, tempo de CPU (do processo e dos processos filhos
+    encerrados durante a etapa), linhas e bytes processados, pico de RSS e os tempos
+    por arquivo/tribunal registrados dentro dela. Ao final, imprime o tempo no formato
+    'Tempo de execução (nome): X segundos'. O perfil opcional só é capturado nas etapas
+    de nível mais alto da thread principal (as internas já estão incluídas nele).
+    """
+    pilha = _pilha()
+    etapa = {'nome': nome, 'etapa_pai': pilha[-1]['nome'] if pilha else None,
+             'thread': threading.current_thread().name, 'linhas': 0, 'bytes': 0, 'itens': []}
+    tipo_perfil = None
+    if _metricas['perfil'] and not pilha and threading.current_thread() is threading.main_thread():
+        tipo_perfil = _metricas['perfil']
+    perfilador = _iniciar_perfil(tipo_perfil)
+
+    inicio = time.time()
+    t_parede, t_cpu, t_cpu_filhos = time.perf_counter(), time.process_time(), _cpu_filhos()
+    pilha.append(etapa)
+    try:
+        yield etapa
+    finally:
+        pilha.pop()
+        etapa['inicio_s'] = inicio - _metricas['inicio']
+        etapa['parede_s'] = time.perf_counter() - t_parede
+        etapa['cpu_s'] = time.process_time() - t_cpu
+        etapa['cpu_filhos_s'] = _cpu_filhos() - t_cpu_filhos
+        etapa['pico_rss_mb'] = pico_rss_mb()
+        etapa['pico_rss_filhos_mb'] = pico_rss_mb(filhos=True)
+        if perfilador is not None:
+            etapa['perfil'] = _finalizar_perfil(tipo_perfil, perfilador, nome)
+        _metricas['etapas'].append(etapa)
+        print(f"Tempo de execução ({nome}): {etapa['parede_s']:.2f} segundos")
+
+def etapa_instrumentada(nome):
+    """Decorador que executa a função inteira dentro de medir_etapa(nome)."""
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def envoltorio(*args, **kwargs):
+            with medir_etapa(nome):
+                return funcao(*args, **kwargs)
+        return envoltorio
+    return decorador
+
+def registrar(linhas=0, num_bytes=0):
+    """Soma linhas e bytes processados à etapa em andamento (se houver)."""
+    pilha = _pilha()
+    if pilha:
+        pilha[-1]['linhas'] += int(linhas)
+        pilha[-1]['bytes'] += int(num_bytes)
+
+def registrar_item(tipo, nome, segundos, linhas=None, num_bytes=None):
+    """
+    Registra na etapa em andamento o tempo de um item ('arquivo', 'tribunal',
+    'grafico'...). Linhas e bytes informados também são somados à etapa.
+    """
+    pilha = _pilha()
+    if not pilha:
+        return
+    pilha[-1]['itens'].append({'tipo': tipo, 'nome': str(nome), 'segundos': segundos,
+                               'linhas': linhas, 'bytes': num_bytes})
+    registrar(linhas or 0, num_bytes or 0)
+
+def registrar_arquivo(caminho_arquivo, segundos, linhas=None):
+    """Registra o tempo de leitura de um arquivo, com o seu tamanho em bytes."""
+    try:
+        tamanho = os.path.getsize(caminho_arquivo)
+    except OSError:
+        tamanho = None
+    registrar_item('arquivo', caminho_arquivo, segundos, linhas, tamanho)
+
+def executar_medindo(funcao, *args):
+    """
+    Executa funcao(*args) e devolve (resultado, segundos). Usada nos processos do
+    pool para que o processo principal registre o tempo real de cada tarefa.
+    """
+    t = time.perf_counter()
+    resultado = funcao(*args)
+    return resultado, time.perf_counter() - t
+
+# --- 4. Arquivo de Métricas ---
+def salvar_metricas(caminho_arquivo=None):
+    """
+    Grava as métricas da execução em JSON (por padrão, NOME_ARQUIVO_METRICAS na
+    pasta de saída), com os totais e as etapas em ordem de início, e imprime o
+    tempo total. Retorna o dicionário gravado.
+    """
+    metricas = {
+        'script': _metricas['script'],
+        'inicio': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(_metricas['inicio'])),
+        'total_s': time.time() - _metricas['inicio'],
+        'cpu_s': time.process_time() - _metricas['inicio_cpu'],
+        'cpu_filhos_s': _cpu_filhos(),
+        'pico_rss_mb': pico_rss_mb(),
+        'pico_rss_filhos_mb': pico_rss_mb(filhos=True),
+        'perfil': _metricas['perfil'],
+        'etapas': sorted(_metricas['etapas'], key=lambda etapa: etapa['inicio_s']),
+    }
+    if caminho_arquivo is None and _metricas['pasta_saida']:
+        caminho_arquivo = os.path.join(_metricas['pasta_saida'], NOME_ARQUIVO_METRICAS)
+    if caminho_arquivo is not None:
+        try:
+            with open(caminho_arquivo, 'w', encoding='utf-8') as f:
+                json.dump(metricas, f, ensure_ascii=False, indent=2, default=str)
+            print(f"Métricas de execução salvas em '{caminho_arquivo}'.")
+        except OSError as e:
+            print(f"Alerta: não foi possível salvar as métricas em '{caminho_arquivo}': {e}")
+    print(f"Tempo total de execução: {metricas['total_s']:.2f} segundos.")
+    return metricas
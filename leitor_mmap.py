@@ -0,0 +1,302 @@
+import csv
+import io
+import mmap
+
+import numpy as np
+import pandas as pd
+
+from motor_metas import COLUNAS_CONTADORES, agregar_parciais, combinar_parciais
+from esquema import ler_colunas_metas, ler_colunas_metas_em_blocos
+from compressao import abrir_entrada, arquivo_comprimido
+
+# --- Configurações do Leitor Mapeado ---
+# Desative para sempre usar o pandas no caminho das metas
+LEITOR_MMAP_ATIVO = True
+TAMANHO_BLOCO_MMAP = 16 * 1024 * 1024
+MAX_DIGITOS = 18
+ASPAS, VIRGULA, QUEBRA, RETORNO = ord('"'), ord(','), ord('\n'), ord('\r')
+BOM_UTF8 = b'\xef\xbb\xbf'
+FNV_PRIMO = np.uint64(1099511628211)
+# Valores que o pandas lê como ausentes (NaN) por padrão: nesses casos o arquivo vai para o pandas
+VALORES_NA_PANDAS = {
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+}
+
+class _PrecisaPandas(Exception):
+    """O bloco tem algo que o leitor vetorizado não reproduz exatamente como o pandas."""
+
+# --- 1. Varredura Vetorizada ---
+def _separadores(bloco):
+    """Posições das vírgulas e quebras de linha fora de aspas (regra do CSV: "" é uma aspa escapada)."""
+    aspas = bloco == ASPAS
+    if not aspas.any():
+        return np.flatnonzero(bloco == VIRGULA), np.flatnonzero(bloco == QUEBRA), 0
+    # Paridade acumulada das aspas: 1 dentro de um campo entre aspas
+    dentro = np.bitwise_xor.accumulate(aspas.view(np.uint8))
+    fora = dentro == 0
+    return (np.flatnonzero((bloco == VIRGULA) & fora), np.flatnonzero((bloco == QUEBRA) & fora), int(dentro[-1]))
+
+def _bytes_na_posicao(bloco, inicios, deslocamento):
+    return bloco[np.minimum(inicios + deslocamento, len(bloco) - 1)]
+
+def _inteiros(bloco, inicios, fins):
+    """Converte campos só com dígitos em int64, sem objetos Python por linha (um passo por dígito)."""
+    tamanhos = fins - inicios
+    if tamanhos.min() < 1 or tamanhos.max() > MAX_DIGITOS:
+        raise _PrecisaPandas()
+    valores = np.zeros(len(inicios), dtype=np.int64)
+    for k in range(int(tamanhos.max())):
+        ativos = tamanhos > k
+        digitos = _bytes_na_posicao(bloco, inicios, k).astype(np.int64) - ord('0')
+        if ((digitos < 0) | (digitos > 9))[ativos].any():
+            raise _PrecisaPandas()
+        valores = np.where(ativos, valores * 10 + digitos, valores)
+    return valores
+
+def _hash_texto(bloco, inicios, fins):
+    """Hash (FNV-1a, 64 bits) do campo de cada linha, calculado byte a byte para todas as linhas."""
+    tamanhos = fins - inicios
+    if tamanhos.min() < 1:
+        raise _PrecisaPandas()
+    hashes = tamanhos.astype(np.uint64)
+    for k in range(int(tamanhos.max())):
+        byte = _bytes_na_posicao(bloco, inicios, k).astype(np.uint64)
+        hashes = np.where(tamanhos > k, (hashes ^ byte) * FNV_PRIMO, hashes)
+    return hashes
+
+def _conferir_iguais(bloco, inicios, fins, representantes):
+    """Garante que cada campo é idêntico ao do representante do seu grupo (sem colisões de hash)."""
+    tamanhos = fins - inicios
+    if (tamanhos != tamanhos[representantes]).any():
+        raise _PrecisaPandas()
+    for k in range(int(tamanhos.max())):
+        iguais = _bytes_na_posicao(bloco, inicios, k) == _bytes_na_posicao(bloco, inicios[representantes], k)
+        if not iguais[tamanhos > k].all():
+            raise _PrecisaPandas()
+
+def _textos(bloco, inicios, fins):
+    """Decodifica os campos informados (poucos: um por tribunal)."""
+    valores = []
+    for inicio, fim in zip(inicios, fins):
+        texto = bytes(bloco[inicio:fim]).decode('utf-8')
+        # Entre aspas ou lido como ausente pelo pandas: o arquivo vai para o pandas
+        if texto in VALORES_NA_PANDAS or texto.startswith('"'):
+            raise _PrecisaPandas()
+        valores.append(texto)
+    return np.array(valores, dtype=object)
+
+def _agregar_bloco(bloco, fim_linhas, virgulas, quebras, indices, num_virgulas):
+    """Agrega por tribunal as linhas completas de 'bloco' (até 'fim_linhas'). Retorna (parciais, linhas)."""
+    fins = quebras
+    if len(fins) == 0 or fins[-1] != fim_linhas:
+        fins = np.r_[fins, fim_linhas]
+    inicios = np.r_[0, fins[:-1] + 1]
+    # Linhas em branco são ignoradas, como no pandas
+    nao_vazias = fins > inicios
+    inicios, fins = inicios[nao_vazias], fins[nao_vazias]
+    if len(inicios) == 0:
+        return None, 0
+    fins_conteudo = fins - (bloco[np.maximum(fins - 1, 0)] == RETORNO)
+
+    virgulas = virgulas[virgulas < fim_linhas]
+    por_linha = np.searchsorted(virgulas, fins) - np.searchsorted(virgulas, inicios)
+    if len(virgulas) != len(inicios) * num_virgulas or (por_linha != num_virgulas).any():
+        raise _PrecisaPandas()
+    virgulas = virgulas.reshape(len(inicios), num_virgulas)
+
+    def limites(coluna):
+        j = indices[coluna]
+        inicio = inicios if j == 0 else virgulas[:, j - 1] + 1
+        fim = fins_conteudo if j == num_virgulas else virgulas[:, j]
+        return inicio, fim
+
+    # Agrupa pelas siglas via hash; a ordenação estável põe no início de cada grupo
+    # a primeira linha do tribunal, de onde vêm a sigla e o ramo
+    inicios_sigla, fins_sigla = limites('sigla_tribunal')
+    hashes = _hash_texto(bloco, inicios_sigla, fins_sigla)
+    ordem = np.argsort(hashes, kind='stable')
+    hashes_ordenados = hashes[ordem]
+    novo_grupo = np.r_[True, hashes_ordenados[1:] != hashes_ordenados[:-1]]
+    inicios_grupos = np.flatnonzero(novo_grupo)
+    primeiras = ordem[inicios_grupos]
+    grupo_da_linha = np.empty(len(inicios), dtype=np.intp)
+    grupo_da_linha[ordem] = np.cumsum(novo_grupo) - 1
+    _conferir_iguais(bloco, inicios_sigla, fins_sigla, primeiras[grupo_da_linha])
+
+    siglas = _textos(bloco, inicios_sigla[primeiras], fins_sigla[primeiras])
+    inicios_ramo, fins_ramo = limites('ramo_justica')
+    ramos = _textos(bloco, inicios_ramo[primeiras], fins_ramo[primeiras])
+    df_parciais = pd.DataFrame(
+        {coluna: np.add.reduceat(_inteiros(bloco, *limites(coluna))[ordem], inicios_grupos)
+         for coluna in COLUNAS_CONTADORES},
+        index=pd.Index(siglas, name='sigla_tribunal'))
+    df_parciais.insert(0, 'ramo_justica', ramos)
+    return df_parciais, len(inicios)
+
+def _colunas_cabecalho(buffer):
+    fim = buffer.find(b'\n')
+    linha = bytes(buffer[:fim if fim != -1 else len(buffer)])
+    if linha.startswith(BOM_UTF8):
+        linha = linha[len(BOM_UTF8):]
+    texto = linha.decode('utf-8').rstrip('\r')
+    return next(csv.reader([texto]), []), (fim + 1 if fim != -1 else len(buffer))
+
+def agregar_buffer(buffer, tamanho_bloco=TAMANHO_BLOCO_MMAP):
+    """
+    Agrega por tribunal o conteúdo de um CSV já em memória (bytes ou mmap), com
+    varredura vetorizada em NumPy: apenas as colunas das metas são extraídas e
+    nenhum objeto Python é criado por linha. Campos entre aspas em outras colunas
+    são tratados; se um campo necessário estiver entre aspas, vazio ou não for um
+    inteiro simples, ou se alguma linha estiver malformada, retorna None para que
+    o arquivo seja lido pelo pandas (garantindo o mesmo resultado).
+    Retorna (agregados por tribunal, número de linhas) ou None.
+    """
+    try:
+        colunas, inicio = _colunas_cabecalho(buffer)
+    except UnicodeDecodeError:
+        return None
+    if any(c not in colunas for c in ['sigla_tribunal', 'ramo_justica'] + COLUNAS_CONTADORES):
+        return None
+    indices = {c: colunas.index(c) for c in ['sigla_tribunal', 'ramo_justica'] + COLUNAS_CONTADORES}
+    dados = np.frombuffer(buffer, dtype=np.uint8)
+    bloco = None
+    lista_parciais = []
+    total_linhas = 0
+    try:
+        while inicio < len(dados):
+            fim = min(inicio + tamanho_bloco, len(dados))
+            bloco = dados[inicio:fim]
+            virgulas, quebras, dentro_de_aspas = _separadores(bloco)
+            if fim < len(dados):
+                if len(quebras) == 0:
+                    # Nenhuma quebra de linha fora de aspas: amplia o bloco
+                    tamanho_bloco *= 2
+                    continue
+                fim_linhas = int(quebras[-1])
+            else:
+                if dentro_de_aspas:
+                    raise _PrecisaPandas()
+                fim_linhas = len(bloco)
+            df_parciais, linhas = _agregar_bloco(bloco, fim_linhas, virgulas, quebras[quebras < fim_linhas],
+                                                 indices, len(colunas) - 1)
+            lista_parciais.append(df_parciais)
+            total_linhas += linhas
+            inicio += fim_linhas + 1
+    except (_PrecisaPandas, UnicodeDecodeError):
+        return None
+    finally:
+        del dados, bloco
+    return combinar_parciais(lista_parciais) if total_linhas else None, total_linhas
+
+def _linhas_em_blocos(arquivo, tamanho_bloco):
+    """
+    Lê 'arquivo' (aberto em modo binário) em blocos de 'tamanho_bloco' bytes e gera só
+    linhas completas: (bloco, separadores do bloco, fim das linhas, aspas abertas no fim do
+    arquivo). Cada bloco termina na última quebra de linha fora de aspas; o que vem depois
+    dela abre o bloco seguinte.
+    """
+    resto = b''
+    while True:
+        lido = arquivo.read(tamanho_bloco)
+        bloco = resto + lido if resto else lido
+        if not bloco:
+            return
+        separadores = _separadores(np.frombuffer(bloco, dtype=np.uint8))
+        quebras = separadores[1]
+        if lido:
+            if len(quebras) == 0:
+                resto = bloco  # nenhuma quebra de linha fora de aspas: junta com o próximo bloco
+                continue
+            fim_linhas = int(quebras[-1])
+            resto = bloco[fim_linhas + 1:]
+            yield bloco[:fim_linhas + 1], separadores, fim_linhas, False
+        else:
+            yield bloco, separadores, len(bloco), bool(separadores[2])
+            return
+
+def blocos_de_linhas(arquivo, tamanho_bloco=TAMANHO_BLOCO_MMAP):
+    """Gera o conteúdo de 'arquivo' em blocos de ~'tamanho_bloco' bytes, cada um com linhas completas."""
+    for bloco, _, _, _ in _linhas_em_blocos(arquivo, tamanho_bloco):
+        yield bloco
+
+def agregar_fluxo(arquivo, tamanho_bloco=TAMANHO_BLOCO_MMAP):
+    """
+    Como agregar_buffer, para um arquivo aberto em modo binário e lido em fluxo (ex.:
+    descompressão), em blocos de 'tamanho_bloco' bytes: só um bloco fica em memória.
+    Retorna (agregados por tribunal, número de linhas) ou None.
+    """
+    try:
+        colunas, _ = _colunas_cabecalho(arquivo.readline())
+    except UnicodeDecodeError:
+        return None
+    if any(c not in colunas for c in ['sigla_tribunal', 'ramo_justica'] + COLUNAS_CONTADORES):
+        return None
+    indices = {c: colunas.index(c) for c in ['sigla_tribunal', 'ramo_justica'] + COLUNAS_CONTADORES}
+    lista_parciais = []
+    total_linhas = 0
+    try:
+        for bloco, (virgulas, quebras, _), fim_linhas, aspas_abertas in _linhas_em_blocos(arquivo, tamanho_bloco):
+            if aspas_abertas:
+                raise _PrecisaPandas()
+            df_parciais, linhas = _agregar_bloco(np.frombuffer(bloco, dtype=np.uint8), fim_linhas, virgulas,
+                                                 quebras[quebras < fim_linhas], indices, len(colunas) - 1)
+            lista_parciais.append(df_parciais)
+            total_linhas += linhas
+    except (_PrecisaPandas, UnicodeDecodeError):
+        return None
+    return combinar_parciais(lista_parciais) if total_linhas else None, total_linhas
+
+# --- 2. Leitura de um Arquivo ---
+def _agregar_com_pandas(origem, nome_arquivo=None):
+    df_arquivo = ler_colunas_metas(origem, nome_arquivo)
+    if df_arquivo is None:
+        return None, None
+    return agregar_parciais(df_arquivo), len(df_arquivo)
+
+def _agregar_com_pandas_em_blocos(caminho_arquivo):
+    """Como _agregar_com_pandas, com o pandas lendo o fluxo (descomprimido) em blocos de linhas."""
+    lista_parciais = []
+    total_linhas = 0
+    for df_bloco in ler_colunas_metas_em_blocos(caminho_arquivo):
+        lista_parciais.append(agregar_parciais(df_bloco))
+        total_linhas += len(df_bloco)
+    if not lista_parciais:
+        return None, None
+    return combinar_parciais(lista_parciais), total_linhas
+
+def agregar_arquivo_mmap(caminho_arquivo):
+    """
+    Mapeia o arquivo em memória e o agrega com agregar_buffer; usa o pandas
+    (ler_colunas_metas) quando o leitor vetorizado não se aplica ou está desativado.
+    Arquivos comprimidos (.gz, .bz2, .xz) são descomprimidos em fluxo e agregados em
+    blocos, sem o conteúdo descomprimido inteiro em memória.
+    Retorna (agregados por tribunal, número de linhas); (None, None) se o arquivo for ignorado.
+    """
+    if arquivo_comprimido(caminho_arquivo):
+        # Não há como mapear o conteúdo descomprimido: ele é lido em blocos de tamanho fixo
+        resultado = None
+        if LEITOR_MMAP_ATIVO:
+            with abrir_entrada(caminho_arquivo) as f:
+                resultado = agregar_fluxo(f)
+        if resultado is not None:
+            return resultado
+        return _agregar_com_pandas_em_blocos(caminho_arquivo)
+    resultado = None
+    if LEITOR_MMAP_ATIVO:
+        try:
+            with open(caminho_arquivo, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+                resultado = agregar_buffer(mapa)
+        except ValueError:
+            # Arquivos vazios não podem ser mapeados
+            resultado = None
+    if resultado is not None:
+        return resultado
+    return _agregar_com_pandas(caminho_arquivo)
+
+def agregar_bytes(dados, nome_arquivo=None):
+    """Como agregar_arquivo_mmap, para o conteúdo de um arquivo já lido em memória."""
+    resultado = agregar_buffer(dados) if LEITOR_MMAP_ATIVO else None
+    if resultado is not None:
+        return resultado
+    return _agregar_com_pandas(io.BytesIO(dados), nome_arquivo)
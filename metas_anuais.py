@@ -0,0 +1,131 @@
+import os
+import time
+
+import pandas as pd
+
+from motor_metas import (PADRAO_COLUNA_CONTADOR, PREFIXOS_CONTADORES, agregar_parciais, calcular_metas_vetorizado,
+                         colunas_contadores_ano, combinar_parciais)
+from esquema import ler_csv_compacto
+from instrumentacao import etapa_instrumentada, registrar_arquivo
+from compressao import listar_arquivos_csv
+
+# --- Configurações das Metas por Ano ---
+NOME_ARQUIVO_RESUMO_ANOS = "ResumoMetas_anos.csv"
+PADRAO_ARQUIVO_RESUMO_ANO = "ResumoMetas_{ano}.csv"
+FORMATOS_SAIDA = ("longo", "por_ano")
+
+# --- 1. Detecção dos Anos ---
+def detectar_anos(colunas, nome_arquivo=None):
+    """
+    Anos (em ordem) que têm o grupo completo julgados_AAAA, casos_novos_AAAA,
+    dessobrestados_AAAA e suspensos_AAAA entre as 'colunas'. Grupos incompletos são ignorados com alerta.
+    """
+    prefixos_por_ano = {}
+    for coluna in colunas:
+        correspondencia = PADRAO_COLUNA_CONTADOR.match(coluna)
+        if correspondencia:
+            prefixos_por_ano.setdefault(int(correspondencia.group(2)), set()).add(correspondencia.group(1))
+    anos = []
+    for ano, prefixos in sorted(prefixos_por_ano.items()):
+        if len(prefixos) == len(PREFIXOS_CONTADORES):
+            anos.append(ano)
+        else:
+            faltantes = [f"{p}_{ano}" for p in PREFIXOS_CONTADORES if p not in prefixos]
+            print(f"Alerta: Arquivo {nome_arquivo} sem as colunas {faltantes}. Ano {ano} ignorado nesse arquivo.")
+    return anos
+
+def ler_colunas_anos(caminho_arquivo):
+    """
+    Lê do CSV, de uma só vez, as chaves e os contadores de TODOS os anos presentes.
+    Retorna (DataFrame, anos) ou (None, []) com alerta se faltarem as chaves ou os contadores.
+    """
+    colunas = pd.read_csv(caminho_arquivo, sep=',', encoding='utf-8', nrows=0).columns
+    anos = detectar_anos(colunas, caminho_arquivo)
+    if 'sigla_tribunal' not in colunas or 'ramo_justica' not in colunas or not anos:
+        print(f"Alerta: Arquivo {caminho_arquivo} sem 'sigla_tribunal'/'ramo_justica' ou sem contadores de algum ano. Arquivo ignorado.")
+        return None, []
+    colunas_contadores = [c for ano in anos for c in colunas_contadores_ano(ano)]
+    return ler_csv_compacto(caminho_arquivo, ['sigla_tribunal', 'ramo_justica'] + colunas_contadores), anos
+
+# --- 2. Agregação de Todos os Anos em uma Varredura ---
+@etapa_instrumentada("agregar csvs (todos os anos)")
+def agregar_anos(caminho_pasta_dados):
+    """
+    Lê cada arquivo uma única vez e agrega por tribunal os contadores de todos os anos.
+    Retorna (agregados, anos, tribunais_por_ano); um tribunal só entra no ano se
+    tiver linhas em algum arquivo com as colunas desse ano.
+    """
+    arquivos_csv = listar_arquivos_csv(caminho_pasta_dados)
+    if not arquivos_csv:
+        print(f"Nenhum arquivo CSV encontrado no padrão 'teste_*.csv' na pasta: {caminho_pasta_dados}")
+        return None, [], {}
+
+    lista_parciais = []
+    tribunais_por_ano = {}
+    for arquivo in arquivos_csv:
+        t_arquivo = time.perf_counter()
+        try:
+            df_arquivo, anos_arquivo = ler_colunas_anos(arquivo)
+        except Exception as e:
+            print(f"Erro ao ler o arquivo {arquivo}: {e}")
+            continue
+        if df_arquivo is None:
+            continue
+        colunas_contadores = [c for ano in anos_arquivo for c in colunas_contadores_ano(ano)]
+        df_parciais = agregar_parciais(df_arquivo, colunas_contadores)
+        lista_parciais.append(df_parciais)
+        for ano in anos_arquivo:
+            tribunais_por_ano.setdefault(ano, set()).update(df_parciais.index)
+        registrar_arquivo(arquivo, time.perf_counter() - t_arquivo, len(df_arquivo))
+
+    anos = sorted(tribunais_por_ano)
+    if not anos:
+        return None, [], {}
+    # Arquivos sem algum dos anos contribuem com zero nesse ano
+    colunas_contadores = [c for ano in anos for c in colunas_contadores_ano(ano)]
+    lista_parciais = [p.reindex(columns=['ramo_justica'] + colunas_contadores, fill_value=0) for p in lista_parciais]
+    print(f"Anos encontrados: {', '.join(map(str, anos))} ({len(arquivos_csv)} arquivo(s) lido(s) uma única vez).")
+    return combinar_parciais(lista_parciais, colunas_contadores), anos, tribunais_por_ano
+
+# --- 3. Resumo das Metas por Ano ---
+def calcular_metas_anos(df_parciais, anos, tribunais_por_ano):
+    """ResumoMetas de todos os anos em formato longo (coluna 'ano' após 'ramo_justica')."""
+    lista_resumos = []
+    for ano in anos:
+        df_ano = df_parciais[df_parciais.index.isin(tribunais_por_ano[ano])]
+        if df_ano.empty:
+            continue
+        df_resumo = calcular_metas_vetorizado(df_ano, colunas_contadores_ano(ano))
+        df_resumo.insert(2, 'ano', ano)
+        lista_resumos.append(df_resumo)
+    if not lista_resumos:
+        return None
+    return pd.concat(lista_resumos, ignore_index=True)
+
+def gerar_resumo_anos(df_parciais, anos, tribunais_por_ano, pasta_saida, formato="longo"):
+    """
+    Calcula as metas de todos os anos e salva um ResumoMetas_anos.csv (formato 'longo')
+    ou um ResumoMetas_AAAA.csv por ano ('por_ano', no mesmo layout do ResumoMetas.csv).
+    Retorna o DataFrame em formato longo (ou None).
+    """
+    if formato not in FORMATOS_SAIDA:
+        raise ValueError(f"Formato '{formato}' inválido. Use um de {FORMATOS_SAIDA}.")
+    if df_parciais is None or df_parciais.empty:
+        print("Agregados por tribunal vazios. Não é possível gerar o resumo de metas por ano.")
+        return None
+
+    df_resumo_anos = calcular_metas_anos(df_parciais, anos, tribunais_por_ano)
+    if df_resumo_anos is None:
+        return None
+    if formato == "longo":
+        saidas = [(os.path.join(pasta_saida, NOME_ARQUIVO_RESUMO_ANOS), df_resumo_anos)]
+    else:
+        saidas = [(os.path.join(pasta_saida, PADRAO_ARQUIVO_RESUMO_ANO.format(ano=ano)), df_ano.drop(columns='ano'))
+                  for ano, df_ano in df_resumo_anos.groupby('ano', sort=True)]
+    for caminho_saida, df_saida in saidas:
+        try:
+            df_saida.to_csv(caminho_saida, index=False, sep=',', encoding='utf-8')
+            print(f"Arquivo de resumo de metas '{caminho_saida}' gerado com sucesso.")
+        except Exception as e:
+            print(f"Erro ao salvar o arquivo de resumo de metas '{caminho_saida}': {e}")
+    return df_resumo_anos
@@ -0,0 +1,155 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# --- Colunas Utilizadas no Cálculo das Metas ---
+ANO_PADRAO = 2025
+PREFIXOS_CONTADORES = ['julgados', 'casos_novos', 'dessobrestados', 'suspensos']
+PADRAO_COLUNA_CONTADOR = re.compile(r'^(' + '|'.join(PREFIXOS_CONTADORES) + r')_(\d{4})$')
+
+def colunas_contadores_ano(ano):
+    """Colunas dos quatro contadores de um ano, na ordem julgados, casos novos, dessobrestados, suspensos."""
+    return [f"{prefixo}_{ano}" for prefixo in PREFIXOS_CONTADORES]
+
+COL_JULGADOS, COL_CASOS_NOVOS, COL_DESSOBRESTADOS, COL_SUSPENSOS = colunas_contadores_ano(ANO_PADRAO)
+
+COLUNAS_CONTADORES = [COL_JULGADOS, COL_CASOS_NOVOS, COL_DESSOBRESTADOS, COL_SUSPENSOS]
+COLUNAS_NECESSARIAS = ['sigla_tribunal', 'ramo_justica'] + COLUNAS_CONTADORES
+
+ALL_META_COLUMNS = [
+    'tribunal', 'ramo_justica', 'Meta1', 'Meta2A', 'Meta2B', 'Meta2C', 'Meta2ANT',
+    'Meta4A', 'Meta4B', 'Meta6', 'Meta7A', 'Meta7B', 'Meta8A', 'Meta8B', 'Meta8',
+    'Meta10A', 'Meta10B', 'Meta10'
+]
+METAS = ALL_META_COLUMNS[2:]
+
+# --- Tabela de Multiplicadores por Ramo da Justiça ---
+# A Meta1 segue a fórmula do tipo 1 para todos os ramos (inclusive os não mapeados);
+# as demais metas usam a fórmula genérica com o multiplicador indicado.
+TABELA_MULTIPLICADORES = {
+    "Justiça Estadual": {
+        'Meta2A': 1000/8, 'Meta2B': 1000/9, 'Meta2C': 1000/9.5, 'Meta2ANT': 100,
+        'Meta4A': 1000/6.5, 'Meta4B': 100, 'Meta6': 100, 'Meta7A': 1000/5, 'Meta7B': 1000/5,
+        'Meta8A': 1000/7.5, 'Meta8B': 1000/9, 'Meta10A': 1000/9, 'Meta10B': 1000/10,
+    },
+    "Justiça do Trabalho": {
+        'Meta2A': 1000/9.4, 'Meta2ANT': 100, 'Meta4A': 1000/7, 'Meta4B': 100,
+    },
+    "Justiça Federal": {
+        'Meta2A': 1000/8.5, 'Meta2B': 100, 'Meta2ANT': 100, 'Meta4A': 1000/7, 'Meta4B': 100,
+        'Meta6': 1000/3.5, 'Meta7A': 1000/3.5, 'Meta7B': 1000/3.5, 'Meta8A': 1000/7.5,
+        'Meta8B': 1000/9, 'Meta10A': 100,
+    },
+    "Justiça Militar da União": {
+        'Meta2A': 1000/9.5, 'Meta2B': 1000/9.9, 'Meta2ANT': 100, 'Meta4A': 1000/9.5,
+        'Meta4B': 1000/9.9,
+    },
+    "Justiça Militar Estadual": {
+        'Meta2A': 1000/9, 'Meta2B': 1000/9.5, 'Meta2ANT': 100, 'Meta4A': 1000/9.5,
+        'Meta4B': 1000/9.9,
+    },
+    "Tribunal Superior Eleitoral": {
+        'Meta2A': 1000/7, 'Meta2B': 1000/9.9, 'Meta2ANT': 100, 'Meta4A': 1000/9,
+        'Meta4B': 1000/5,
+    },
+    "Tribunal Superior do Trabalho": {
+        'Meta2A': 1000/9.5, 'Meta2B': 1000/9.9, 'Meta2ANT': 100, 'Meta4A': 1000/7,
+        'Meta4B': 100,
+    },
+    "Superior Tribunal de Justiça": {
+        'Meta2ANT': 100, 'Meta4A': 1000/9, 'Meta4B': 100, 'Meta6': 1000/7.5,
+        'Meta7A': 1000/7.5, 'Meta7B': 1000/7.5, 'Meta8': 1000/10, 'Meta10': 1000/10,
+    },
+}
+
+def _matriz_multiplicadores():
+    """
+    Converte a tabela de multiplicadores em uma matriz (ramos x metas genéricas).
+    Metas não aplicáveis ficam como NaN e a última linha (toda NaN) representa
+    os ramos sem mapeamento.
+    """
+    ramos = list(TABELA_MULTIPLICADORES)
+    metas_genericas = [m for m in METAS if m != 'Meta1']
+    matriz = np.full((len(ramos) + 1, len(metas_genericas)), np.nan)
+    for i, ramo in enumerate(ramos):
+        for j, meta in enumerate(metas_genericas):
+            if meta in TABELA_MULTIPLICADORES[ramo]:
+                matriz[i, j] = TABELA_MULTIPLICADORES[ramo][meta]
+    return pd.Index(ramos), metas_genericas, matriz
+
+# --- 1. Agregação por Tribunal ---
+def agregar_parciais(df_dados, colunas_contadores=COLUNAS_CONTADORES):
+    """
+    Reduz os dados a uma linha por tribunal com o 'ramo_justica' (o da primeira
+    linha do tribunal) e as somas das colunas de contadores.
+    """
+    somas = df_dados.groupby('sigla_tribunal', observed=True)[colunas_contadores].sum()
+    ramos = df_dados.drop_duplicates('sigla_tribunal').set_index('sigla_tribunal')['ramo_justica']
+    somas.insert(0, 'ramo_justica', ramos.reindex(somas.index))
+    return somas
+
+def combinar_parciais(lista_parciais, colunas_contadores=COLUNAS_CONTADORES):
+    """
+    Combina agregados parciais (na ordem recebida) em um único agregado por tribunal.
+    O ramo de cada tribunal é o do primeiro parcial em que ele aparece.
+    """
+    lista_parciais = [p for p in lista_parciais if p is not None and not p.empty]
+    if not lista_parciais:
+        return None
+    df_parciais = pd.concat(lista_parciais)
+    somas = df_parciais.groupby(level=0)[colunas_contadores].sum()
+    ramos = df_parciais[~df_parciais.index.duplicated(keep='first')]['ramo_justica']
+    somas.insert(0, 'ramo_justica', ramos.reindex(somas.index))
+    somas.index.name = 'sigla_tribunal'
+    return somas
+
+# --- 2. Cálculo Vetorizado das Metas ---
+def calcular_metas_vetorizado(df_parciais, colunas_contadores=COLUNAS_CONTADORES):
+    """
+    Calcula todas as metas de todos os tribunais de uma só vez a partir dos
+    agregados por tribunal, retornando o DataFrame no formato do ResumoMetas.csv.
+    'colunas_contadores' são os quatro contadores (na ordem de COLUNAS_CONTADORES) do ano desejado.
+    """
+    col_julgados, col_casos_novos, col_dessobrestados, col_suspensos = colunas_contadores
+    soma_julgados = df_parciais[col_julgados].to_numpy()
+    soma_casos_novos = df_parciais[col_casos_novos].to_numpy()
+    soma_dessobrestados = df_parciais[col_dessobrestados].to_numpy()
+    soma_suspensos = df_parciais[col_suspensos].to_numpy()
+
+    indice_ramos, metas_genericas, matriz = _matriz_multiplicadores()
+    posicao_ramo = indice_ramos.get_indexer(df_parciais['ramo_justica'])
+    sem_mapeamento = df_parciais['ramo_justica'][posicao_ramo == -1]
+    for tribunal_sigla, ramo in sem_mapeamento.items():
+        print(f"Alerta: Ramo de justiça '{ramo}' para o tribunal '{tribunal_sigla}' não possui função de cálculo de metas definida.")
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        denominador_tipo_1 = soma_casos_novos + soma_dessobrestados - soma_suspensos
+        meta1 = np.where(denominador_tipo_1 != 0, (soma_julgados / denominador_tipo_1) * 100, np.nan)
+
+        denominador = soma_casos_novos - soma_suspensos
+        razao = np.where(denominador != 0, soma_julgados / denominador, np.nan)
+        metas = razao[:, None] * matriz[posicao_ramo]
+
+    df_resumo_metas = pd.DataFrame(metas, columns=metas_genericas)
+    df_resumo_metas.insert(0, 'Meta1', meta1)
+    df_resumo_metas.insert(0, 'ramo_justica', df_parciais['ramo_justica'].to_numpy())
+    df_resumo_metas.insert(0, 'tribunal', df_parciais.index.to_numpy())
+    return df_resumo_metas.reindex(columns=ALL_META_COLUMNS).astype(object).fillna("NA")
+
+# --- 3. Geração do Resumo a partir dos Agregados ---
+def gerar_resumo_metas(df_parciais, caminho_arquivo_saida_resumo):
+    """
+    Calcula as metas a partir dos agregados por tribunal e salva o ResumoMetas.csv.
+    """
+    if df_parciais is None or df_parciais.empty:
+        print("Agregados por tribunal vazios. Não é possível gerar o resumo de metas.")
+        return None
+
+    df_resumo_metas = calcular_metas_vetorizado(df_parciais)
+    try:
+        df_resumo_metas.to_csv(caminho_arquivo_saida_resumo, index=False, sep=',', encoding='utf-8')
+        print(f"Arquivo de resumo de metas '{caminho_arquivo_saida_resumo}' gerado com sucesso.")
+    except Exception as e:
+        print(f"Erro ao salvar o arquivo de resumo de metas '{caminho_arquivo_saida_resumo}': {e}")
+    return df_resumo_metas
@@ -0,0 +1,359 @@
+import io
+import json
+import os
+import platform
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from motor_metas import COLUNAS_CONTADORES, COLUNAS_NECESSARIAS, agregar_parciais, combinar_parciais
+from esquema import concatenar_compacto, ler_colunas_metas, relatar_memoria
+from leitor_mmap import agregar_arquivo_mmap
+from cache_colunar import carregar_colunas_metas
+from divisao_arquivos import agregar_faixa, planejar_faixas
+from escalonador import Escalonador
+from compressao import abrir_entrada
+from instrumentacao import etapa_instrumentada, executar_medindo, registrar_arquivo, registrar_item
+
+# --- Configurações dos Motores de Execução ---
+MOTORES = ("sequencial", "threads", "processos", "vetorizado")
+NOME_ARQUIVO_CALIBRACAO = ".calibracao_motores.json"
+BYTES_AMOSTRA_CALIBRACAO = 4 * 1024**2
+# Acima deste total de entrada o motor vetorizado (tudo em memória) dá lugar ao sequencial
+LIMITE_BYTES_VETORIZADO = 256 * 1024**2
+
+# --- 1. Agregação de um Arquivo ---
+def ler_colunas_arquivo(caminho_arquivo, pasta_cache=None):
+    """Colunas das metas de UM arquivo: do cache colunar, com 'pasta_cache', ou lidas com o pandas."""
+    if pasta_cache is None:
+        return ler_colunas_metas(caminho_arquivo)
+    df_arquivo, _ = carregar_colunas_metas(caminho_arquivo, pasta_cache)
+    return df_arquivo
+
+def agregar_arquivo(caminho_arquivo, pasta_cache=None):
+    """
+    Lê as colunas das metas de UM arquivo (do cache colunar, com 'pasta_cache', ou com o
+    leitor mapeado em memória) e devolve as somas parciais por tribunal.
+    """
+    if pasta_cache is None:
+        df_parciais, _ = agregar_arquivo_mmap(caminho_arquivo)
+        return df_parciais
+    df_arquivo = ler_colunas_arquivo(caminho_arquivo, pasta_cache)
+    return agregar_parciais(df_arquivo) if df_arquivo is not None else None
+
+def _agregar_em_pool(executor, arquivos_csv, pasta_cache=None):
+    """Agrega os arquivos no pool e combina os parciais na ordem dos arquivos."""
+    futures = [executor.submit(executar_medindo, agregar_arquivo, arquivo, pasta_cache) for arquivo in arquivos_csv]
+    lista_parciais = []
+    for arquivo, future in zip(arquivos_csv, futures):
+        try:
+            df_parciais, segundos = future.result()
+        except Exception as e:
+            print(f"Erro ao ler o arquivo {arquivo}: {e}")
+            continue
+        registrar_arquivo(arquivo, segundos)
+        lista_parciais.append(df_parciais)
+    return combinar_parciais(lista_parciais)
+
+def _somar_intervalo_compartilhado(sigla, ramo, inicio, fim, descritores):
+    """
+    Soma os contadores de UM tribunal lendo diretamente dos blocos de memória
+    compartilhada, no intervalo [inicio, fim) de linhas.
+    """
+    somas = {'sigla_tribunal': sigla, 'ramo_justica': ramo}
+    for coluna, nome_bloco, dtype, num_linhas in descritores:
+        bloco = shared_memory.SharedMemory(name=nome_bloco)
+        try:
+            valores = np.ndarray((num_linhas,), dtype=dtype, buffer=bloco.buf)[inicio:fim]
+            # Mesmo comportamento do pandas: valores ausentes (NaN) são ignorados na soma
+            somas[coluna] = np.nansum(valores) if valores.dtype.kind == 'f' else valores.sum()
+            del valores
+        finally:
+            bloco.close()
+    return somas
+
+def _agregar_memoria_compartilhada(executor, df_dados):
+    """
+    Coloca os contadores de 'df_dados' (ordenados por tribunal) em blocos de memória
+    compartilhada e envia a cada processo apenas o intervalo de linhas de um tribunal,
+    sem serializar DataFrames. Os blocos são sempre liberados, mesmo se algum processo falhar.
+    """
+    # Ordenação estável: o primeiro registro de cada tribunal continua sendo o primeiro do seu intervalo
+    df_ordenado = df_dados.dropna(subset=['sigla_tribunal']).sort_values('sigla_tribunal', kind='stable')
+    siglas = df_ordenado['sigla_tribunal'].to_numpy()
+    inicios = np.flatnonzero(np.r_[True, siglas[1:] != siglas[:-1]]) if len(siglas) else np.array([], dtype=int)
+    fins = np.r_[inicios[1:], len(siglas)]
+    ramos = df_ordenado['ramo_justica'].to_numpy()
+
+    blocos = []
+    resultados = []
+    try:
+        descritores = []
+        for coluna in COLUNAS_CONTADORES:
+            valores = df_ordenado[coluna].to_numpy()
+            if valores.dtype.kind not in 'iuf':
+                valores = pd.to_numeric(df_ordenado[coluna], errors='coerce').to_numpy(dtype='float64')
+            bloco = shared_memory.SharedMemory(create=True, size=max(valores.nbytes, 1))
+            blocos.append(bloco)
+            np.ndarray(valores.shape, dtype=valores.dtype, buffer=bloco.buf)[:] = valores
+            descritores.append((coluna, bloco.name, valores.dtype.str, len(valores)))
+
+        futures = {executor.submit(executar_medindo, _somar_intervalo_compartilhado,
+                                   siglas[i], ramos[i], i, f, descritores): (siglas[i], f - i)
+                   for i, f in zip(inicios, fins)}
+        for future in as_completed(futures):
+            sigla, linhas = futures[future]
+            try:
+                resultado, segundos = future.result()
+            except Exception as e:
+                print(f"Erro ao processar o tribunal '{sigla}': {e}")
+                continue
+            resultados.append(resultado)
+            registrar_item('tribunal', sigla, segundos, int(linhas))
+    finally:
+        for bloco in blocos:
+            bloco.close()
+            bloco.unlink()
+
+    if not resultados:
+        return None
+    return pd.DataFrame(resultados).set_index('sigla_tribunal').sort_index()
+
+# --- 2. Motores ---
+def motor_sequencial(arquivos_csv, num_workers=1, pasta_cache=None):
+    """Um arquivo por vez, no processo principal (memória limitada ao maior arquivo)."""
+    lista_parciais = []
+    for arquivo in arquivos_csv:
+        t_arquivo = time.perf_counter()
+        try:
+            lista_parciais.append(agregar_arquivo(arquivo, pasta_cache))
+        except Exception as e:
+            print(f"Erro ao ler o arquivo {arquivo}: {e}")
+            continue
+        registrar_arquivo(arquivo, time.perf_counter() - t_arquivo)
+    return combinar_parciais(lista_parciais)
+
+def motor_threads(arquivos_csv, num_workers, pasta_cache=None):
+    """Arquivos distribuídos em um pool de threads (o parser do pandas libera o GIL em parte da leitura)."""
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        return _agregar_em_pool(executor, arquivos_csv, pasta_cache)
+
+def motor_processos(arquivos_csv, num_workers, pasta_cache=None, dividir_arquivos=False, memoria_compartilhada=False,
+                    max_em_voo=None, limite_bytes=None):
+    """
+    Arquivos distribuídos em um pool de processos; cada um devolve apenas os agregados,
+    combinados na ordem dos arquivos. As tarefas passam pelo Escalonador: as maiores (em
+    bytes) primeiro, no máximo 'max_em_voo' submetidas e não concluídas e, com
+    'limite_bytes', sem passar desse total de bytes de entrada em voo. Com
+    'dividir_arquivos' (sem cache), cada arquivo é dividido em faixas de bytes alinhadas
+    às linhas, e cada faixa é uma tarefa. Com 'memoria_compartilhada', as colunas das metas
+    são lidas aqui e os processos somam cada tribunal a partir de memória compartilhada.
+    """
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        if memoria_compartilhada:
+            df_dados = motor_vetorizado_dados(arquivos_csv, pasta_cache)
+            if df_dados is None:
+                return None
+            print(f"Somando os tribunais em {executor._max_workers} processos (memória compartilhada)...")
+            return _agregar_memoria_compartilhada(executor, df_dados)
+
+        if dividir_arquivos and pasta_cache is None:
+            faixas = planejar_faixas(arquivos_csv, executor._max_workers)
+            print(f"{len(arquivos_csv)} arquivo(s) divididos em {len(faixas)} faixa(s).")
+            intervalos = {(i, j): (inicio, fim) for i, j, _, inicio, fim, _ in faixas}
+            tarefas = [((i, j), fim - inicio, fim - inicio, lambda args=(arquivo, inicio, fim, cabecalho): args)
+                       for i, j, arquivo, inicio, fim, cabecalho in faixas]
+            funcao = agregar_faixa
+        else:
+            tarefas = []
+            for i, arquivo in enumerate(arquivos_csv):
+                tamanho = os.path.getsize(arquivo)
+                tarefas.append(((i, 0), tamanho, tamanho, lambda args=(arquivo, pasta_cache): args))
+            funcao = agregar_arquivo
+
+        escalonador = Escalonador(executor, max_em_voo, limite_bytes)
+        parciais_por_tarefa = {}
+        arquivos_com_erro = set()
+        for (i, j), future in escalonador.executar(tarefas, funcao):
+            arquivo = arquivos_csv[i]
+            try:
+                resultado, segundos, _ = future.result()
+            except Exception as e:
+                print(f"Erro ao ler o arquivo {arquivo}: {e}")
+                arquivos_com_erro.add(i)
+                continue
+            if funcao is agregar_faixa:
+                parciais_por_tarefa[(i, j)], linhas = resultado
+                inicio, fim = intervalos[(i, j)]
+                registrar_item('faixa', f"{arquivo}[{inicio}:{fim}]", segundos, linhas, fim - inicio)
+            else:
+                parciais_por_tarefa[(i, j)] = resultado
+                registrar_arquivo(arquivo, segundos)
+        escalonador.relatar()
+
+    # Na ordem dos arquivos (e das faixas), para manter o mesmo 'ramo_justica' da versão
+    # consolidada; um arquivo com alguma faixa com erro fica de fora por inteiro
+    return combinar_parciais([parciais_por_tarefa[chave] for chave in sorted(parciais_por_tarefa)
+                              if chave[0] not in arquivos_com_erro])
+
+def motor_vetorizado_dados(arquivos_csv, pasta_cache=None):
+    """Colunas das metas de todos os arquivos, concatenadas em um único DataFrame (ou None)."""
+    lista_de_dfs = []
+    for arquivo in arquivos_csv:
+        t_arquivo = time.perf_counter()
+        try:
+            df_arquivo = ler_colunas_arquivo(arquivo, pasta_cache)
+        except Exception as e:
+            print(f"Erro ao ler o arquivo {arquivo}: {e}")
+            continue
+        if df_arquivo is not None:
+            lista_de_dfs.append(df_arquivo)
+            registrar_arquivo(arquivo, time.perf_counter() - t_arquivo, len(df_arquivo))
+    if not lista_de_dfs:
+        return None
+    df_dados = concatenar_compacto(lista_de_dfs)
+    relatar_memoria(df_dados, "motor vetorizado")
+    return df_dados
+
+def motor_vetorizado(arquivos_csv, num_workers=1, pasta_cache=None):
+    """Lê todos os arquivos, concatena e agrega todos os tribunais em um único groupby."""
+    df_dados = motor_vetorizado_dados(arquivos_csv, pasta_cache)
+    return agregar_parciais(df_dados) if df_dados is not None else None
+
+FUNCOES_MOTORES = {
+    "sequencial": motor_sequencial,
+    "threads": motor_threads,
+    "processos": motor_processos,
+    "vetorizado": motor_vetorizado,
+}
+
+@etapa_instrumentada("agregar csvs (motor)")
+def executar_motor(motor, arquivos_csv, num_workers, pasta_cache=None, **opcoes_processos):
+    """
+    Calcula os agregados por tribunal dos 'arquivos_csv' com o motor escolhido, a partir
+    do cache colunar com 'pasta_cache'. 'opcoes_processos' só valem para o motor
+    'processos' (ver motor_processos).
+    """
+    print(f"Agregando {len(arquivos_csv)} arquivo(s) com o motor '{motor}' ({num_workers} worker(s))...")
+    return FUNCOES_MOTORES[motor](arquivos_csv, num_workers, pasta_cache, **opcoes_processos)
+
+# --- 3. Calibração (modo auto) ---
+def _assinatura_maquina():
+    return {'cpus': os.cpu_count() or 1, 'python': platform.python_version(), 'pandas': pd.__version__}
+
+def _amostra_csv(caminho_arquivo, limite_bytes):
+    """Primeiros 'limite_bytes' do arquivo, cortados na última quebra de linha."""
+    with abrir_entrada(caminho_arquivo) as f:
+        amostra = f.read(limite_bytes)
+    if len(amostra) == limite_bytes and b'\n' in amostra:
+        amostra = amostra[:amostra.rindex(b'\n') + 1]
+    return amostra
+
+def _ler_amostra(amostra):
+    return pd.read_csv(io.BytesIO(amostra), sep=',', encoding='utf-8', usecols=lambda c: c in COLUNAS_NECESSARIAS)
+
+def _tarefa_vazia(_):
+    return os.getpid()
+
+def calibrar(arquivos_csv):
+    """
+    Sonda rápida da máquina: vazão de leitura (bytes/s) em uma amostra do maior
+    arquivo, ganho de ler a amostra em 2 threads ao mesmo tempo e custo de subir
+    um pool com 2 processos.
+    """
+    print("Calibrando os motores de execução...")
+    maior = max(arquivos_csv, key=os.path.getsize)
+    amostra = _amostra_csv(maior, BYTES_AMOSTRA_CALIBRACAO)
+    _ler_amostra(amostra)  # aquecimento (imports e caches do pandas)
+    t = time.perf_counter()
+    _ler_amostra(amostra)
+    tempo_um = max(time.perf_counter() - t, 1e-6)
+
+    calibracao = {
+        'assinatura': _assinatura_maquina(),
+        'data': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'vazao_bytes_s': len(amostra) / tempo_um,
+        'ganho_2_threads': 1.0,
+        'custo_pool_2_processos_s': None,
+    }
+    if calibracao['assinatura']['cpus'] > 1:
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            t = time.perf_counter()
+            list(executor.map(_ler_amostra, [amostra, amostra]))
+            calibracao['ganho_2_threads'] = 2 * tempo_um / max(time.perf_counter() - t, 1e-6)
+        t = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            list(executor.map(_tarefa_vazia, range(2)))
+        calibracao['custo_pool_2_processos_s'] = time.perf_counter() - t
+    return calibracao
+
+def carregar_calibracao(caminho_calibracao):
+    """Calibração salva em uma execução anterior, se for desta mesma máquina/ambiente."""
+    try:
+        with open(caminho_calibracao, encoding='utf-8') as f:
+            calibracao = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if calibracao.get('assinatura') != _assinatura_maquina():
+        return None
+    return calibracao
+
+def salvar_calibracao(calibracao, caminho_calibracao):
+    try:
+        os.makedirs(os.path.dirname(caminho_calibracao) or ".", exist_ok=True)
+        with open(caminho_calibracao, 'w', encoding='utf-8') as f:
+            json.dump(calibracao, f, ensure_ascii=False, indent=2)
+    except OSError as e:
+        print(f"Alerta: não foi possível salvar a calibração em '{caminho_calibracao}': {e}")
+
+def escolher_motor(arquivos_csv, calibracao, num_cpus=None):
+    """
+    Estima o tempo de cada motor a partir do número de arquivos, do total de bytes,
+    do número de CPUs e da calibração, e devolve (motor, num_workers, estimativas).
+    Os motores de um só worker são preferidos em caso de empate.
+    """
+    num_cpus = num_cpus or os.cpu_count() or 1
+    total_bytes = sum(os.path.getsize(a) for a in arquivos_csv)
+    tempo_serial = total_bytes / calibracao['vazao_bytes_s']
+    num_workers = min(num_cpus, len(arquivos_csv))
+
+    motor_serial = "vetorizado" if total_bytes <= LIMITE_BYTES_VETORIZADO else "sequencial"
+    estimativas = {motor_serial: (tempo_serial, 1)}
+    if num_workers > 1:
+        # Cada thread extra rende o ganho extra medido com 2 threads
+        ganho_threads = 1 + max(calibracao['ganho_2_threads'] - 1, 0) * (num_workers - 1)
+        estimativas['threads'] = (tempo_serial / ganho_threads, num_workers)
+        if calibracao.get('custo_pool_2_processos_s') is not None:
+            custo_pool = calibracao['custo_pool_2_processos_s'] * num_workers / 2
+            estimativas['processos'] = (custo_pool + tempo_serial / num_workers, num_workers)
+
+    motor = min(estimativas, key=lambda m: estimativas[m][0])
+    return motor, estimativas[motor][1], estimativas
+
+def resolver_motor(motor, arquivos_csv, num_workers=None, pasta_calibracao=".", recalibrar=False):
+    """
+    Traduz o motor pedido ('auto' ou um de MOTORES) em (motor, num_workers). No modo
+    'auto' a calibração é feita uma vez e reaproveitada das execuções seguintes
+    (arquivo NOME_ARQUIVO_CALIBRACAO em 'pasta_calibracao').
+    """
+    if motor != "auto":
+        if motor not in FUNCOES_MOTORES:
+            raise ValueError(f"Motor '{motor}' desconhecido. Use 'auto' ou um de {MOTORES}.")
+        if num_workers is None:
+            num_workers = 1 if motor in ("sequencial", "vetorizado") else min(os.cpu_count() or 1, len(arquivos_csv))
+        return motor, num_workers
+
+    caminho_calibracao = os.path.join(pasta_calibracao, NOME_ARQUIVO_CALIBRACAO)
+    calibracao = None if recalibrar else carregar_calibracao(caminho_calibracao)
+    if calibracao is None:
+        calibracao = calibrar(arquivos_csv)
+    motor, workers_estimados, estimativas = escolher_motor(arquivos_csv, calibracao)
+    resumo = ", ".join(f"{m}={t:.2f}s" for m, (t, _) in estimativas.items())
+    print(f"Modo auto: motor '{motor}' com {workers_estimados} worker(s) (estimativas: {resumo}).")
+    calibracao['ultima_escolha'] = {'motor': motor, 'num_workers': workers_estimados,
+                                    'num_arquivos': len(arquivos_csv), 'estimativas_s': {m: t for m, (t, _) in estimativas.items()}}
+    salvar_calibracao(calibracao, caminho_calibracao)
+    return motor, num_workers or workers_estimados
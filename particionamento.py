@@ -0,0 +1,184 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import pandas as pd
+
+from motor_metas import agregar_parciais, combinar_parciais
+from esquema import concatenar_compacto, ler_colunas_metas
+from cache_colunar import carregar_colunar, impressao_digital, salvar_colunar
+from motores import motor_sequencial
+from instrumentacao import etapa_instrumentada, registrar_arquivo, registrar_item
+from compressao import listar_arquivos_csv
+
+# --- Configurações do Particionamento ---
+PASTA_PARTICOES = "./Dados_particionados"
+NOME_ARQUIVO_INDICE = "indice.json"
+CHAVES_PARTICAO = ("tribunal", "ramo")
+
+# --- 1. Índice das Partições ---
+def _origem(arquivos_csv):
+    """Impressões digitais dos arquivos de entrada, na ordem em que são processados."""
+    return [impressao_digital(arquivo) for arquivo in arquivos_csv]
+
+def _nome_particao(chave, valor):
+    # Hash do valor: nomes de arquivo seguros mesmo com acentos, espaços ou barras
+    texto = "" if valor is None else str(valor)
+    return f"{chave}_{hashlib.sha1(texto.encode('utf-8')).hexdigest()[:12]}.npz"
+
+def carregar_indice(pasta_particoes=PASTA_PARTICOES):
+    """Lê o índice das partições (ou None se não existir)."""
+    try:
+        with open(os.path.join(pasta_particoes, NOME_ARQUIVO_INDICE), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _salvar_indice(indice, pasta_particoes):
+    caminho_indice = os.path.join(pasta_particoes, NOME_ARQUIVO_INDICE)
+    caminho_tmp = f"{caminho_indice}.tmp"
+    with open(caminho_tmp, 'w', encoding='utf-8') as f:
+        json.dump(indice, f, ensure_ascii=False, indent=1)
+    os.replace(caminho_tmp, caminho_indice)
+
+def indice_atualizado(indice, arquivos_csv):
+    """As partições só valem para exatamente os mesmos arquivos (e na mesma ordem) da época do particionamento."""
+    return indice is not None and indice.get('origem') == _origem(arquivos_csv)
+
+# --- 2. Reparticionamento (executado uma vez) ---
+@etapa_instrumentada("particionar")
+def particionar(caminho_pasta_dados, pasta_particoes=PASTA_PARTICOES, chave="tribunal"):
+    """
+    Reescreve as colunas das metas de todos os 'teste_*.csv' em partições por tribunal
+    (ou pelo ramo do tribunal), no formato colunar compacto do cache (.npz), com um
+    índice tribunal -> (ramo, partição). Todas as linhas de um tribunal ficam na mesma
+    partição e na ordem original dos arquivos, preservando o ramo usado nas metas.
+    Retorna o índice.
+    """
+    if chave not in CHAVES_PARTICAO:
+        raise ValueError(f"Chave de partição '{chave}' inválida. Use uma de {CHAVES_PARTICAO}.")
+    arquivos_csv = listar_arquivos_csv(caminho_pasta_dados)
+    if not arquivos_csv:
+        print(f"Nenhum arquivo CSV encontrado no padrão 'teste_*.csv' na pasta: {caminho_pasta_dados}")
+        return None
+
+    origem = _origem(arquivos_csv)
+    lista_de_dfs = []
+    for arquivo in arquivos_csv:
+        t_arquivo = time.perf_counter()
+        try:
+            df_arquivo = ler_colunas_metas(arquivo)
+        except Exception as e:
+            print(f"Erro ao ler o arquivo {arquivo}: {e}")
+            continue
+        if df_arquivo is not None:
+            lista_de_dfs.append(df_arquivo)
+            registrar_arquivo(arquivo, time.perf_counter() - t_arquivo, len(df_arquivo))
+    if not lista_de_dfs:
+        print("Nenhum dado válido para particionar.")
+        return None
+    df_dados = concatenar_compacto(lista_de_dfs)
+
+    # Ramo de cada tribunal: o da sua primeira linha, como no cálculo das metas
+    ramos = df_dados.drop_duplicates('sigla_tribunal').dropna(subset=['sigla_tribunal'])
+    ramo_do_tribunal = {str(s): (None if pd.isna(r) else str(r)) for s, r in zip(ramos['sigla_tribunal'], ramos['ramo_justica'])}
+    siglas = df_dados['sigla_tribunal'].astype(object)
+    valores_chave = siglas if chave == "tribunal" else siglas.map(ramo_do_tribunal)
+
+    os.makedirs(pasta_particoes, exist_ok=True)
+    indice_anterior = carregar_indice(pasta_particoes)
+    particoes = {}
+    for valor, df_particao in df_dados.groupby(valores_chave, sort=True, dropna=chave == "tribunal"):
+        valor = None if pd.isna(valor) else str(valor)
+        nome = _nome_particao(chave, valor)
+        df_particao = df_particao.reset_index(drop=True)
+        for coluna in ['sigla_tribunal', 'ramo_justica']:
+            df_particao[coluna] = df_particao[coluna].cat.remove_unused_categories()
+        caminho_particao = os.path.join(pasta_particoes, nome)
+        salvar_colunar(df_particao, caminho_particao)
+        particoes[nome] = {'valor': valor, 'linhas': len(df_particao), 'bytes': os.path.getsize(caminho_particao)}
+
+    tribunais = {sigla: {'ramo': ramo, 'particao': _nome_particao(chave, sigla if chave == "tribunal" else ramo)}
+                 for sigla, ramo in ramo_do_tribunal.items()}
+    indice = {'chave': chave, 'gerado_em': time.strftime('%Y-%m-%d %H:%M:%S'), 'origem': origem,
+              'tribunais': tribunais, 'particoes': particoes}
+    _salvar_indice(indice, pasta_particoes)
+
+    # Partições da execução anterior que não existem mais (o índice novo já não as referencia)
+    for nome in (indice_anterior or {}).get('particoes', {}):
+        if nome not in particoes:
+            try:
+                os.remove(os.path.join(pasta_particoes, nome))
+            except FileNotFoundError:
+                pass
+
+    total_mb = sum(p['bytes'] for p in particoes.values()) / 1024**2
+    print(f"{len(particoes)} partição(ões) por {chave} gravada(s) em '{pasta_particoes}' "
+          f"({len(tribunais)} tribunal(is), {total_mb:.1f} MB).")
+    return indice
+
+# --- 3. Leitura com Filtro (predicado aplicado antes da leitura) ---
+def filtrar_parciais(df_parciais, tribunais=None, ramos=None):
+    """Mantém nos agregados apenas os tribunais e/ou ramos informados."""
+    if df_parciais is None:
+        return None
+    mascara = pd.Series(True, index=df_parciais.index)
+    if tribunais:
+        mascara &= df_parciais.index.isin(tribunais)
+    if ramos:
+        mascara &= df_parciais['ramo_justica'].isin(ramos)
+    return df_parciais[mascara]
+
+@etapa_instrumentada("ler partições")
+def agregar_particoes(indice, pasta_particoes=PASTA_PARTICOES, tribunais=None, ramos=None):
+    """
+    Lê do índice quais tribunais atendem ao filtro e carrega apenas as partições que os
+    contêm. Retorna os agregados por tribunal.
+    """
+    selecionados = [sigla for sigla, info in indice['tribunais'].items()
+                    if (not tribunais or sigla in tribunais) and (not ramos or info['ramo'] in ramos)]
+    nomes = sorted({indice['tribunais'][sigla]['particao'] for sigla in selecionados})
+    lista_parciais = []
+    bytes_lidos = 0
+    for nome in nomes:
+        t_particao = time.perf_counter()
+        caminho_particao = os.path.join(pasta_particoes, nome)
+        df_particao = carregar_colunar(caminho_particao)
+        df_particao = df_particao[df_particao['sigla_tribunal'].isin(selecionados)]
+        lista_parciais.append(agregar_parciais(df_particao))
+        bytes_lidos += indice['particoes'][nome]['bytes']
+        registrar_item('particao', nome, time.perf_counter() - t_particao, len(df_particao),
+                       indice['particoes'][nome]['bytes'])
+    print(f"Filtro: {len(selecionados)} tribunal(is) em {len(nomes)} de {len(indice['particoes'])} "
+          f"partição(ões) ({bytes_lidos / 1024**2:.2f} MB lidos).")
+    return combinar_parciais(lista_parciais)
+
+def calcular_parciais_filtrados(caminho_pasta_dados, pasta_particoes=PASTA_PARTICOES, tribunais=None, ramos=None):
+    """
+    Agregados apenas dos tribunais/ramos pedidos: a partir das partições quando elas
+    estão em dia com a pasta de dados; senão, lendo todos os arquivos e filtrando.
+    """
+    arquivos_csv = listar_arquivos_csv(caminho_pasta_dados)
+    if not arquivos_csv:
+        print(f"Nenhum arquivo CSV encontrado no padrão 'teste_*.csv' na pasta: {caminho_pasta_dados}")
+        return None
+    indice = carregar_indice(pasta_particoes)
+    if indice_atualizado(indice, arquivos_csv):
+        return agregar_particoes(indice, pasta_particoes, tribunais, ramos)
+    if indice is None:
+        print(f"Partições não encontradas em '{pasta_particoes}': lendo todos os arquivos (rode particionamento.py).")
+    else:
+        print(f"Alerta: partições em '{pasta_particoes}' desatualizadas em relação a '{caminho_pasta_dados}': "
+              "lendo todos os arquivos (rode particionamento.py novamente).")
+    return filtrar_parciais(motor_sequencial(arquivos_csv), tribunais, ramos)
+
+# --- Função Principal (Main) ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reparticiona os teste_*.csv por tribunal ou ramo (formato colunar).")
+    parser.add_argument("--dados", default="./Dados", help="Pasta dos arquivos teste_*.csv")
+    parser.add_argument("--saida", default=PASTA_PARTICOES, help="Pasta das partições e do índice")
+    parser.add_argument("--por", choices=CHAVES_PARTICAO, default="tribunal", help="Chave de partição")
+    args = parser.parse_args()
+    particionar(args.dados, args.saida, args.por)
@@ -0,0 +1,292 @@
+import io
+import os
+import queue
+import threading
+import time
+
+import pandas as pd
+
+from motor_metas import COLUNAS_NECESSARIAS, combinar_parciais
+from leitor_mmap import TAMANHO_BLOCO_MMAP, agregar_bytes, blocos_de_linhas
+from consolidacao_rapida import ler_cabecalho, planejar_consolidado
+from instrumentacao import etapa_instrumentada, registrar_item
+from compressao import abrir_entrada, abrir_saida, arquivo_comprimido, listar_arquivos_csv
+
+# --- Configurações do Pipeline ---
+NUM_LEITORES = 2
+NUM_PARSERS = None    # None = número de CPUs
+# Os arquivos circulam em blocos de linhas completas de ~TAMANHO_BLOCO bytes. Máximo de blocos
+# lidos e ainda não escritos/agregados: limita a memória e dá a contrapressão
+TAMANHO_BLOCO = TAMANHO_BLOCO_MMAP
+BLOCOS_EM_VOO = 8
+_FIM = None
+
+# --- 1. Escrita no Consolidado ---
+def _escrever_no_consolidado(arquivo_saida, bloco, cabecalho, colunas_consolidado, ultimo):
+    """Acrescenta ao consolidado um bloco (linhas completas, sem o cabeçalho) de um arquivo."""
+    linha_cabecalho, colunas, _ = cabecalho
+    if colunas == colunas_consolidado:
+        arquivo_saida.write(bloco)
+        if ultimo and bloco and not bloco.endswith(b'\n'):
+            arquivo_saida.write(b'\n')
+        return
+    df_bloco = pd.read_csv(io.BytesIO(linha_cabecalho + bloco), sep=',', encoding='utf-8').reindex(columns=colunas_consolidado)
+    arquivo_saida.write(df_bloco.to_csv(index=False, header=False, sep=',', lineterminator='\n').encode('utf-8'))
+
+# --- 2. Pipeline Leitura -> Parser -> Agregação (+ Escrita) ---
+@etapa_instrumentada("pipeline")
+def processar_pipeline(caminho_pasta_dados, caminho_arquivo_saida_consolidado=None, num_leitores=NUM_LEITORES,
+                       num_parsers=NUM_PARSERS, blocos_em_voo=BLOCOS_EM_VOO, tamanho_bloco=TAMANHO_BLOCO):
+    """
+    Processa os arquivos 'teste_*.csv' em estágios sobrepostos, ligados por filas limitadas:
+    threads leitoras trazem cada arquivo em blocos de linhas completas (pré-carregamento),
+    threads de parser leem de cada bloco as colunas das metas e agregam por tribunal, o
+    processo principal combina os agregados na ordem dos arquivos e, com
+    'caminho_arquivo_saida_consolidado', uma thread escritora monta o consolidado com os
+    mesmos bytes, em segundo plano. No máximo 'blocos_em_voo' blocos de ~'tamanho_bloco'
+    bytes ficam em memória (mais os do arquivo que a escritora aguarda, que nunca esperam
+    vaga), qualquer que seja o tamanho dos arquivos. Arquivos comprimidos são descomprimidos
+    em fluxo pelas leitoras (os codecs liberam o GIL, então elas descomprimem em paralelo),
+    e o consolidado é comprimido se o seu nome terminar em .gz, .bz2 ou .xz. Um arquivo que
+    falha no meio da leitura fica de fora das metas e do consolidado.
+    Retorna os agregados por tribunal.
+    """
+    arquivos_csv = listar_arquivos_csv(caminho_pasta_dados)
+    if not arquivos_csv:
+        print(f"Nenhum arquivo CSV encontrado no padrão 'teste_*.csv' na pasta: {caminho_pasta_dados}")
+        return None
+    num_parsers = num_parsers or os.cpu_count() or 1
+
+    arquivo_saida = None
+    if caminho_arquivo_saida_consolidado is not None:
+        cabecalhos = {}
+        for arquivo in arquivos_csv:
+            try:
+                cabecalhos[arquivo] = ler_cabecalho(arquivo)
+            except Exception as e:
+                print(f"Erro ao ler o cabeçalho do arquivo {arquivo}: {e}")
+        try:
+            if not cabecalhos:
+                raise OSError("nenhum cabeçalho válido")
+            colunas_consolidado, linha_cabecalho = planejar_consolidado(cabecalhos)
+            # Como na consolidação rápida: grava em '<saida>.tmp' e substitui o consolidado no final
+            arquivo_saida = abrir_saida(f"{caminho_arquivo_saida_consolidado}.tmp", caminho_arquivo_saida_consolidado)
+            arquivo_saida.write(linha_cabecalho)
+        except OSError as e:
+            print(f"Erro ao criar o arquivo consolidado '{caminho_arquivo_saida_consolidado}': {e}")
+            arquivo_saida = None
+
+    # Vagas para blocos em voo. O arquivo que a escritora (ou, sem consolidado, o agregador)
+    # aguarda, o menor ainda não concluído, não espera vaga: assim os blocos que ela precisa
+    # nunca ficam presos atrás dos de outros arquivos (nem do bloco seguinte que o leitor já segura)
+    condicao_vagas = threading.Condition()
+    vagas_livres = [blocos_em_voo]
+    arquivo_da_vez = [0]
+    trava_proximo = threading.Lock()
+    proximo_arquivo = iter(enumerate(arquivos_csv))
+    fila_dados = queue.Queue(maxsize=blocos_em_voo)
+    fila_parciais = queue.Queue(maxsize=blocos_em_voo)
+    fila_escrita = queue.Queue(maxsize=blocos_em_voo)
+    tempo_escrita = [0.0]
+    falha_consolidado = [None]
+
+    def ocupar_vaga(i):
+        with condicao_vagas:
+            while vagas_livres[0] <= 0 and i != arquivo_da_vez[0]:
+                condicao_vagas.wait()
+            vagas_livres[0] -= 1
+
+    def liberar_vaga():
+        with condicao_vagas:
+            vagas_livres[0] += 1
+            condicao_vagas.notify_all()
+
+    def concluir_arquivo_da_vez(i):
+        with condicao_vagas:
+            arquivo_da_vez[0] = i + 1
+            condicao_vagas.notify_all()
+
+    def leitor():
+        while True:
+            with trava_proximo:
+                item = next(proximo_arquivo, None)
+            if item is None:
+                return
+            i, arquivo = item
+            # Cada bloco só é enviado depois da leitura do seguinte, para saber qual é o último
+            j, anterior, erro = 0, None, None
+            cabecalho = None
+            ocupar_vaga(i)
+            try:
+                t = time.perf_counter()
+                with abrir_entrada(arquivo) as f:
+                    cabecalho = f.readline()
+                    try:
+                        colunas = pd.read_csv(io.BytesIO(cabecalho), sep=',', encoding='utf-8', nrows=0).columns
+                    except Exception:
+                        colunas = None  # cabeçalho ilegível: o erro aparece no parser
+                    faltantes = [c for c in COLUNAS_NECESSARIAS if colunas is not None and c not in colunas]
+                    if faltantes:
+                        # Sem as colunas das metas, os blocos só vão para o consolidado
+                        print(f"Alerta: Arquivo {arquivo} não contém as colunas {faltantes}. Arquivo ignorado.")
+                        cabecalho = None
+                    blocos = blocos_de_linhas(f, tamanho_bloco)
+                    while True:
+                        bloco = next(blocos, None)
+                        tempo_leitura = time.perf_counter() - t
+                        if bloco is None:
+                            break
+                        if anterior is not None:
+                            fila_dados.put((i, j, arquivo, cabecalho, *anterior, False, None))
+                            j += 1
+                        anterior = (bloco, tempo_leitura)
+                        ocupar_vaga(i)
+                        t = time.perf_counter()
+            except Exception as e:
+                print(f"Erro ao ler o arquivo {arquivo}: {e}. Nenhuma linha dele foi consolidada.")
+                erro = e
+            if erro is not None or anterior is None:
+                # Sem blocos (arquivo vazio) ou com erro: um item final vazio usa a vaga que sobrou
+                if anterior is not None:
+                    liberar_vaga()
+                fila_dados.put((i, j, arquivo, cabecalho, b'', 0.0, True, erro))
+            else:
+                liberar_vaga()
+                fila_dados.put((i, j, arquivo, cabecalho, *anterior, True, None))
+
+    def parser():
+        while True:
+            item = fila_dados.get()
+            if item is _FIM:
+                return
+            i, j, arquivo, cabecalho, bloco, tempo_leitura, ultimo, erro = item
+            df_parciais, linhas, tempo_parser, valido = None, None, 0.0, erro is None
+            # Sem cabeçalho (colunas das metas ausentes) o bloco não é agregado
+            if valido and cabecalho is not None and (bloco or j == 0):
+                t = time.perf_counter()
+                try:
+                    df_parciais, linhas = agregar_bytes(cabecalho + bloco, arquivo)
+                except Exception as e:
+                    print(f"Erro ao ler o arquivo {arquivo}: {e}")
+                    valido = False
+                tempo_parser = time.perf_counter() - t
+            fila_parciais.put((i, j, arquivo, df_parciais, linhas, len(bloco), tempo_leitura, tempo_parser, ultimo, valido))
+            if arquivo_saida is not None:
+                fila_escrita.put((i, j, arquivo, bloco, ultimo, erro))
+            else:
+                liberar_vaga()
+
+    def escrever_bloco(estado, arquivo, bloco, ultimo, erro, primeiro):
+        # estado = [início do arquivo na saída, arquivo descartado]
+        if primeiro:
+            estado[1] = arquivo not in cabecalhos or falha_consolidado[0] is not None
+            if not estado[1]:
+                estado[0] = arquivo_saida.tell()
+                if cabecalhos[arquivo][1] != colunas_consolidado:
+                    print(f"Arquivo {arquivo} com colunas diferentes do consolidado: usando leitura com pandas.")
+        try:
+            if erro is not None and not estado[1]:
+                raise erro
+            if bloco and not estado[1]:
+                _escrever_no_consolidado(arquivo_saida, bloco, cabecalhos[arquivo], colunas_consolidado, ultimo)
+        except Exception as e:
+            if erro is None:
+                print(f"Erro ao consolidar o arquivo {arquivo}: {e}")
+            estado[1] = True
+            # O arquivo sai do consolidado: a saída volta ao início dele (comprimida, não há como)
+            if arquivo_comprimido(caminho_arquivo_saida_consolidado):
+                falha_consolidado[0] = f"o arquivo {arquivo} falhou depois de parcialmente escrito na saída comprimida"
+            else:
+                arquivo_saida.seek(estado[0])
+                arquivo_saida.truncate()
+
+    def escritor():
+        # Escreve na ordem dos arquivos e dos blocos; os que chegam adiantados aguardam em 'pendentes'.
+        # Uma falha da própria saída (tell/seek/truncate/close, ex.: disco cheio) abandona o consolidado,
+        # mas a fila continua sendo esvaziada e as vagas liberadas, para os parsers e leitores não travarem
+        pendentes = {}
+        proximo = (0, 0)
+        estado = [0, False]
+        while proximo[0] < len(arquivos_csv):
+            i, j, arquivo, bloco, ultimo, erro = fila_escrita.get()
+            pendentes[(i, j)] = (arquivo, bloco, ultimo, erro)
+            while proximo in pendentes:
+                arquivo, bloco, ultimo, erro = pendentes.pop(proximo)
+                t = time.perf_counter()
+                if falha_consolidado[0] is None:
+                    try:
+                        escrever_bloco(estado, arquivo, bloco, ultimo, erro, proximo[1] == 0)
+                    except Exception as e:
+                        falha_consolidado[0] = f"falha na escrita do consolidado ({arquivo}): {e}"
+                tempo_escrita[0] += time.perf_counter() - t
+                if ultimo:
+                    concluir_arquivo_da_vez(proximo[0])
+                    proximo = (proximo[0] + 1, 0)
+                else:
+                    proximo = (proximo[0], proximo[1] + 1)
+                liberar_vaga()
+        try:
+            arquivo_saida.close()
+        except Exception as e:
+            if falha_consolidado[0] is None:
+                falha_consolidado[0] = f"falha ao fechar o consolidado: {e}"
+
+    threads = [threading.Thread(target=leitor, name=f"leitor_{n}") for n in range(num_leitores)]
+    threads += [threading.Thread(target=parser, name=f"parser_{n}") for n in range(num_parsers)]
+    if arquivo_saida is not None:
+        threads.append(threading.Thread(target=escritor, name="escritor"))
+    for thread in threads:
+        thread.start()
+
+    # Agregador: combina na ordem dos arquivos e dos blocos (o ramo de cada tribunal é o do
+    # primeiro arquivo em que ele aparece), guardando os agregados que chegam adiantados. Os
+    # blocos de um arquivo só entram no total quando o último chega sem erro
+    df_parciais = None
+    pendentes = {}
+    proximo = (0, 0)
+    parciais_arquivo, linhas_arquivo, tamanho_arquivo, tempo_arquivo, arquivo_valido = [], 0, 0, 0.0, True
+    tempo_leitura_total = tempo_parser_total = 0.0
+    while proximo[0] < len(arquivos_csv):
+        i, j, arquivo, parciais, linhas, tamanho, tempo_leitura, tempo_parser, ultimo, valido = fila_parciais.get()
+        pendentes[(i, j)] = (arquivo, parciais, linhas, tamanho, tempo_leitura, tempo_parser, ultimo, valido)
+        while proximo in pendentes:
+            arquivo, parciais, linhas, tamanho, tempo_leitura, tempo_parser, ultimo, valido = pendentes.pop(proximo)
+            tempo_leitura_total += tempo_leitura
+            tempo_parser_total += tempo_parser
+            tempo_arquivo += tempo_leitura + tempo_parser
+            tamanho_arquivo += tamanho
+            linhas_arquivo = linhas_arquivo + linhas if linhas is not None and linhas_arquivo is not None else None
+            arquivo_valido = arquivo_valido and valido
+            parciais_arquivo.append(parciais)
+            if not ultimo:
+                proximo = (proximo[0], proximo[1] + 1)
+                continue
+            registrar_item('arquivo', arquivo, tempo_arquivo, linhas_arquivo if arquivo_valido else None, tamanho_arquivo)
+            if arquivo_valido:
+                df_parciais = combinar_parciais([df_parciais] + parciais_arquivo)
+            if arquivo_saida is None:
+                concluir_arquivo_da_vez(proximo[0])
+            parciais_arquivo, linhas_arquivo, tamanho_arquivo, tempo_arquivo, arquivo_valido = [], 0, 0, 0.0, True
+            proximo = (proximo[0] + 1, 0)
+
+    for _ in range(num_parsers):
+        fila_dados.put(_FIM)
+    for thread in threads:
+        thread.join()
+
+    print(f"Pipeline: {len(arquivos_csv)} arquivo(s) com {num_leitores} leitor(es) e {num_parsers} parser(s); "
+          f"ocupação somada: leitura {tempo_leitura_total:.2f}s, parser {tempo_parser_total:.2f}s, "
+          f"escrita {tempo_escrita[0]:.2f}s.")
+    if arquivo_saida is not None:
+        try:
+            if falha_consolidado[0] is not None:
+                try:
+                    os.remove(f"{caminho_arquivo_saida_consolidado}.tmp")
+                except OSError:
+                    pass
+                raise OSError(falha_consolidado[0])
+            os.replace(f"{caminho_arquivo_saida_consolidado}.tmp", caminho_arquivo_saida_consolidado)
+            print(f"Arquivo consolidado '{caminho_arquivo_saida_consolidado}' gerado pelo pipeline.")
+        except OSError as e:
+            print(f"Erro ao salvar o arquivo consolidado '{caminho_arquivo_saida_consolidado}': {e}")
+    return df_parciais
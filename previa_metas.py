@@ -0,0 +1,308 @@
+import argparse
+import csv
+import io
+import os
+import time
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from motor_metas import COLUNAS_CONTADORES, COLUNAS_NECESSARIAS, METAS, calcular_metas_vetorizado
+from esquema import ler_csv_compacto
+from compressao import abrir_entrada, arquivo_comprimido, listar_arquivos_csv
+from divisao_arquivos import dividir_arquivo
+from leitor_mmap import blocos_de_linhas
+from instrumentacao import etapa_instrumentada, iniciar_metricas, registrar_item, salvar_metricas
+
+# --- Configurações da Prévia ---
+NOME_ARQUIVO_RESUMO_PREVIA = "ResumoMetas_previa.csv"
+NOME_ARQUIVO_INTERVALOS_PREVIA = "ResumoMetas_previa_intervalos.csv"
+# ResumoMetas.csv da última execução completa: os tribunais dele que não aparecem na prévia são avisados
+NOME_ARQUIVO_RESUMO_REFERENCIA = "ResumoMetas.csv"
+PASTA_GRAFICOS_PREVIA = "previa"
+METAS_PARA_PLOTAR = ['Meta1', 'Meta2A', 'Meta2ANT', 'Meta4A', 'Meta6']
+FRACAO_BLOCOS = 0.1            # fração dos blocos de cada arquivo que é lida
+TAMANHO_BLOCO_PREVIA = 1024 * 1024
+NIVEL_CONFIANCA = 0.95
+# Tribunais vistos em menos blocos sorteados que isto têm o intervalo avisado como pouco confiável
+BLOCOS_MINIMOS_TRIBUNAL = 5
+
+# --- 1. Amostra de Blocos ---
+class AmostraDeBlocos:
+    """
+    Amostra por conglomerados: o primeiro bloco de cada arquivo é sempre lido e os demais
+    são sorteados. De cada bloco lido ficam, por tribunal, as somas dos contadores e o
+    número de linhas, além do ramo da primeira linha de cada tribunal. As linhas de um
+    bloco não são independentes (os arquivos costumam vir ordenados por tribunal), por
+    isso a unidade da amostra é o bloco.
+    """
+
+    def __init__(self, colunas_contadores=COLUNAS_CONTADORES):
+        self.colunas_contadores = list(colunas_contadores)
+        self.ramos = {}
+        self.blocos_lidos = 0
+        self.blocos_sorteaveis = 0    # blocos que não são o primeiro do arquivo
+        self.blocos_sorteados = 0     # desses, os lidos
+        self._somas = []
+
+    def registrar_sorteaveis(self, num_blocos):
+        """Conta 'num_blocos' blocos que entram no sorteio (todos menos o primeiro de cada arquivo)."""
+        self.blocos_sorteaveis += num_blocos
+
+    def adicionar(self, df, primeiro):
+        """Guarda as somas por tribunal de um bloco lido ('primeiro': o primeiro bloco do arquivo)."""
+        df = df.dropna(subset=['sigla_tribunal'])
+        primeiras = df.drop_duplicates('sigla_tribunal')
+        for sigla, ramo in zip(primeiras['sigla_tribunal'].astype(object), primeiras['ramo_justica'].astype(object)):
+            self.ramos.setdefault(sigla, ramo)
+
+        # Como na soma do pandas, um contador ausente não soma nada
+        grupos = df.groupby(df['sigla_tribunal'].astype(object).rename('sigla_tribunal'), sort=False)
+        somas = grupos[self.colunas_contadores].sum().astype('float64')
+        somas.insert(0, 'linhas', grupos.size())
+        somas.insert(0, 'primeiro', primeiro)
+        somas.insert(0, 'bloco', self.blocos_lidos)
+        self._somas.append(somas.reset_index())
+        self.blocos_lidos += 1
+        if not primeiro:
+            self.blocos_sorteados += 1
+
+    def __len__(self):
+        return int(sum(somas['linhas'].sum() for somas in self._somas))
+
+    @property
+    def somas(self):
+        """Uma linha por (bloco lido, tribunal): 'bloco', 'primeiro', 'sigla_tribunal', 'linhas' e os contadores."""
+        colunas = ['bloco', 'primeiro', 'sigla_tribunal', 'linhas'] + self.colunas_contadores
+        if not self._somas:
+            return pd.DataFrame(columns=colunas)
+        return pd.concat(self._somas, ignore_index=True)[colunas]
+
+# --- 2. Leitura de Blocos Sorteados ---
+def amostrar_arquivo(caminho_arquivo, amostra, fracao_blocos, tamanho_bloco, rng):
+    """
+    Divide o arquivo em blocos de ~'tamanho_bloco' bytes cortados em quebras de linha fora
+    de aspas (como na divisão de arquivos grandes), lê o primeiro e uma fração sorteada
+    dos demais e passa cada bloco lido para a 'amostra'. Arquivos comprimidos são lidos
+    em fluxo, mas só os blocos sorteados são interpretados.
+    Retorna (bytes de dados interpretados, bytes de dados do arquivo).
+    """
+    with abrir_entrada(caminho_arquivo) as f:
+        cabecalho = f.readline()
+        colunas = next(csv.reader([cabecalho.decode('utf-8-sig').rstrip('\r\n')]), [])
+        faltantes = [c for c in COLUNAS_NECESSARIAS if c not in colunas]
+        if faltantes:
+            print(f"Alerta: Arquivo {caminho_arquivo} não contém as colunas {faltantes}. Arquivo ignorado.")
+            return 0, 0
+
+        def interpretar(dados, primeiro):
+            amostra.adicionar(ler_csv_compacto(io.BytesIO(cabecalho + dados), COLUNAS_NECESSARIAS), primeiro)
+            return len(dados)
+
+        if arquivo_comprimido(caminho_arquivo):
+            lidos = total = num_blocos = 0
+            for dados in blocos_de_linhas(f, tamanho_bloco):
+                if num_blocos > 0:
+                    amostra.registrar_sorteaveis(1)
+                if num_blocos == 0 or rng.random() < fracao_blocos:
+                    lidos += interpretar(dados, num_blocos == 0)
+                total += len(dados)
+                num_blocos += 1
+            return lidos, total
+
+        _, faixas = dividir_arquivo(caminho_arquivo, tamanho_bloco)
+        faixas = [(inicio, fim) for inicio, fim in faixas if fim > inicio]
+        if not faixas:
+            return 0, 0
+        amostra.registrar_sorteaveis(len(faixas) - 1)
+        sorteados = np.r_[0, 1 + np.flatnonzero(rng.random(len(faixas) - 1) < fracao_blocos)]
+        lidos = 0
+        for bloco in sorteados:
+            inicio, fim = faixas[bloco]
+            f.seek(inicio)
+            lidos += interpretar(f.read(fim - inicio), bloco == 0)
+        return lidos, faixas[-1][1] - faixas[0][0]
+
+# --- 3. Estimativas e Intervalos de Confiança ---
+def _razao_e_erro_padrao(tabela, col_x, sorteados, sorteaveis):
+    """
+    Estimador de razão soma(y)/soma(x) por tribunal, com as somas expandidas pelos pesos
+    dos blocos, e o seu erro padrão pela linearização: os resíduos e = y - R*x de cada
+    bloco sorteado, tomados como amostra aleatória simples dos blocos sorteáveis (um bloco
+    sorteado sem o tribunal tem resíduo zero), com correção para população finita. Os
+    primeiros blocos, lidos sempre, não têm erro de amostragem.
+    """
+    siglas = tabela['sigla_tribunal']
+    soma_y = (tabela['y'] * tabela['peso']).groupby(siglas, sort=True).sum()
+    soma_x = (tabela[col_x] * tabela['peso']).groupby(siglas, sort=True).sum()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        razao = soma_y / soma_x
+        do_sorteio = tabela[tabela['sorteado']]
+        residuos = do_sorteio['y'] - do_sorteio['sigla_tribunal'].map(razao) * do_sorteio[col_x]
+        soma_e = residuos.groupby(do_sorteio['sigla_tribunal']).sum().reindex(razao.index, fill_value=0.0)
+        soma_e2 = (residuos ** 2).groupby(do_sorteio['sigla_tribunal']).sum().reindex(razao.index, fill_value=0.0)
+        if sorteados >= 2:
+            variancia_residuos = (soma_e2 - soma_e ** 2 / sorteados) / (sorteados - 1)
+            variancia = sorteaveis ** 2 * (1 - sorteados / sorteaveis) * variancia_residuos / sorteados
+        else:
+            # Tudo lido: a estimativa é exata; um só bloco sorteado (ou nenhum): sem como estimar
+            variancia = pd.Series(0.0 if sorteaveis == sorteados else np.nan, index=razao.index)
+        erro_padrao = np.sqrt(variancia.clip(lower=0)) / soma_x.abs()
+    return razao.where(soma_x != 0), erro_padrao.where(soma_x != 0)
+
+def estimar_metas(amostra, nivel_confianca=NIVEL_CONFIANCA):
+    """
+    Estima as metas de cada tribunal a partir dos blocos lidos e os intervalos de confiança.
+    As somas dos blocos sorteados são expandidas pela fração sorteada (os primeiros blocos
+    entram com peso 1) e, como as metas são razões de somas, dão a estimativa pontual; a
+    variância é calculada entre blocos (ver _razao_e_erro_padrao).
+    Retorna (DataFrame no formato do ResumoMetas, DataFrame longo com os intervalos).
+    """
+    col_julgados, col_casos_novos, col_dessobrestados, col_suspensos = amostra.colunas_contadores
+    somas = amostra.somas
+    sorteados, sorteaveis = amostra.blocos_sorteados, amostra.blocos_sorteaveis
+    peso_sorteado = sorteaveis / sorteados if sorteados else 1.0
+    pesos = np.where(somas['primeiro'].to_numpy(dtype=bool), 1.0, peso_sorteado)
+
+    df_parciais = somas[amostra.colunas_contadores].mul(pesos, axis=0).groupby(somas['sigla_tribunal'], sort=True).sum()
+    df_parciais.insert(0, 'ramo_justica', [amostra.ramos[sigla] for sigla in df_parciais.index])
+    df_resumo = calcular_metas_vetorizado(df_parciais, amostra.colunas_contadores)
+
+    tabela = pd.DataFrame({
+        'sigla_tribunal': somas['sigla_tribunal'],
+        'sorteado': ~somas['primeiro'].to_numpy(dtype=bool),
+        'peso': pesos,
+        'y': somas[col_julgados],
+        'x_tipo_1': somas[col_casos_novos] + somas[col_dessobrestados] - somas[col_suspensos],
+        'x': somas[col_casos_novos] - somas[col_suspensos],
+    })
+    grupos = somas.groupby('sigla_tribunal', sort=True)
+    n = grupos['linhas'].sum()
+    blocos = grupos.size()
+    blocos_sorteados = tabela['sorteado'].groupby(tabela['sigla_tribunal'], sort=True).sum()
+    linhas_estimadas = (somas['linhas'] * pesos).groupby(somas['sigla_tribunal'], sort=True).sum()
+    razao_tipo_1, erro_tipo_1 = _razao_e_erro_padrao(tabela, 'x_tipo_1', sorteados, sorteaveis)
+    razao, erro = _razao_e_erro_padrao(tabela, 'x', sorteados, sorteaveis)
+    z = NormalDist().inv_cdf(0.5 + nivel_confianca / 2)
+
+    intervalos = []
+    for meta in METAS:
+        estimativa = pd.to_numeric(df_resumo[meta], errors='coerce').to_numpy()
+        r, ep = (razao_tipo_1, erro_tipo_1) if meta == 'Meta1' else (razao, erro)
+        # A meta é um múltiplo da razão: o intervalo relativo é o mesmo da razão
+        with np.errstate(divide='ignore', invalid='ignore'):
+            relativo = np.where(r.to_numpy() != 0, z * ep.to_numpy() / np.abs(r.to_numpy()), 0.0)
+        semi_amplitude = np.abs(estimativa) * relativo
+        validas = ~np.isnan(estimativa)
+        intervalos.append(pd.DataFrame({
+            'tribunal': df_resumo['tribunal'].to_numpy()[validas],
+            'ramo_justica': df_resumo['ramo_justica'].to_numpy()[validas],
+            'meta': meta,
+            'estimativa': estimativa[validas],
+            'ic_inferior': (estimativa - semi_amplitude)[validas],
+            'ic_superior': (estimativa + semi_amplitude)[validas],
+            'amostra': n.to_numpy()[validas],
+            'blocos': blocos.to_numpy()[validas],
+            'blocos_sorteados': blocos_sorteados.to_numpy()[validas],
+            'linhas_estimadas': np.round(linhas_estimadas.to_numpy()[validas]).astype('int64'),
+        }))
+    return df_resumo, pd.concat(intervalos, ignore_index=True)
+
+def avisar_cobertura(amostra, df_resumo, pasta_saida):
+    """
+    Avisa o que a amostra de blocos não cobre: tribunais do último ResumoMetas.csv da
+    pasta de saída que não apareceram em nenhum bloco lido (ou, sem ele, que tribunais
+    presentes só nos blocos não lidos ficam de fora) e tribunais vistos em poucos blocos
+    sorteados, cujo intervalo é pouco confiável.
+    """
+    if amostra.blocos_sorteados == amostra.blocos_sorteaveis:
+        return
+    vistos = set(df_resumo['tribunal'])
+    caminho_referencia = os.path.join(pasta_saida, NOME_ARQUIVO_RESUMO_REFERENCIA)
+    try:
+        referencia = pd.read_csv(caminho_referencia, usecols=['tribunal'])['tribunal']
+    except (OSError, ValueError):
+        nao_lidos = amostra.blocos_sorteaveis - amostra.blocos_sorteados
+        print(f"Alerta: {nao_lidos} bloco(s) não foram lidos; tribunais presentes só neles não aparecem na prévia.")
+    else:
+        ausentes = sorted(set(referencia) - vistos)
+        if ausentes:
+            print(f"Alerta: {len(ausentes)} tribunal(is) de '{caminho_referencia}' não aparecem em nenhum bloco lido "
+                  f"e ficaram fora da prévia: {ausentes}")
+    sorteados = amostra.somas.loc[~amostra.somas['primeiro'].to_numpy(dtype=bool), 'sigla_tribunal'].value_counts()
+    raros = sorted(t for t in vistos if sorteados.get(t, 0) < BLOCOS_MINIMOS_TRIBUNAL)
+    if raros:
+        print(f"Alerta: {len(raros)} tribunal(is) vistos em menos de {BLOCOS_MINIMOS_TRIBUNAL} bloco(s) sorteado(s); "
+              f"estimativas e intervalos pouco confiáveis: {raros}")
+
+# --- 4. Prévia Completa ---
+@etapa_instrumentada("prévia amostral")
+def gerar_previa(caminho_pasta_dados, pasta_saida, fracao_blocos=FRACAO_BLOCOS, tamanho_bloco=TAMANHO_BLOCO_PREVIA,
+                 nivel_confianca=NIVEL_CONFIANCA, semente=None, gerar_graficos=True):
+    """
+    Prévia das metas em uma fração do tempo da execução completa: lê blocos sorteados dos
+    arquivos (a amostra por conglomerados de AmostraDeBlocos) e grava o ResumoMetas_previa.csv
+    (mesmo formato do ResumoMetas.csv), os intervalos de confiança de cada meta e os
+    gráficos em 'previa/'. A execução exata deve vir em seguida.
+    Retorna o DataFrame do resumo provisório (ou None).
+    """
+    arquivos_csv = listar_arquivos_csv(caminho_pasta_dados)
+    if not arquivos_csv:
+        print(f"Nenhum arquivo CSV encontrado no padrão 'teste_*.csv' na pasta: {caminho_pasta_dados}")
+        return None
+
+    rng = np.random.default_rng(semente)
+    amostra = AmostraDeBlocos()
+    bytes_lidos = bytes_totais = 0
+    for arquivo in arquivos_csv:
+        t_arquivo = time.perf_counter()
+        try:
+            lidos, total = amostrar_arquivo(arquivo, amostra, fracao_blocos, tamanho_bloco, rng)
+        except Exception as e:
+            print(f"Erro ao ler o arquivo {arquivo}: {e}")
+            continue
+        bytes_lidos += lidos
+        bytes_totais += total
+        registrar_item('arquivo', arquivo, time.perf_counter() - t_arquivo, None, lidos)
+
+    if not amostra.ramos:
+        print("Nenhuma linha amostrada. Não é possível gerar a prévia.")
+        return None
+    fracao_lida = bytes_lidos / bytes_totais if bytes_totais else 1.0
+    df_resumo, df_intervalos = estimar_metas(amostra, nivel_confianca)
+    avisar_cobertura(amostra, df_resumo, pasta_saida)
+
+    caminho_resumo = os.path.join(pasta_saida, NOME_ARQUIVO_RESUMO_PREVIA)
+    caminho_intervalos = os.path.join(pasta_saida, NOME_ARQUIVO_INTERVALOS_PREVIA)
+    try:
+        df_resumo.to_csv(caminho_resumo, index=False, sep=',', encoding='utf-8')
+        df_intervalos.to_csv(caminho_intervalos, index=False, sep=',', encoding='utf-8')
+        print(f"Prévia: {len(amostra)} linha(s) de {len(df_resumo)} tribunal(is) em {amostra.blocos_lidos} bloco(s) lido(s), "
+              f"{fracao_lida:.0%} dos dados lidos; arquivos '{caminho_resumo}' e '{caminho_intervalos}' gerados "
+              f"(intervalos de {nivel_confianca:.0%}). Valores provisórios: a execução completa é a oficial.")
+    except Exception as e:
+        print(f"Erro ao salvar a prévia das metas: {e}")
+
+    if gerar_graficos:
+        from graficos import gerar_graficos_paralelo
+        gerar_graficos_paralelo(df_resumo, os.path.join(pasta_saida, PASTA_GRAFICOS_PREVIA), METAS_PARA_PLOTAR)
+    return df_resumo
+
+# --- Função Principal (Main) ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prévia amostral das metas, com intervalos de confiança.")
+    parser.add_argument("--dados", default="./Dados", help="Pasta dos arquivos teste_*.csv")
+    parser.add_argument("--saida", default="./Saida", help="Pasta de saída")
+    parser.add_argument("--fracao", type=float, default=FRACAO_BLOCOS, help="Fração dos blocos lida de cada arquivo")
+    parser.add_argument("--bloco", type=int, default=TAMANHO_BLOCO_PREVIA, help="Tamanho dos blocos, em bytes")
+    parser.add_argument("--confianca", type=float, default=NIVEL_CONFIANCA, help="Nível de confiança dos intervalos")
+    parser.add_argument("--semente", type=int, default=None, help="Semente do sorteio (reprodutibilidade)")
+    parser.add_argument("--sem-graficos", action="store_true", help="Não gera os gráficos da prévia")
+    args = parser.parse_args()
+
+    os.makedirs(args.saida, exist_ok=True)
+    iniciar_metricas("previa_metas.py", args.saida)
+    gerar_previa(args.dados, args.saida, args.fracao, args.bloco, args.confianca, args.semente,
+                 gerar_graficos=not args.sem_graficos)
+    salvar_metricas()
@@ -0,0 +1,218 @@
+import argparse
+import multiprocessing
+import os
+
+from motor_metas import gerar_resumo_metas
+from motores import MOTORES, executar_motor, resolver_motor
+from cache_colunar import PASTA_CACHE, LIMITE_CACHE_BYTES, limpar_cache
+from consolidacao_rapida import (NOME_MANIFESTO_CONSOLIDADO, atualizar_consolidado_rapido, consolidar_csvs_rapido,
+                                 iniciar_consolidacao_rapida)
+from incremental import NOME_ARQUIVO_MANIFESTO, processar_incremental
+from validacao import NOME_ARQUIVO_QUARENTENA, NOME_ARQUIVO_RESUMO_VALIDACAO, ValidadorDados, consolidar_validando
+from checkpoint import PASTA_CHECKPOINT, DiarioProgresso, consolidar_com_checkpoint
+from pipeline import processar_pipeline
+from particionamento import PASTA_PARTICOES, calcular_parciais_filtrados, filtrar_parciais
+from metas_anuais import FORMATOS_SAIDA, agregar_anos, gerar_resumo_anos
+from instrumentacao import iniciar_metricas, salvar_metricas
+from compressao import FORMATOS_COMPRESSAO, listar_arquivos_csv, nome_com_compressao
+from previa_metas import gerar_previa
+
+# --- Configurações Iniciais ---
+PASTA_DOS_CSVS = "./Dados"
+PASTA_SAIDA = "./Saida"
+NOME_ARQUIVO_CONSOLIDADO = "Consolidado.csv"
+NOME_ARQUIVO_RESUMO_METAS = "ResumoMetas.csv"
+NOME_ARQUIVO_RESUMO_FILTRADO = "ResumoMetas_filtrado.csv"
+METAS_PARA_PLOTAR = ['Meta1', 'Meta2A', 'Meta2ANT', 'Meta4A', 'Meta6']
+
+# --- 1. Consolidação em Paralelo ao Cálculo ---
+def iniciar_consolidacao(motor, caminho_pasta_dados, caminho_arquivo_saida_consolidado, caminho_manifesto=None):
+    """
+    Inicia a consolidação rápida em paralelo à agregação (com 'caminho_manifesto', só a
+    atualização do consolidado). Com o motor de processos ela roda em um processo próprio,
+    criado antes do pool (fazer fork com uma thread ativa pode travar os processos filhos);
+    nos demais motores, em uma thread.
+    """
+    if motor != "processos":
+        return iniciar_consolidacao_rapida(caminho_pasta_dados, caminho_arquivo_saida_consolidado, caminho_manifesto)
+    if caminho_manifesto is not None:
+        alvo, argumentos = atualizar_consolidado_rapido, (caminho_pasta_dados, caminho_arquivo_saida_consolidado,
+                                                          caminho_manifesto)
+    else:
+        alvo, argumentos = consolidar_csvs_rapido, (caminho_pasta_dados, caminho_arquivo_saida_consolidado)
+    processo = multiprocessing.Process(target=alvo, name="consolidacao_rapida", args=argumentos)
+    processo.start()
+    return processo
+
+# --- 2. Pipeline Completo ---
+def processar(caminho_pasta_dados, pasta_saida, motor="auto", num_workers=None, recalibrar=False,
+              gerar_consolidado=True, gerar_graficos=True, tribunais=None, ramos=None,
+              pasta_particoes=PASTA_PARTICOES, todos_os_anos=False, formato_anos="longo",
+              compressao_consolidado=None, previa=False, nome_resumo=NOME_ARQUIVO_RESUMO_METAS,
+              pasta_cache=None, incremental=False, validar=False, checkpoint=None, dividir_arquivos=False,
+              memoria_compartilhada=False, max_tarefas_em_voo=None, limite_memoria_tarefas=None,
+              apenas_graficos_alterados=False):
+    """
+    Executa o pipeline (Consolidado.csv, ResumoMetas.csv e gráficos) com o motor
+    escolhido: 'sequencial', 'threads', 'processos', 'vetorizado', 'pipeline' ou 'auto'.
+    No 'pipeline', 'num_workers' é o número de threads de parser.
+    Com 'pasta_cache', os motores leem as colunas das metas do cache colunar e o consolidado
+    é só atualizado a partir do primeiro arquivo alterado. Com 'incremental', relê só os
+    arquivos novos/alterados (ver incremental.py). Com 'validar' e/ou 'checkpoint' (o nome
+    da execução no diário), a consolidação valida as linhas (ver validacao.py) e/ou pode ser
+    retomada (ver checkpoint.py); nesses casos o motor, o cache e o modo incremental não se aplicam.
+    'dividir_arquivos', 'memoria_compartilhada', 'max_tarefas_em_voo' e 'limite_memoria_tarefas'
+    (em bytes) são opções do motor 'processos' (ver motores.motor_processos).
+    Com 'tribunais' e/ou 'ramos', calcula só as metas deles a partir das partições
+    (ver particionamento.py) e grava o ResumoMetas_filtrado.csv, sem consolidado nem gráficos.
+    Com 'todos_os_anos', calcula as metas de cada ano com colunas julgados_AAAA etc. em uma
+    única leitura dos arquivos (ver metas_anuais.py), também sem consolidado nem gráficos.
+    Com 'compressao_consolidado' ("gz", "bz2" ou "xz"), o consolidado é gravado comprimido.
+    Com 'previa', grava antes uma prévia amostral das metas (ver previa_metas.py).
+    Retorna o DataFrame do resumo das metas (ou None).
+    """
+    if todos_os_anos:
+        df_parciais, anos, tribunais_por_ano = agregar_anos(caminho_pasta_dados)
+        df_parciais = filtrar_parciais(df_parciais, tribunais, ramos)
+        return gerar_resumo_anos(df_parciais, anos, tribunais_por_ano, pasta_saida, formato_anos)
+    if tribunais or ramos:
+        df_parciais = calcular_parciais_filtrados(caminho_pasta_dados, pasta_particoes, tribunais, ramos)
+        if df_parciais is not None and df_parciais.empty:
+            print("Nenhum tribunal atende ao filtro informado.")
+            return None
+        return gerar_resumo_metas(df_parciais, os.path.join(pasta_saida, NOME_ARQUIVO_RESUMO_FILTRADO))
+
+    arquivos_csv = listar_arquivos_csv(caminho_pasta_dados)
+    if not arquivos_csv:
+        print(f"Nenhum arquivo CSV encontrado no padrão 'teste_*.csv' na pasta: {caminho_pasta_dados}")
+        return None
+    caminho_consolidado = os.path.join(pasta_saida, nome_com_compressao(NOME_ARQUIVO_CONSOLIDADO, compressao_consolidado))
+    caminho_resumo_metas = os.path.join(pasta_saida, nome_resumo)
+    if previa:
+        gerar_previa(caminho_pasta_dados, pasta_saida, gerar_graficos=gerar_graficos)
+    opcoes_processos = {chave: valor for chave, valor in (
+        ('dividir_arquivos', dividir_arquivos), ('memoria_compartilhada', memoria_compartilhada),
+        ('max_em_voo', max_tarefas_em_voo), ('limite_bytes', limite_memoria_tarefas)) if valor}
+
+    if validar or checkpoint:
+        if pasta_cache is not None or incremental or opcoes_processos or motor == "pipeline":
+            print("Alerta: com validação ou checkpoint, o motor, o cache e o modo incremental são ignorados.")
+        diario = DiarioProgresso(PASTA_CHECKPOINT, checkpoint, validar) if checkpoint else None
+        validador = None
+        if validar:
+            validador = ValidadorDados(os.path.join(pasta_saida, NOME_ARQUIVO_QUARENTENA),
+                                       os.path.join(pasta_saida, NOME_ARQUIVO_RESUMO_VALIDACAO),
+                                       manter_quarentena=diario is not None)
+        saida_consolidado = caminho_consolidado if gerar_consolidado else None
+        if diario is not None:
+            df_parciais = consolidar_com_checkpoint(arquivos_csv, saida_consolidado, diario, validador, num_workers)
+        else:
+            df_parciais = consolidar_validando(arquivos_csv, saida_consolidado, validador)
+        if validador is not None:
+            validador.finalizar()
+        df_resumo_metas = gerar_resumo_metas(df_parciais, caminho_resumo_metas)
+        if diario is not None and df_resumo_metas is not None:
+            diario.finalizar()
+    elif incremental:
+        if pasta_cache is not None or opcoes_processos or motor == "pipeline":
+            print("Alerta: no modo incremental, o motor e o cache são ignorados.")
+        df_resumo_metas = processar_incremental(caminho_pasta_dados, caminho_resumo_metas,
+                                                os.path.join(pasta_saida, NOME_ARQUIVO_MANIFESTO))
+        if gerar_consolidado:
+            # O consolidado também é atualizado só a partir do primeiro arquivo alterado
+            atualizar_consolidado_rapido(caminho_pasta_dados, caminho_consolidado,
+                                         os.path.join(pasta_saida, NOME_MANIFESTO_CONSOLIDADO))
+    elif motor == "pipeline":
+        df_parciais = processar_pipeline(caminho_pasta_dados, caminho_consolidado if gerar_consolidado else None,
+                                         num_parsers=num_workers)
+        df_resumo_metas = gerar_resumo_metas(df_parciais, caminho_resumo_metas)
+    else:
+        motor, num_workers = resolver_motor(motor, arquivos_csv, num_workers, PASTA_CACHE, recalibrar)
+        if opcoes_processos and motor != "processos":
+            print(f"Alerta: as opções do motor 'processos' não se aplicam ao motor '{motor}'. Opções ignoradas.")
+            opcoes_processos = {}
+        consolidacao = None
+        if gerar_consolidado:
+            # Com o cache, o consolidado é recopiado só a partir do primeiro arquivo alterado
+            caminho_manifesto = os.path.join(pasta_saida, NOME_MANIFESTO_CONSOLIDADO) if pasta_cache is not None else None
+            consolidacao = iniciar_consolidacao(motor, caminho_pasta_dados, caminho_consolidado, caminho_manifesto)
+
+        df_parciais = executar_motor(motor, arquivos_csv, num_workers, pasta_cache, **opcoes_processos)
+        df_resumo_metas = gerar_resumo_metas(df_parciais, caminho_resumo_metas)
+        if consolidacao is not None:
+            consolidacao.join()
+        if pasta_cache is not None:
+            limpar_cache(pasta_cache, LIMITE_CACHE_BYTES)
+
+    if not gerar_graficos:
+        print("Geração de gráficos desativada.")
+    elif df_resumo_metas is not None:
+        from graficos import gerar_graficos_paralelo
+        gerar_graficos_paralelo(df_resumo_metas, pasta_saida, METAS_PARA_PLOTAR, apenas_alterados=apenas_graficos_alterados,
+                                max_workers=1 if motor in ("sequencial", "vetorizado") else None)
+    else:
+        print("Não foi possível gerar gráficos pois o resumo das metas não foi criado.")
+    return df_resumo_metas
+
+# --- Função Principal (Main) ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Calcula o ResumoMetas com o motor de execução escolhido.")
+    parser.add_argument("--motor", choices=("auto",) + MOTORES + ("pipeline",), default="auto",
+                        help="Motor de execução (padrão: auto, escolhido pela calibração entre os de MOTORES)")
+    parser.add_argument("--workers", type=int, default=None, help="Número de threads/processos (padrão: automático)")
+    parser.add_argument("--dados", default=PASTA_DOS_CSVS, help="Pasta dos arquivos teste_*.csv")
+    parser.add_argument("--saida", default=PASTA_SAIDA, help="Pasta de saída")
+    parser.add_argument("--recalibrar", action="store_true", help="Refaz a calibração do modo auto")
+    parser.add_argument("--sem-consolidado", action="store_true", help="Não gera o Consolidado.csv")
+    parser.add_argument("--comprimir-consolidado", choices=FORMATOS_COMPRESSAO, default=None,
+                        help="Grava o consolidado comprimido (Consolidado.csv.gz etc.)")
+    parser.add_argument("--sem-graficos", action="store_true", help="Não gera os gráficos")
+    parser.add_argument("--tribunal", action="append", default=[],
+                        help="Calcula só estes tribunais (siglas separadas por vírgula; pode repetir)")
+    parser.add_argument("--ramo", action="append", default=[],
+                        help="Calcula só os tribunais deste ramo (pode repetir)")
+    parser.add_argument("--particoes", default=PASTA_PARTICOES, help="Pasta das partições usadas com --tribunal/--ramo")
+    parser.add_argument("--todos-os-anos", action="store_true",
+                        help="Calcula as metas de todos os anos (colunas julgados_AAAA etc.) em uma só leitura")
+    parser.add_argument("--formato-anos", choices=FORMATOS_SAIDA, default="longo",
+                        help="Com --todos-os-anos: um ResumoMetas_anos.csv (longo) ou um arquivo por ano")
+    parser.add_argument("--cache", action="store_true",
+                        help=f"Lê as colunas das metas do cache colunar em {PASTA_CACHE} (relê só os arquivos alterados)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Relê só os arquivos novos/alterados e recalcula só os tribunais afetados")
+    parser.add_argument("--validar", action="store_true",
+                        help="Valida as linhas durante a consolidação (Quarentena.csv e ResumoValidacao.csv)")
+    parser.add_argument("--checkpoint", default=None, metavar="NOME",
+                        help=f"Consolidação retomável, com o diário da execução NOME em {PASTA_CHECKPOINT}")
+    parser.add_argument("--dividir-arquivos", action="store_true",
+                        help="Motor processos: divide os arquivos em faixas de bytes, uma tarefa por faixa")
+    parser.add_argument("--memoria-compartilhada", action="store_true",
+                        help="Motor processos: soma os tribunais a partir de blocos de memória compartilhada")
+    parser.add_argument("--max-tarefas-em-voo", type=int, default=None,
+                        help="Motor processos: tarefas submetidas e não concluídas (padrão: 2 por processo)")
+    parser.add_argument("--limite-memoria-tarefas-mb", type=float, default=None,
+                        help="Motor processos: teto, em MB, dos bytes de entrada das tarefas em voo")
+    parser.add_argument("--apenas-graficos-alterados", action="store_true",
+                        help="Redesenha só os gráficos cujos dados mudaram")
+    parser.add_argument("--previa", action="store_true",
+                        help="Grava antes uma prévia amostral das metas (ResumoMetas_previa.csv, com intervalos de confiança)")
+    parser.add_argument("--perfil", choices=("cprofile", "tracemalloc"), default=None, help="Perfil opcional por etapa")
+    args = parser.parse_args()
+
+    os.makedirs(args.saida, exist_ok=True)
+    iniciar_metricas("processar_metas.py", args.saida, args.perfil)
+    print("Iniciando processamento (processar_metas.py)...")
+    tribunais = [t.strip() for valor in args.tribunal for t in valor.split(',') if t.strip()]
+    processar(args.dados, args.saida, args.motor, args.workers, args.recalibrar,
+              gerar_consolidado=not args.sem_consolidado, gerar_graficos=not args.sem_graficos,
+              tribunais=tribunais, ramos=args.ramo, pasta_particoes=args.particoes,
+              todos_os_anos=args.todos_os_anos, formato_anos=args.formato_anos,
+              compressao_consolidado=args.comprimir_consolidado, previa=args.previa,
+              pasta_cache=PASTA_CACHE if args.cache else None, incremental=args.incremental, validar=args.validar,
+              checkpoint=args.checkpoint, dividir_arquivos=args.dividir_arquivos,
+              memoria_compartilhada=args.memoria_compartilhada, max_tarefas_em_voo=args.max_tarefas_em_voo,
+              limite_memoria_tarefas=(int(args.limite_memoria_tarefas_mb * 1024**2)
+                                      if args.limite_memoria_tarefas_mb is not None else None),
+              apenas_graficos_alterados=args.apenas_graficos_alterados)
+    print("Processamento concluído.")
+    salvar_metricas()
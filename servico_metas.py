@@ -0,0 +1,278 @@
+import argparse
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from motor_metas import METAS, calcular_metas_vetorizado, combinar_parciais
+from cache_colunar import impressao_digital
+from leitor_mmap import agregar_arquivo_mmap
+from compressao import listar_arquivos_csv
+
+# --- Configurações do Serviço ---
+PASTA_DOS_CSVS = "./Dados"
+HOST = "127.0.0.1"
+PORTA = 8765
+TAMANHO_CACHE = 256
+INTERVALO_VERIFICACAO_S = 2.0
+TOP_N_PADRAO = 10
+
+# --- 1. Cache LRU de Respostas ---
+class CacheLRU:
+    """Cache LRU (menos usado recentemente) de respostas, seguro entre threads."""
+
+    def __init__(self, capacidade=TAMANHO_CACHE):
+        self.capacidade = capacidade
+        self._itens = OrderedDict()
+        self._trava = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+
+    def obter(self, chave):
+        with self._trava:
+            if chave not in self._itens:
+                self.falhas += 1
+                return None
+            self._itens.move_to_end(chave)
+            self.acertos += 1
+            return self._itens[chave]
+
+    def guardar(self, chave, valor):
+        with self._trava:
+            self._itens[chave] = valor
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.capacidade:
+                self._itens.popitem(last=False)
+
+    def limpar(self):
+        with self._trava:
+            self._itens.clear()
+
+    def estatisticas(self):
+        with self._trava:
+            return {'itens': len(self._itens), 'capacidade': self.capacidade,
+                    'acertos': self.acertos, 'falhas': self.falhas}
+
+# --- 2. Agregados Residentes em Memória ---
+# Estado publicado de uma vez: as consultas leem 'estado.instantaneo' uma única vez e usam
+# só esse objeto, então nunca misturam o resumo de uma versão com a versão de outra.
+InstantaneoMetas = namedtuple('InstantaneoMetas', ['versao', 'df_resumo', 'df_valores', 'por_arquivo',
+                                                   'carregado_em', 'ultima_recarga'])
+
+class EstadoMetas:
+    """
+    Mantém em memória os agregados por tribunal de cada arquivo 'teste_*.csv' e as
+    metas já calculadas. Na recarga, só os arquivos novos ou alterados (tamanho ou
+    mtime diferentes) são relidos; os removidos são descartados.
+    """
+
+    def __init__(self, caminho_pasta_dados, cache):
+        self.caminho_pasta_dados = caminho_pasta_dados
+        self.cache = cache
+        self._trava_recarga = threading.Lock()
+        # por_arquivo: caminho -> (impressão digital, agregados do arquivo)
+        self.instantaneo = InstantaneoMetas(0, None, None, {}, None, {})
+
+    def recarregar(self):
+        """Relê os arquivos alterados e recalcula as metas. Retorna True se algo mudou."""
+        with self._trava_recarga:
+            t = time.perf_counter()
+            atual = self.instantaneo
+            arquivos_csv = listar_arquivos_csv(self.caminho_pasta_dados)
+            por_arquivo = {}
+            relidos = []
+            for arquivo in arquivos_csv:
+                try:
+                    digital = impressao_digital(arquivo)
+                except OSError:
+                    continue  # removido durante a varredura
+                anterior = atual.por_arquivo.get(arquivo)
+                if anterior is not None and anterior[0] == digital:
+                    por_arquivo[arquivo] = anterior
+                    continue
+                try:
+                    df_parciais, _ = agregar_arquivo_mmap(arquivo)
+                except Exception as e:
+                    print(f"Erro ao ler o arquivo {arquivo}: {e}")
+                    df_parciais = None
+                por_arquivo[arquivo] = (digital, df_parciais)
+                relidos.append(arquivo)
+            removidos = [a for a in atual.por_arquivo if a not in por_arquivo]
+            if atual.versao and not relidos and not removidos:
+                return False
+
+            # Combina na ordem dos arquivos, como no consolidado (o ramo vem do primeiro arquivo do tribunal)
+            df_parciais = combinar_parciais([por_arquivo[a][1] for a in arquivos_csv if a in por_arquivo])
+            df_resumo = calcular_metas_vetorizado(df_parciais) if df_parciais is not None else None
+            df_valores = None
+            if df_resumo is not None:
+                df_resumo = df_resumo.set_index('tribunal', drop=False).sort_index()
+                df_valores = df_resumo[METAS].replace("NA", np.nan).astype(float)
+            ultima_recarga = {'arquivos_relidos': len(relidos), 'arquivos_removidos': len(removidos),
+                              'segundos': round(time.perf_counter() - t, 4)}
+            novo = InstantaneoMetas(atual.versao + 1, df_resumo, df_valores, por_arquivo,
+                                    time.strftime('%Y-%m-%d %H:%M:%S'), ultima_recarga)
+            self.instantaneo = novo  # publicação atômica: uma única atribuição
+            # As chaves do cache incluem a versão; limpar só libera as respostas antigas
+            self.cache.limpar()
+        print(f"Dados carregados (versão {novo.versao}): {len(relidos)} arquivo(s) relido(s), "
+              f"{len(removidos)} removido(s), {len(por_arquivo)} no total, em {ultima_recarga['segundos']:.2f}s.")
+        return True
+
+    def vigiar(self, intervalo=INTERVALO_VERIFICACAO_S):
+        """Verifica periodicamente a pasta de dados (para rodar em uma thread daemon)."""
+        while True:
+            time.sleep(intervalo)
+            try:
+                self.recarregar()
+            except Exception as e:
+                print(f"Erro ao recarregar os dados: {e}")
+
+    def status(self):
+        instantaneo = self.instantaneo
+        return {
+            'pasta_dados': os.path.abspath(self.caminho_pasta_dados),
+            'versao': instantaneo.versao,
+            'carregado_em': instantaneo.carregado_em,
+            'arquivos': len(instantaneo.por_arquivo),
+            'tribunais': 0 if instantaneo.df_resumo is None else len(instantaneo.df_resumo),
+            'ultima_recarga': instantaneo.ultima_recarga,
+            'cache': self.cache.estatisticas(),
+        }
+
+# --- 3. Consultas ---
+def _registros(df_resumo, colunas):
+    """Linhas do resumo em dicionários JSON ('NA' vira null)."""
+    registros = []
+    for linha in df_resumo[colunas].itertuples(index=False):
+        registros.append({c: (None if v == "NA" else v) for c, v in zip(colunas, linha)})
+    return registros
+
+def _lista_parametro(parametros, nome):
+    valores = []
+    for valor in parametros.get(nome, []):
+        valores += [v.strip() for v in valor.split(',') if v.strip()]
+    return valores
+
+def consultar_metas(df_resumo, parametros):
+    """Metas por tribunal: filtros opcionais 'tribunal' e 'ramo' (listas separadas por vírgula) e 'metas'."""
+    tribunais = _lista_parametro(parametros, 'tribunal')
+    ramos = _lista_parametro(parametros, 'ramo')
+    metas = _lista_parametro(parametros, 'metas') or METAS
+    desconhecidas = [m for m in metas if m not in METAS]
+    if desconhecidas:
+        raise ValueError(f"Meta(s) desconhecida(s): {', '.join(desconhecidas)}")
+    df = df_resumo
+    if tribunais:
+        df = df[df['tribunal'].isin(tribunais)]
+    if ramos:
+        df = df[df['ramo_justica'].isin(ramos)]
+    return {'resultados': _registros(df, ['tribunal', 'ramo_justica'] + metas)}
+
+def consultar_top(df_resumo, df_valores, parametros):
+    """Os 'n' tribunais com maior valor da 'meta' (opcionalmente de um 'ramo'); tribunais sem valor ficam de fora."""
+    meta = parametros.get('meta', [None])[0]
+    if meta not in METAS:
+        raise ValueError(f"Informe 'meta' com um de: {', '.join(METAS)}")
+    try:
+        n = int(parametros.get('n', [TOP_N_PADRAO])[0])
+    except ValueError:
+        raise ValueError("'n' deve ser um número inteiro")
+    valores = df_valores[meta].dropna()
+    ramos = _lista_parametro(parametros, 'ramo')
+    if ramos:
+        valores = valores[df_resumo.loc[valores.index, 'ramo_justica'].isin(ramos)]
+    # Ordena pelo valor (decrescente) e, no empate, pela sigla
+    valores = valores.iloc[np.lexsort((valores.index.to_numpy(), -valores.to_numpy()))][:max(n, 0)]
+    resultados = [{'tribunal': t, 'ramo_justica': df_resumo.at[t, 'ramo_justica'], meta: v} for t, v in valores.items()]
+    return {'meta': meta, 'resultados': resultados}
+
+# --- 4. Servidor HTTP (somente localhost) ---
+def criar_manipulador(estado):
+    class ManipuladorMetas(BaseHTTPRequestHandler):
+        def _responder(self, codigo, corpo):
+            dados = json.dumps(corpo, ensure_ascii=False).encode('utf-8')
+            self.send_response(codigo)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(dados)))
+            self.end_headers()
+            self.wfile.write(dados)
+
+        def do_GET(self):
+            t = time.perf_counter()
+            url = urlparse(self.path)
+            rota = url.path.rstrip('/') or '/'
+            parametros = parse_qs(url.query)
+
+            if rota == '/status':
+                return self._responder(200, estado.status())
+            if rota == '/recarregar':
+                mudou = estado.recarregar()
+                return self._responder(200, dict(estado.status(), recarregado=mudou))
+            if rota not in ('/metas', '/top'):
+                return self._responder(404, {'erro': f"Rota desconhecida: {rota}. Use /metas, /top, /status ou /recarregar."})
+
+            instantaneo = estado.instantaneo  # lido uma única vez por consulta
+            df_resumo, df_valores, versao = instantaneo.df_resumo, instantaneo.df_valores, instantaneo.versao
+            if df_resumo is None:
+                return self._responder(503, {'erro': "Nenhum dado carregado."})
+            chave = (versao, rota, tuple(sorted((k, tuple(v)) for k, v in parametros.items())))
+            corpo = estado.cache.obter(chave)
+            em_cache = corpo is not None
+            if corpo is None:
+                try:
+                    if rota == '/metas':
+                        corpo = consultar_metas(df_resumo, parametros)
+                    else:
+                        corpo = consultar_top(df_resumo, df_valores, parametros)
+                except ValueError as e:
+                    return self._responder(400, {'erro': str(e)})
+                estado.cache.guardar(chave, corpo)
+            self._responder(200, dict(corpo, versao=versao, em_cache=em_cache,
+                                      tempo_ms=round((time.perf_counter() - t) * 1000, 3)))
+
+        def log_message(self, formato, *args):
+            pass  # sem uma linha de log por consulta
+
+    return ManipuladorMetas
+
+def iniciar_servico(caminho_pasta_dados=PASTA_DOS_CSVS, host=HOST, porta=PORTA, tamanho_cache=TAMANHO_CACHE,
+                    intervalo_verificacao=INTERVALO_VERIFICACAO_S):
+    """
+    Carrega os agregados uma vez, inicia a thread que vigia a pasta de dados
+    (intervalo <= 0 desativa; use /recarregar) e devolve o servidor HTTP pronto
+    para 'serve_forever()'.
+    """
+    estado = EstadoMetas(caminho_pasta_dados, CacheLRU(tamanho_cache))
+    estado.recarregar()
+    if intervalo_verificacao > 0:
+        threading.Thread(target=estado.vigiar, args=(intervalo_verificacao,), name="vigia_dados", daemon=True).start()
+    servidor = ThreadingHTTPServer((host, porta), criar_manipulador(estado))
+    servidor.estado = estado
+    return servidor
+
+# --- Função Principal (Main) ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serviço local de consulta das metas, com os agregados em memória.")
+    parser.add_argument("--dados", default=PASTA_DOS_CSVS, help="Pasta dos arquivos teste_*.csv")
+    parser.add_argument("--host", default=HOST, help="Endereço de escuta (padrão: somente localhost)")
+    parser.add_argument("--porta", type=int, default=PORTA, help="Porta HTTP")
+    parser.add_argument("--cache", type=int, default=TAMANHO_CACHE, help="Número máximo de respostas no cache LRU")
+    parser.add_argument("--intervalo", type=float, default=INTERVALO_VERIFICACAO_S,
+                        help="Segundos entre as verificações da pasta de dados (0 desativa)")
+    args = parser.parse_args()
+
+    servidor = iniciar_servico(args.dados, args.host, args.porta, args.cache, args.intervalo)
+    print(f"Serviço de metas em http://{args.host}:{args.porta} "
+          f"(rotas: /metas?tribunal=&ramo=&metas=, /top?meta=&n=&ramo=, /status, /recarregar). Ctrl+C encerra.")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("Serviço encerrado.")
+    finally:
+        servidor.server_close()
@@ -0,0 +1,228 @@
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from motor_metas import COLUNAS_CONTADORES, TABELA_MULTIPLICADORES, agregar_parciais, combinar_parciais
+from esquema import LINHAS_POR_BLOCO
+from compressao import abrir_saida, arquivo_comprimido
+from instrumentacao import etapa_instrumentada, registrar_arquivo
+
+# --- Configurações da Validação ---
+NOME_ARQUIVO_QUARENTENA = "Quarentena.csv"
+NOME_ARQUIVO_RESUMO_VALIDACAO = "ResumoValidacao.csv"
+# Ramos aceitos: os da tabela de multiplicadores e os que só têm a Meta1
+RAMOS_CONHECIDOS = frozenset(TABELA_MULTIPLICADORES) | {"Justiça Eleitoral"}
+REGRAS = ('sigla_ausente', 'ramo_ausente', 'ramo_desconhecido', 'contador_ausente', 'contador_negativo',
+          'ramo_divergente')
+
+# --- 1. Regras (vetorizadas) ---
+def avaliar_regras(df, ramo_por_tribunal, colunas_contadores=COLUNAS_CONTADORES):
+    """
+    Avalia todas as regras de uma vez sobre as linhas do bloco e retorna um DataFrame
+    booleano (linhas x REGRAS). Um tribunal com mais de um ramo tem como referência o ramo
+    da sua primeira linha com ramo conhecido (inclusive em blocos e arquivos anteriores);
+    'ramo_por_tribunal' guarda essas referências e é atualizado com os tribunais novos.
+    """
+    siglas = df['sigla_tribunal'].astype(object) if 'sigla_tribunal' in df.columns else pd.Series(None, index=df.index, dtype=object)
+    ramos = df['ramo_justica'].astype(object) if 'ramo_justica' in df.columns else pd.Series(None, index=df.index, dtype=object)
+    # Colunas ausentes ou com texto viram NaN (contador ausente)
+    valores = np.column_stack([pd.to_numeric(df[c], errors='coerce').to_numpy(dtype='float64') if c in df.columns
+                               else np.full(len(df), np.nan) for c in colunas_contadores])
+
+    regras = pd.DataFrame(index=df.index)
+    regras['sigla_ausente'] = siglas.isna()
+    regras['ramo_ausente'] = ramos.isna()
+    regras['ramo_desconhecido'] = ramos.notna() & ~ramos.isin(RAMOS_CONHECIDOS)
+    regras['contador_ausente'] = np.isnan(valores).any(axis=1)
+    with np.errstate(invalid='ignore'):
+        regras['contador_negativo'] = (valores < 0).any(axis=1)
+
+    com_referencia = ~(regras['sigla_ausente'] | regras['ramo_ausente'] | regras['ramo_desconhecido'])
+    primeiros = pd.DataFrame({'sigla': siglas[com_referencia], 'ramo': ramos[com_referencia]}).drop_duplicates('sigla')
+    for sigla, ramo in zip(primeiros['sigla'], primeiros['ramo']):
+        ramo_por_tribunal.setdefault(sigla, ramo)
+    regras['ramo_divergente'] = com_referencia & (ramos != siglas.map(ramo_por_tribunal))
+    return regras
+
+# --- 2. Validação Acoplada à Leitura ---
+class ValidadorDados:
+    """
+    Valida cada bloco de dados logo após a leitura (um arquivo inteiro ou um chunk), sem
+    uma varredura extra: as linhas que violam alguma regra vão para o CSV de quarentena
+    (com arquivo, número da linha e regras violadas) e ficam fora da consolidação e das
+    metas. Os blocos devem ser entregues na ordem dos arquivos. Ao final, finalizar()
+    grava o resumo de erros por arquivo. Com 'manter_quarentena', a quarentena anterior
+    fica até que retomar() defina o que dela continua valendo.
+    """
+
+    def __init__(self, caminho_quarentena, caminho_resumo, colunas_contadores=COLUNAS_CONTADORES,
+                 manter_quarentena=False):
+        self.caminho_quarentena = caminho_quarentena
+        self.caminho_resumo = caminho_resumo
+        self.colunas_contadores = colunas_contadores
+        self.colunas_quarentena = ['arquivo', 'linha', 'regras', 'sigla_tribunal', 'ramo_justica'] + list(colunas_contadores)
+        self.ramo_por_tribunal = {}
+        self.resumo = {}
+        self._linhas_vistas = {}
+        self._quarentena_iniciada = False
+        if not manter_quarentena:
+            self._remover_quarentena()
+
+    def _remover_quarentena(self):
+        # A quarentena de uma execução anterior não vale para esta
+        try:
+            os.remove(self.caminho_quarentena)
+        except FileNotFoundError:
+            pass
+        self._quarentena_iniciada = False
+
+    def tamanho_quarentena(self):
+        """Tamanho atual, em bytes, do CSV de quarentena (0 se ainda não existe)."""
+        try:
+            return os.path.getsize(self.caminho_quarentena)
+        except OSError:
+            return 0
+
+    def retomar(self, tamanho_quarentena, arquivos_retomados):
+        """
+        Continua a validação de uma execução interrompida: a quarentena é truncada em
+        'tamanho_quarentena' (as linhas dos arquivos já validados) e o resumo e os ramos de
+        referência desses arquivos são restaurados de 'arquivos_retomados'
+        ([(nome do arquivo, resumo, ramos novos)], na ordem dos arquivos).
+        """
+        if not tamanho_quarentena:
+            self._remover_quarentena()
+        else:
+            with open(self.caminho_quarentena, 'r+b') as f:
+                f.truncate(tamanho_quarentena)
+            self._quarentena_iniciada = True
+        for nome_arquivo, resumo, ramos in arquivos_retomados:
+            self.resumo[nome_arquivo] = dict(resumo)
+            for sigla, ramo in ramos.items():
+                self.ramo_por_tribunal.setdefault(sigla, ramo)
+
+    def validar(self, df, nome_arquivo):
+        """Aplica as regras ao bloco, grava as linhas inválidas na quarentena e devolve só as válidas."""
+        regras = avaliar_regras(df, self.ramo_por_tribunal, self.colunas_contadores)
+        invalidas = regras.any(axis=1).to_numpy()
+        inicio = self._linhas_vistas.get(nome_arquivo, 0)
+        self._linhas_vistas[nome_arquivo] = inicio + len(df)
+
+        resumo = self.resumo.setdefault(nome_arquivo, dict.fromkeys(('linhas', 'linhas_invalidas') + REGRAS, 0))
+        resumo['linhas'] += len(df)
+        resumo['linhas_invalidas'] += int(invalidas.sum())
+        for regra, total in regras.sum().items():
+            resumo[regra] += int(total)
+        if not invalidas.any():
+            return df
+
+        df_quarentena = df[invalidas].reindex(columns=self.colunas_quarentena)
+        df_quarentena['arquivo'] = nome_arquivo
+        # Número da linha no arquivo (a 1 é o cabeçalho)
+        df_quarentena['linha'] = inicio + np.flatnonzero(invalidas) + 2
+        violadas = regras[invalidas].to_numpy()
+        df_quarentena['regras'] = [';'.join(np.array(REGRAS)[linha]) for linha in violadas]
+        df_quarentena.to_csv(self.caminho_quarentena, mode='a', header=not self._quarentena_iniciada,
+                             index=False, sep=',', encoding='utf-8')
+        self._quarentena_iniciada = True
+        return df[~invalidas]
+
+    def finalizar(self):
+        """Grava o resumo de erros por arquivo (e imprime o total). Retorna o DataFrame do resumo."""
+        df_resumo = pd.DataFrame([{'arquivo': arquivo, **contagens} for arquivo, contagens in self.resumo.items()],
+                                 columns=['arquivo', 'linhas', 'linhas_invalidas'] + list(REGRAS))
+        try:
+            df_resumo.to_csv(self.caminho_resumo, index=False, sep=',', encoding='utf-8')
+        except Exception as e:
+            print(f"Erro ao salvar o resumo da validação '{self.caminho_resumo}': {e}")
+        total_invalidas = int(df_resumo['linhas_invalidas'].sum())
+        if total_invalidas:
+            print(f"Alerta: Validação: {total_invalidas} de {int(df_resumo['linhas'].sum())} linha(s) em quarentena "
+                  f"('{self.caminho_quarentena}'); resumo por arquivo em '{self.caminho_resumo}'.")
+        else:
+            print(f"Validação: nenhuma linha inválida em {int(df_resumo['linhas'].sum())} linha(s).")
+        return df_resumo
+
+# --- 3. Consolidação com Validação ---
+@etapa_instrumentada("consolidar csvs com validação")
+def consolidar_validando(arquivos_csv, caminho_arquivo_saida_consolidado, validador,
+                         linhas_por_bloco=LINHAS_POR_BLOCO):
+    """
+    Consolidação e validação em uma única varredura, com memória limitada: lê cada arquivo
+    em blocos de 'linhas_por_bloco' linhas, valida cada bloco, acrescenta as linhas válidas
+    ao consolidado e acumula as somas parciais por tribunal. Um arquivo que falha no meio não
+    deixa linhas no consolidado nem nas somas. Com 'caminho_arquivo_saida_consolidado' None,
+    só agrega. Retorna os agregados por tribunal (não o DataFrame consolidado) ou None.
+    """
+    # União das colunas na ordem em que aparecem, como faria o pd.concat
+    colunas = []
+    arquivos_validos = []
+    for arquivo in arquivos_csv:
+        try:
+            cabecalho = pd.read_csv(arquivo, sep=',', encoding='utf-8', nrows=0).columns
+        except Exception as e:
+            print(f"Erro ao ler o arquivo {arquivo}: {e}")
+            continue
+        if 'sigla_tribunal' not in cabecalho or 'ramo_justica' not in cabecalho:
+            print(f"Alerta: Arquivo {arquivo} não contém 'sigla_tribunal' ou 'ramo_justica'. O processamento pode falhar.")
+        colunas.extend(c for c in cabecalho if c not in colunas)
+        arquivos_validos.append(arquivo)
+
+    if not arquivos_validos:
+        print("Nenhum arquivo para consolidar.")
+        return None
+
+    # O consolidado é montado sem compressão (para poder voltar ao início de um arquivo que
+    # falhe) e só no fim substitui a saída, comprimido se o nome dela pedir
+    caminho_parcial = None
+    if caminho_arquivo_saida_consolidado is not None:
+        caminho_parcial = f"{caminho_arquivo_saida_consolidado}.parcial"
+    df_parciais = None
+    total_linhas = 0
+    try:
+        with open(caminho_parcial or os.devnull, 'w', encoding='utf-8', newline='') as arquivo_saida:
+            escrever_cabecalho = True
+            for arquivo in arquivos_validos:
+                inicio_arquivo = arquivo_saida.tell() if caminho_parcial else 0
+                cabecalho_pendente = escrever_cabecalho
+                parciais_arquivo = None
+                try:
+                    t_arquivo = time.perf_counter()
+                    linhas_arquivo = linhas_validas = 0
+                    for bloco in pd.read_csv(arquivo, sep=',', encoding='utf-8', chunksize=linhas_por_bloco):
+                        linhas_arquivo += len(bloco)
+                        bloco = validador.validar(bloco, arquivo)
+                        linhas_validas += len(bloco)
+                        if caminho_parcial:
+                            bloco.reindex(columns=colunas).to_csv(arquivo_saida, index=False, sep=',',
+                                                                  header=escrever_cabecalho)
+                            escrever_cabecalho = False
+                        parciais_arquivo = combinar_parciais([parciais_arquivo, agregar_parciais(bloco)])
+                except Exception as e:
+                    print(f"Erro ao ler o arquivo {arquivo}: {e}. Nenhuma linha dele foi consolidada.")
+                    if caminho_parcial:
+                        arquivo_saida.seek(inicio_arquivo)
+                        arquivo_saida.truncate()
+                    escrever_cabecalho = cabecalho_pendente
+                    continue
+                df_parciais = combinar_parciais([df_parciais, parciais_arquivo])
+                total_linhas += linhas_validas
+                registrar_arquivo(arquivo, time.perf_counter() - t_arquivo, linhas_arquivo)
+                print(f"Arquivo {arquivo} lido com sucesso.")
+
+        if caminho_parcial:
+            if arquivo_comprimido(caminho_arquivo_saida_consolidado):
+                tmp = f"{caminho_arquivo_saida_consolidado}.tmp"
+                with open(caminho_parcial, 'rb') as origem, abrir_saida(tmp, caminho_arquivo_saida_consolidado) as destino:
+                    shutil.copyfileobj(origem, destino, 1024 * 1024)
+                os.replace(tmp, caminho_arquivo_saida_consolidado)
+                os.remove(caminho_parcial)
+            else:
+                os.replace(caminho_parcial, caminho_arquivo_saida_consolidado)
+            print(f"Arquivo consolidado '{caminho_arquivo_saida_consolidado}' gerado com sucesso com {total_linhas} linhas.")
+    except Exception as e:
+        print(f"Erro ao salvar o arquivo consolidado '{caminho_arquivo_saida_consolidado}': {e}")
+    return df_parciais
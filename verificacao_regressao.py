@@ -0,0 +1,527 @@
+import argparse
+import glob
+import itertools
+import json
+import os
+import platform
+import shutil
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+import numpy as np
+import pandas as pd
+
+from motor_metas import ALL_META_COLUMNS, METAS
+from gerador_dados import MIX_RAMOS_PADRAO, gerar_dados
+from benchmark import PASTA_PROJETO, executar_versao
+from compressao import FORMATOS_COMPRESSAO, abrir_saida
+from validacao import NOME_ARQUIVO_QUARENTENA
+
+# --- Configurações da Verificação ---
+# O histórico fica na pasta do cache (fora do controle de versão), junto das outras medições locais
+CAMINHO_HISTORICO = os.path.join(PASTA_PROJETO, ".cache_csvs", "Historico_Regressao.csv")
+# ResumoMetas esperados, gerados pelo Versao_NP.py original (cálculo tribunal a tribunal, sem o
+# motor vetorizado) sobre gerar_fixture(..., linhas_por_tribunal, semente); sem um deles para o
+# tamanho e a semente pedidos, a referência passa a ser o resumo do CAMINHO_REFERENCIA
+PASTA_REFERENCIAS = os.path.join(PASTA_PROJETO, "referencias")
+TAMANHOS_PADRAO = [50, 500, 5000]   # linhas por tribunal, do menor para o maior
+NUM_TRIBUNAIS = 30
+NUM_ARQUIVOS = 4
+ASSIMETRIA = 1.0
+# Fração de piora (tempo ou pico de memória) em relação à referência que reprova um caminho
+LIMITE_REGRESSAO = 0.25
+# Abaixo destas diferenças absolutas a piora é tratada como ruído (início do interpretador etc.)
+FOLGA_TEMPO_S = 0.5
+FOLGA_MEMORIA_MB = 25.0
+# A referência é a mediana das últimas execuções aprovadas do mesmo caminho, tamanho e máquina
+EXECUCOES_REFERENCIA = 5
+TOLERANCIA_RELATIVA = 1e-9
+
+# Casos-limite acrescentados aos dados gerados: um ramo sem função de metas (só a Meta1),
+# um tribunal com todos os denominadores zerados (tudo "NA") e um só com o da Meta1 não nulo
+RAMO_SEM_MAPEAMENTO = "Justiça Eleitoral"
+TRIBUNAL_SEM_DENOMINADOR = "TZ1"
+TRIBUNAL_SO_META1 = "TZ2"
+# Arquivo acrescentado aos dados nos caminhos com validação, só com linhas inválidas
+ARQUIVO_LINHAS_INVALIDAS = "teste_999.csv"
+TRIBUNAL_RAMO_DESCONHECIDO = "TZ9"
+# MODO_CHECKPOINT: a primeira execução é interrompida depois deste número de arquivos
+ARQUIVOS_ANTES_DA_INTERRUPCAO = 2
+TEMPO_LIMITE_SERVICO_S = 120
+
+# Caminho de execução: (script, constantes substituídas, argumentos, resumo gerado)
+RESUMO_NP = os.path.join("Saida", "ResumoMetas.csv")
+RESUMO_P = os.path.join("Saida_P", "ResumoMetas_P.csv")
+RESUMO_FILTRADO = os.path.join("Saida", "ResumoMetas_filtrado.csv")
+RESUMO_ANO = os.path.join("Saida", "ResumoMetas_2025.csv")   # os dados gerados só têm as colunas de 2025
+ARGUMENTOS_PROCESSAR = ("--dados", "./Dados", "--saida", "./Saida", "--sem-graficos")
+ARGUMENTOS_MOTOR = ARGUMENTOS_PROCESSAR + ("--motor",)
+ARGUMENTOS_COORDENADOR = ("coordenador", "--dados", "./Dados", "--saida", "./Saida", "--porta", "0", "--workers-locais", "2")
+CAMINHOS = {
+    'np': ("Versao_NP.py", {}, (), RESUMO_NP),
+    'np-streaming': ("Versao_NP.py", {'MODO_STREAMING': True}, (), RESUMO_NP),
+    'np-cache': ("Versao_NP.py", {'MODO_CACHE': True}, (), RESUMO_NP),
+    'np-incremental': ("Versao_NP.py", {'MODO_INCREMENTAL': True}, (), RESUMO_NP),
+    'p': ("Versao_P.py", {}, (), RESUMO_P),
+    'p-memoria-compartilhada': ("Versao_P.py", {'MODO_MEMORIA_COMPARTILHADA': True}, (), RESUMO_P),
+    'p-cache': ("Versao_P.py", {'MODO_CACHE': True}, (), RESUMO_P),
+    'p-divisao-arquivos': ("Versao_P.py", {'MODO_DIVISAO_ARQUIVOS': True}, (), RESUMO_P),
+    'p-escalonador-limites': ("Versao_P.py", {'MAX_TAREFAS_EM_VOO': 1, 'LIMITE_MEMORIA_TAREFAS_MB': 0.001}, (), RESUMO_P),
+    'p-checkpoint-retomada': ("Versao_P.py", {'MODO_CHECKPOINT': True}, (), RESUMO_P),
+    'np-validacao': ("Versao_NP.py", {'MODO_VALIDACAO': True}, (), RESUMO_NP),
+    'p-validacao': ("Versao_P.py", {'MODO_VALIDACAO': True}, (), RESUMO_P),
+    'np-comprimido': ("Versao_NP.py", {}, (), RESUMO_NP),
+    'p-comprimido': ("Versao_P.py", {}, (), RESUMO_P),
+    'p-divisao-arquivos-comprimido': ("Versao_P.py", {'MODO_DIVISAO_ARQUIVOS': True}, (), RESUMO_P),
+    'motor-sequencial': ("processar_metas.py", {}, ARGUMENTOS_MOTOR + ("sequencial",), RESUMO_NP),
+    'motor-threads': ("processar_metas.py", {}, ARGUMENTOS_MOTOR + ("threads",), RESUMO_NP),
+    'motor-processos': ("processar_metas.py", {}, ARGUMENTOS_MOTOR + ("processos",), RESUMO_NP),
+    'motor-vetorizado': ("processar_metas.py", {}, ARGUMENTOS_MOTOR + ("vetorizado",), RESUMO_NP),
+    'motor-pipeline': ("processar_metas.py", {}, ARGUMENTOS_MOTOR + ("pipeline",), RESUMO_NP),
+    'motor-pipeline-comprimido': ("processar_metas.py", {}, ARGUMENTOS_MOTOR + ("pipeline",), RESUMO_NP),
+    'filtro-tribunal': ("processar_metas.py", {},
+                        ARGUMENTOS_PROCESSAR + ("--tribunal", f"{TRIBUNAL_SEM_DENOMINADOR},{TRIBUNAL_SO_META1}"),
+                        RESUMO_FILTRADO),
+    'filtro-ramo': ("processar_metas.py", {}, ARGUMENTOS_PROCESSAR + ("--ramo", RAMO_SEM_MAPEAMENTO), RESUMO_FILTRADO),
+    'metas-anuais': ("processar_metas.py", {}, ARGUMENTOS_PROCESSAR + ("--todos-os-anos", "--formato-anos", "por_ano"),
+                     RESUMO_ANO),
+    'distribuido': ("distribuido.py", {}, ARGUMENTOS_COORDENADOR, RESUMO_NP),
+    'servico': ("servico_metas.py", {}, ("--dados", "./Dados", "--intervalo", "0"), RESUMO_NP),
+}
+# Caminhos com filtro: o resumo esperado é só a parte da referência que atende ao filtro
+SUBCONJUNTOS = {
+    'filtro-tribunal': lambda df: df[df['tribunal'].isin([TRIBUNAL_SEM_DENOMINADOR, TRIBUNAL_SO_META1])],
+    'filtro-ramo': lambda df: df[df['ramo_justica'] == RAMO_SEM_MAPEAMENTO],
+}
+# Caminhos com validação: rodam com o ARQUIVO_LINHAS_INVALIDAS a mais nos dados; como todas as
+# linhas dele vão para a quarentena, o resumo esperado continua sendo o da referência
+CAMINHOS_COM_VALIDACAO = ('np-validacao', 'p-validacao')
+CAMINHO_REFERENCIA = 'np'
+COLUNAS_HISTORICO = ['data', 'maquina', 'caminho', 'linhas_por_tribunal', 'total_linhas',
+                     'tempo_s', 'pico_rss_mb', 'aprovado']
+
+# --- 1. Dados de Teste ---
+def gerar_fixture(pasta_dados, linhas_por_tribunal, semente):
+    """
+    Gera os arquivos 'teste_*.csv' de um tamanho (com tribunais do RAMO_SEM_MAPEAMENTO) e
+    acrescenta ao primeiro arquivo as linhas dos tribunais com denominadores zerados.
+    Retorna o total de linhas.
+    """
+    mix_ramos = dict(MIX_RAMOS_PADRAO, **{RAMO_SEM_MAPEAMENTO: 2})
+    total_linhas = gerar_dados(pasta_dados, NUM_TRIBUNAIS, mix_ramos, linhas_por_tribunal,
+                               NUM_ARQUIVOS, ASSIMETRIA, semente)
+    primeiro_arquivo = os.path.join(pasta_dados, "teste_001.csv")
+    colunas = pd.read_csv(primeiro_arquivo, nrows=0).columns
+    casos_limite = pd.DataFrame([
+        # casos_novos - suspensos = 0 e dessobrestados = 0: nenhuma meta tem denominador
+        {'sigla_tribunal': TRIBUNAL_SEM_DENOMINADOR, 'ramo_justica': "Justiça Estadual", 'julgados_2025': 7,
+         'casos_novos_2025': 4, 'dessobrestados_2025': 0, 'suspensos_2025': 4},
+        {'sigla_tribunal': TRIBUNAL_SEM_DENOMINADOR, 'ramo_justica': "Justiça Estadual", 'julgados_2025': 0,
+         'casos_novos_2025': 0, 'dessobrestados_2025': 0, 'suspensos_2025': 0},
+        # Só os dessobrestados deixam o denominador da Meta1 diferente de zero
+        {'sigla_tribunal': TRIBUNAL_SO_META1, 'ramo_justica': "Justiça Federal", 'julgados_2025': 3,
+         'casos_novos_2025': 5, 'dessobrestados_2025': 2, 'suspensos_2025': 5},
+    ]).reindex(columns=colunas)
+    casos_limite['procedimento'] = "Conhecimento"
+    casos_limite['sigla_grau'] = "G1"
+    casos_limite['orgao_julgador'] = "Órgão Julgador 1"
+    casos_limite.to_csv(primeiro_arquivo, mode='a', header=False, index=False, sep=',', encoding='utf-8')
+    return total_linhas + len(casos_limite)
+
+def _dados_proprios(pasta_trabalho):
+    """Troca o link da pasta Dados da pasta de trabalho por uma cópia, que pode ser alterada."""
+    pasta_dados = os.path.join(pasta_trabalho, "Dados")
+    if os.path.islink(pasta_dados):
+        origem = os.path.realpath(pasta_dados)
+        os.remove(pasta_dados)
+        shutil.copytree(origem, pasta_dados)
+    return pasta_dados
+
+def comprimir_dados(pasta_trabalho):
+    """Comprime os 'teste_*.csv', alternando entre os formatos aceitos; o último fica sem compressão."""
+    pasta_dados = _dados_proprios(pasta_trabalho)
+    arquivos = sorted(glob.glob(os.path.join(pasta_dados, "teste_*.csv")))
+    for arquivo, formato in zip(arquivos[:-1], itertools.cycle(FORMATOS_COMPRESSAO)):
+        with open(arquivo, 'rb') as origem, abrir_saida(f"{arquivo}.{formato}") as destino:
+            shutil.copyfileobj(origem, destino)
+        os.remove(arquivo)
+
+def acrescentar_linhas_invalidas(pasta_trabalho):
+    """
+    Acrescenta aos dados o ARQUIVO_LINHAS_INVALIDAS, com uma linha para cada regra da
+    validação que não depende da ordem dos arquivos. Retorna o número de linhas.
+    """
+    pasta_dados = _dados_proprios(pasta_trabalho)
+    modelo = pd.read_csv(os.path.join(pasta_dados, "teste_001.csv"), nrows=1)
+    sigla, ramo = modelo.at[0, 'sigla_tribunal'], modelo.at[0, 'ramo_justica']
+    contadores = {'julgados_2025': 3, 'casos_novos_2025': 5, 'dessobrestados_2025': 1, 'suspensos_2025': 1}
+    invalidas = pd.DataFrame([
+        dict(contadores, sigla_tribunal=sigla, ramo_justica=ramo, julgados_2025=-5),               # contador_negativo
+        dict(contadores, sigla_tribunal=sigla, ramo_justica=ramo, casos_novos_2025=None),          # contador_ausente
+        dict(contadores, sigla_tribunal=None, ramo_justica=ramo),                                  # sigla_ausente
+        dict(contadores, sigla_tribunal=TRIBUNAL_RAMO_DESCONHECIDO, ramo_justica="Justiça Lunar"),  # ramo_desconhecido
+    ]).reindex(columns=modelo.columns)
+    invalidas['procedimento'] = "Conhecimento"
+    invalidas['sigla_grau'] = "G1"
+    invalidas['orgao_julgador'] = "Órgão Julgador 1"
+    invalidas.to_csv(os.path.join(pasta_dados, ARQUIVO_LINHAS_INVALIDAS), index=False, sep=',', encoding='utf-8')
+    return len(invalidas)
+
+# --- 2. Comparação dos Resumos ---
+def ler_resumo(caminho_resumo):
+    """Lê o ResumoMetas como texto, para distinguir "NA" de células vazias ou inválidas."""
+    return pd.read_csv(caminho_resumo, dtype=str, keep_default_na=False, encoding='utf-8')
+
+def carregar_resumo_esperado(linhas_por_tribunal, semente):
+    """Lê o ResumoMetas esperado em PASTA_REFERENCIAS para o tamanho e a semente, ou None."""
+    caminho = os.path.join(PASTA_REFERENCIAS, f"ResumoMetas_{linhas_por_tribunal}_semente{semente}.csv")
+    return ler_resumo(caminho) if os.path.exists(caminho) else None
+
+def _valores_das_metas(df_resumo, meta):
+    """(valores numéricos, máscara de "NA", máscara de células que não são número nem "NA")."""
+    textos = df_resumo[meta]
+    valores = pd.to_numeric(textos.where(textos != "NA"), errors='coerce').to_numpy(dtype='float64')
+    na = (textos == "NA").to_numpy()
+    return valores, na, ~na & np.isnan(valores)
+
+def comparar_resumos(df_referencia, df_resumo, tolerancia=TOLERANCIA_RELATIVA):
+    """
+    Compara um resumo com o de referência: mesmas colunas, mesmos tribunais e ramos, o mesmo
+    "NA" nas mesmas células e valores numericamente iguais (tolerância relativa). Retorna a
+    lista de divergências (vazia se os resumos são equivalentes).
+    """
+    divergencias = []
+    if list(df_resumo.columns) != ALL_META_COLUMNS:
+        divergencias.append(f"colunas diferentes: {list(df_resumo.columns)}")
+        return divergencias
+    referencia = df_referencia.set_index('tribunal').sort_index()
+    resumo = df_resumo.set_index('tribunal').sort_index()
+    if resumo.index.has_duplicates:
+        divergencias.append("tribunais repetidos no resumo")
+        return divergencias
+    faltantes = referencia.index.difference(resumo.index)
+    sobrando = resumo.index.difference(referencia.index)
+    if len(faltantes) or len(sobrando):
+        divergencias.append(f"tribunais faltantes {list(faltantes)} / a mais {list(sobrando)}")
+        return divergencias
+
+    ramos_diferentes = referencia.index[referencia['ramo_justica'] != resumo['ramo_justica']]
+    if len(ramos_diferentes):
+        divergencias.append(f"ramo diferente em {list(ramos_diferentes)}")
+    for meta in METAS:
+        valores_ref, na_ref, _ = _valores_das_metas(referencia, meta)
+        valores, na, invalidos = _valores_das_metas(resumo, meta)
+        if invalidos.any():
+            divergencias.append(f"{meta}: valor que não é número nem \"NA\" em {list(resumo.index[invalidos])}")
+        diferentes = (na != na_ref) | ~(na | np.isclose(valores, valores_ref, rtol=tolerancia, atol=0.0))
+        if diferentes.any():
+            divergencias.append(f"{meta}: valores diferentes em {list(resumo.index[diferentes])}")
+    return divergencias
+
+def verificar_casos_limite(df_resumo, tribunais=None):
+    """
+    Confere o "NA" esperado nos casos-limite (com 'tribunais', só nos que estão entre eles).
+    Retorna a lista de divergências.
+    """
+    # Uma coluna ausente conta como célula vazia (a falta da coluna é apontada por comparar_resumos)
+    resumo = df_resumo.reindex(columns=ALL_META_COLUMNS, fill_value="").set_index('tribunal')
+    divergencias = []
+    esperados = {TRIBUNAL_SEM_DENOMINADOR: [], TRIBUNAL_SO_META1: ['Meta1']}
+    for sigla in resumo.index[resumo['ramo_justica'] == RAMO_SEM_MAPEAMENTO]:
+        esperados[sigla] = ['Meta1']
+    if tribunais is not None:
+        esperados = {sigla: metas for sigla, metas in esperados.items() if sigla in set(tribunais)}
+    for sigla, metas_numericas in esperados.items():
+        if sigla not in resumo.index:
+            divergencias.append(f"tribunal '{sigla}' ausente do resumo")
+            continue
+        for meta in METAS:
+            esperado_na = meta not in metas_numericas
+            if (resumo.at[sigla, meta] == "NA") != esperado_na:
+                divergencias.append(f"tribunal '{sigla}': {meta} = {resumo.at[sigla, meta]!r}, "
+                                    f"esperado {'NA' if esperado_na else 'número'}")
+    return divergencias
+
+# --- 3. Execução dos Caminhos ---
+# Primeira execução do MODO_CHECKPOINT do Versao_P.py, na pasta de trabalho: o diário interrompe a
+# consolidação (como um Ctrl+C) depois de argv[1] arquivos e deixa uma escrita pela metade no fim
+# do consolidado parcial e do diário, como uma queda no meio da gravação
+INTERROMPER_CHECKPOINT = """
+import os, sys
+import Versao_P
+from processar_metas import NOME_ARQUIVO_CONSOLIDADO
+from checkpoint import PASTA_CHECKPOINT, DiarioProgresso, consolidar_com_checkpoint
+from compressao import listar_arquivos_csv
+
+class DiarioInterrompido(DiarioProgresso):
+    def concluir_arquivo(self, *args, **kwargs):
+        super().concluir_arquivo(*args, **kwargs)
+        if len(self.arquivos) >= int(sys.argv[1]):
+            raise KeyboardInterrupt
+
+diario = DiarioInterrompido(PASTA_CHECKPOINT, "Versao_P")
+os.makedirs(Versao_P.PASTA_SAIDA, exist_ok=True)
+try:
+    consolidar_com_checkpoint(listar_arquivos_csv(Versao_P.PASTA_DOS_CSVS),
+                              os.path.join(Versao_P.PASTA_SAIDA, NOME_ARQUIVO_CONSOLIDADO), diario)
+except KeyboardInterrupt:
+    with open(diario.caminho_consolidado, 'ab') as f:
+        f.write(b'TZ1,Justi')
+    with open(diario.caminho_diario, 'a', encoding='utf-8') as f:
+        f.write('{"tipo": "arquivo", "cam')
+else:
+    sys.exit("A consolidação terminou sem ser interrompida.")
+"""
+
+def _ambiente():
+    return dict(os.environ, MPLBACKEND="Agg",
+                PYTHONPATH=os.pathsep.join(filter(None, [PASTA_PROJETO, os.environ.get("PYTHONPATH")])))
+
+def interromper_checkpoint(pasta_trabalho):
+    """Deixa na pasta de trabalho o checkpoint de uma execução interrompida (ver INTERROMPER_CHECKPOINT)."""
+    processo = subprocess.run([sys.executable, "-c", INTERROMPER_CHECKPOINT, str(ARQUIVOS_ANTES_DA_INTERRUPCAO)],
+                              cwd=pasta_trabalho, env=_ambiente(), capture_output=True, text=True, encoding='utf-8')
+    if processo.returncode != 0:
+        raise RuntimeError(f"Execução interrompida do checkpoint falhou:\n{processo.stdout[-2000:]}\n{processo.stderr[-2000:]}")
+
+def executar_servico(pasta_trabalho, argumentos, caminho_resumo):
+    """
+    Sobe o servico_metas.py na pasta de trabalho, em uma porta livre, espera a primeira
+    resposta de /metas, grava os resultados em 'caminho_resumo' no formato do ResumoMetas e
+    encerra o serviço (Ctrl+C). O tempo vai da partida até a resposta; o pico de memória
+    não é medido (o serviço não termina sozinho).
+    """
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        porta = s.getsockname()[1]
+    t1 = time.perf_counter()
+    processo = subprocess.Popen([sys.executable, os.path.join(PASTA_PROJETO, "servico_metas.py"), *argumentos,
+                                 "--porta", str(porta)], cwd=pasta_trabalho, env=_ambiente(),
+                                stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, encoding='utf-8')
+    try:
+        resposta = None
+        while resposta is None:
+            if processo.poll() is not None:
+                raise RuntimeError(f"servico_metas.py terminou sem responder:\n{processo.stdout.read()[-2000:]}")
+            if time.perf_counter() - t1 > TEMPO_LIMITE_SERVICO_S:
+                raise RuntimeError(f"servico_metas.py não respondeu em {TEMPO_LIMITE_SERVICO_S}s")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{porta}/metas", timeout=5) as r:
+                    resposta = json.load(r)
+            except OSError:
+                time.sleep(0.1)  # ainda carregando os dados
+        t2 = time.perf_counter()
+    finally:
+        processo.send_signal(signal.SIGINT)
+        try:
+            processo.communicate(timeout=10)
+        except subprocess.TimeoutExpired:
+            processo.kill()
+            processo.communicate()
+
+    df_resumo = pd.DataFrame(resposta['resultados']).reindex(columns=ALL_META_COLUMNS)
+    caminho_resumo = os.path.join(pasta_trabalho, caminho_resumo)
+    os.makedirs(os.path.dirname(caminho_resumo), exist_ok=True)
+    df_resumo.astype(object).where(df_resumo.notna(), "NA").to_csv(caminho_resumo, index=False, sep=',', encoding='utf-8')
+    return {'etapas': {}, 'total': t2 - t1, 'pico_rss_mb': None}
+
+def verificar_quarentena(pasta_trabalho, caminho_resumo):
+    """Confere se foram para a quarentena exatamente as linhas do ARQUIVO_LINHAS_INVALIDAS."""
+    caminho_quarentena = os.path.join(pasta_trabalho, os.path.dirname(caminho_resumo), NOME_ARQUIVO_QUARENTENA)
+    try:
+        quarentena = pd.read_csv(caminho_quarentena, dtype=str, keep_default_na=False, encoding='utf-8')
+    except (OSError, pd.errors.EmptyDataError):
+        return [f"quarentena '{NOME_ARQUIVO_QUARENTENA}' não gerada"]
+    esperadas = len(pd.read_csv(os.path.join(pasta_trabalho, "Dados", ARQUIVO_LINHAS_INVALIDAS)))
+    de_outros = int((~quarentena['arquivo'].str.endswith(ARQUIVO_LINHAS_INVALIDAS)).sum())
+    if len(quarentena) != esperadas or de_outros:
+        return [f"quarentena com {len(quarentena)} linha(s) ({de_outros} de outros arquivos), esperadas {esperadas}"]
+    return []
+
+# Preparação da pasta de trabalho antes da execução medida
+PREPARACOES = {
+    'p-checkpoint-retomada': interromper_checkpoint,
+    'np-validacao': acrescentar_linhas_invalidas,
+    'p-validacao': acrescentar_linhas_invalidas,
+    'np-comprimido': comprimir_dados,
+    'p-comprimido': comprimir_dados,
+    'p-divisao-arquivos-comprimido': comprimir_dados,
+    'motor-pipeline-comprimido': comprimir_dados,
+}
+
+def executar_caminho(nome_caminho, pasta_dados, repeticoes):
+    """
+    Executa o caminho 'repeticoes' vezes, cada uma em uma pasta de trabalho nova (sem caches
+    de execuções anteriores) com a pasta Dados apontando para 'pasta_dados', depois da
+    preparação do caminho em PREPARACOES (se houver).
+    Retorna (mediana do tempo total, maior pico de RSS em MB, resumos gerados, divergências
+    encontradas fora do resumo).
+    """
+    nome_script, substituicoes, argumentos, caminho_resumo = CAMINHOS[nome_caminho]
+    if nome_script in ("Versao_NP.py", "Versao_P.py"):
+        substituicoes = dict(substituicoes, GERAR_GRAFICOS=False)
+    tempos, picos, resumos, divergencias = [], [], [], []
+    for _ in range(repeticoes):
+        pasta_trabalho = tempfile.mkdtemp(prefix=f"regressao_{nome_caminho}_")
+        try:
+            try:
+                os.symlink(pasta_dados, os.path.join(pasta_trabalho, "Dados"), target_is_directory=True)
+            except OSError:
+                shutil.copytree(pasta_dados, os.path.join(pasta_trabalho, "Dados"))
+            if nome_caminho in PREPARACOES:
+                PREPARACOES[nome_caminho](pasta_trabalho)
+            if nome_script == "servico_metas.py":
+                medicao = executar_servico(pasta_trabalho, argumentos, caminho_resumo)
+            else:
+                medicao = executar_versao(nome_script, pasta_trabalho, substituicoes, argumentos)
+            resumos.append(ler_resumo(os.path.join(pasta_trabalho, caminho_resumo)))
+            if nome_caminho in CAMINHOS_COM_VALIDACAO:
+                divergencias += verificar_quarentena(pasta_trabalho, caminho_resumo)
+        finally:
+            shutil.rmtree(pasta_trabalho, ignore_errors=True)
+        tempos.append(medicao['total'])
+        if medicao['pico_rss_mb'] is not None:
+            picos.append(medicao['pico_rss_mb'])
+    return statistics.median(tempos), (max(picos) if picos else None), resumos, divergencias
+
+# --- 4. Histórico e Regressões ---
+def identificar_maquina():
+    """Identificação da máquina no histórico: só execuções na mesma máquina são comparadas."""
+    return f"{platform.node()}|{os.cpu_count()} CPU|Python {platform.python_version()}"
+
+def carregar_historico(caminho_historico):
+    if not os.path.exists(caminho_historico):
+        return pd.DataFrame(columns=COLUNAS_HISTORICO)
+    try:
+        return pd.read_csv(caminho_historico, encoding='utf-8')
+    except Exception as e:
+        print(f"Erro ao ler o histórico '{caminho_historico}': {e}")
+        return pd.DataFrame(columns=COLUNAS_HISTORICO)
+
+def referencia_do_historico(df_historico, maquina, nome_caminho, linhas_por_tribunal):
+    """Medianas de tempo e de pico de memória das últimas execuções aprovadas (ou None)."""
+    anteriores = df_historico[(df_historico['maquina'] == maquina) & (df_historico['caminho'] == nome_caminho)
+                              & (df_historico['linhas_por_tribunal'] == linhas_por_tribunal)
+                              & df_historico['aprovado'].astype(bool)].tail(EXECUCOES_REFERENCIA)
+    if anteriores.empty:
+        return None
+    return anteriores['tempo_s'].median(), anteriores['pico_rss_mb'].median()
+
+def detectar_regressoes(tempo, pico_mb, referencia, limite):
+    """Lista as regressões (tempo e/ou memória) acima de 'limite' e das folgas absolutas."""
+    if referencia is None:
+        return []
+    regressoes = []
+    tempo_ref, pico_ref = referencia
+    if tempo > tempo_ref * (1 + limite) and tempo - tempo_ref > FOLGA_TEMPO_S:
+        regressoes.append(f"tempo {tempo:.2f}s contra {tempo_ref:.2f}s (+{tempo / tempo_ref - 1:.0%})")
+    if (pico_mb is not None and not pd.isna(pico_ref) and pico_mb > pico_ref * (1 + limite)
+            and pico_mb - pico_ref > FOLGA_MEMORIA_MB):
+        regressoes.append(f"memória {pico_mb:.1f} MB contra {pico_ref:.1f} MB (+{pico_mb / pico_ref - 1:.0%})")
+    return regressoes
+
+# --- 5. Verificação Completa ---
+def verificar(tamanhos, caminhos, repeticoes=1, limite=LIMITE_REGRESSAO, caminho_historico=CAMINHO_HISTORICO,
+              registrar=True, semente=42):
+    """
+    Para cada tamanho (do menor para o maior), gera os dados de teste, executa cada caminho,
+    compara o resumo com o esperado em PASTA_REFERENCIAS (ou, sem ele, com o do
+    CAMINHO_REFERENCIA; só a parte esperada, nos caminhos de SUBCONJUNTOS) e com o "NA"
+    esperado nos casos-limite e
+    compara tempo e pico de memória com o histórico. As medições vão para o histórico.
+    Retorna a lista de falhas (vazia se tudo passou).
+    """
+    maquina = identificar_maquina()
+    df_historico = carregar_historico(caminho_historico)
+    # A referência é sempre executada (e primeiro), mesmo que não tenha sido pedida
+    caminhos = [CAMINHO_REFERENCIA] + [c for c in caminhos if c != CAMINHO_REFERENCIA]
+    falhas = []
+    novas_linhas = []
+    for linhas_por_tribunal in sorted(tamanhos):
+        pasta_fixture = tempfile.mkdtemp(prefix="regressao_dados_")
+        try:
+            pasta_dados = os.path.join(pasta_fixture, "Dados")
+            total_linhas = gerar_fixture(pasta_dados, linhas_por_tribunal, semente)
+            print(f"\nTamanho {linhas_por_tribunal} linhas por tribunal ({total_linhas} linhas):")
+            df_referencia = carregar_resumo_esperado(linhas_por_tribunal, semente)
+            if df_referencia is None:
+                print(f"  (sem resumo esperado para este tamanho e a semente {semente}: a referência é o caminho '{CAMINHO_REFERENCIA}')")
+            for nome_caminho in caminhos:
+                try:
+                    tempo, pico_mb, resumos, divergencias = executar_caminho(nome_caminho, pasta_dados, repeticoes)
+                except Exception as e:
+                    falhas.append(f"[{linhas_por_tribunal}] {nome_caminho}: execução falhou: {e}")
+                    print(f"  {nome_caminho:<33} FALHOU na execução")
+                    continue
+
+                if df_referencia is None and nome_caminho == CAMINHO_REFERENCIA:
+                    df_referencia = resumos[0]
+                esperado, tribunais = df_referencia, None
+                if df_referencia is not None and nome_caminho in SUBCONJUNTOS:
+                    esperado = SUBCONJUNTOS[nome_caminho](df_referencia)
+                    tribunais = list(esperado['tribunal'])
+                divergencias += verificar_casos_limite(resumos[0], tribunais)
+                if esperado is None:
+                    divergencias.append("sem resumo de referência para comparar")
+                for df_resumo in resumos:
+                    if esperado is not None:
+                        divergencias += comparar_resumos(esperado, df_resumo)
+                divergencias = list(dict.fromkeys(divergencias))
+                regressoes = detectar_regressoes(
+                    tempo, pico_mb, referencia_do_historico(df_historico, maquina, nome_caminho, linhas_por_tribunal), limite)
+
+                pico = f"{pico_mb:.1f} MB" if pico_mb is not None else "n/d"
+                situacao = "OK" if not divergencias and not regressoes else "FALHOU"
+                print(f"  {nome_caminho:<33} {tempo:>8.2f}s {pico:>10}  {situacao}")
+                for problema in divergencias + regressoes:
+                    print(f"      {problema}")
+                    falhas.append(f"[{linhas_por_tribunal}] {nome_caminho}: {problema}")
+                novas_linhas.append({
+                    'data': time.strftime('%Y-%m-%d %H:%M:%S'), 'maquina': maquina, 'caminho': nome_caminho,
+                    'linhas_por_tribunal': linhas_por_tribunal, 'total_linhas': total_linhas,
+                    'tempo_s': round(tempo, 4), 'pico_rss_mb': round(pico_mb, 1) if pico_mb is not None else None,
+                    'aprovado': not divergencias and not regressoes,
+                })
+        finally:
+            shutil.rmtree(pasta_fixture, ignore_errors=True)
+
+    if registrar and novas_linhas:
+        try:
+            os.makedirs(os.path.dirname(caminho_historico) or ".", exist_ok=True)
+            pd.DataFrame(novas_linhas, columns=COLUNAS_HISTORICO).to_csv(
+                caminho_historico, mode='a', header=not os.path.exists(caminho_historico),
+                index=False, sep=',', encoding='utf-8')
+            print(f"\nMedições acrescentadas ao histórico '{caminho_historico}'.")
+        except Exception as e:
+            print(f"Erro ao salvar o histórico '{caminho_historico}': {e}")
+    return falhas
+
+# --- Função Principal (Main) ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verifica se os caminhos de execução de CAMINHOS geram o mesmo ResumoMetas "
+                                                 "e se algum deles ficou mais lento ou usa mais memória.")
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=TAMANHOS_PADRAO, help="Linhas por tribunal de cada conjunto de dados")
+    parser.add_argument("--caminhos", nargs="+", choices=list(CAMINHOS), default=list(CAMINHOS),
+                        help="Caminhos de execução verificados (padrão: todos)")
+    parser.add_argument("--repeticoes", type=int, default=1, help="Execuções por medição (usa a mediana do tempo)")
+    parser.add_argument("--limite", type=float, default=LIMITE_REGRESSAO,
+                        help="Piora máxima aceita em relação ao histórico (0.25 = 25%%)")
+    parser.add_argument("--historico", default=CAMINHO_HISTORICO, help="Arquivo CSV do histórico de medições")
+    parser.add_argument("--sem-registro", action="store_true", help="Não acrescenta as medições ao histórico")
+    parser.add_argument("--semente", type=int, default=42, help="Semente do gerador de dados")
+    args = parser.parse_args()
+
+    falhas = verificar(args.tamanhos, args.caminhos, args.repeticoes, args.limite, args.historico,
+                       registrar=not args.sem_registro, semente=args.semente)
+    if falhas:
+        print(f"\nVerificação FALHOU ({len(falhas)} problema(s)):")
+        for falha in falhas:
+            print(f"  {falha}")
+        sys.exit(1)
+    print("\nVerificação concluída: todos os caminhos verificados geram o mesmo ResumoMetas, sem regressões.")